@@ -0,0 +1,367 @@
+# File: mock_server.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""Local stand-in of the NetWitness REST API used by the benchmarks.
+
+It serves synthetic captures of a configurable size from /sdk/packets (a pcap of TCP packets for render=pcap, a JSON
+log export otherwise), estimates them for /sdk count queries, answers the other /sdk queries (the session and meta
+queries of polling) with the meta of its synthetic sessions, accepts parser uploads on /decoder/parsers/upload, lists
+the uploaded files on /decoder/parsers and answers /sys requests (a shutdown message makes it answer 503 to everything
+for a configurable restart time). Every request can be delayed by a fixed latency and failed with a 503 at a
+configurable rate. Payloads are generated while they are written, so the memory of the stand-in does not depend on the
+payload size.
+
+The stand-in can also be started on its own, e.g. to replay a test JSON with the connector's __main__ block:
+
+    python benchmarks/mock_server.py --port 8050 --size-mb 100
+"""
+
+import argparse
+import calendar
+import json
+import random
+import re
+import struct
+import threading
+import time
+import urllib.parse
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+PCAP_GLOBAL_HEADER = struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, 1)
+PACKET_SIZE = 1514
+EVENT_PADDING = 200
+WRITE_SIZE = 64 * 1024
+READ_SIZE = 64 * 1024
+FILE_NAME_PATTERN = re.compile(rb'filename="([^"]*)"')
+
+
+def _synthetic_frame(size):
+    """Return an Ethernet/IPv4/TCP frame of the given size, so that packet filters have something to match."""
+
+    payload_size = size - 54
+    ethernet = b"\x00\x11\x22\x33\x44\x55\x66\x77\x88\x99\xaa\xbb\x08\x00"
+    ipv4 = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 40 + payload_size, 0, 0, 64, 6, 0, bytes([10, 0, 0, 1]), bytes([10, 0, 0, 2]))
+    tcp = struct.pack("!HHIIBBHHH", 49152, 443, 0, 0, 0x50, 0x18, 65535, 0, 0)
+    return ethernet + ipv4 + tcp + b"\x00" * payload_size
+
+
+def iter_pcap(size, packet_size=PACKET_SIZE):
+    """Yield a pcap of at least size bytes in blocks of about WRITE_SIZE bytes."""
+
+    frame = _synthetic_frame(packet_size)
+    packets_per_block = max(1, WRITE_SIZE // (16 + packet_size))
+    packet_count = max(1, (size - len(PCAP_GLOBAL_HEADER) + 16 + packet_size - 1) // (16 + packet_size))
+    start = int(time.time()) - packet_count
+
+    yield PCAP_GLOBAL_HEADER
+    for first in range(0, packet_count, packets_per_block):
+        yield b"".join(
+            struct.pack("<IIII", start + index, 0, packet_size, packet_size) + frame
+            for index in range(first, min(first + packets_per_block, packet_count))
+        )
+
+
+def iter_log_json(size):
+    """Yield a JSON log export ({"logs": [...]}) of at least size bytes in blocks of about WRITE_SIZE bytes."""
+
+    start = int(time.time()) - size // EVENT_PADDING
+    padding = "x" * EVENT_PADDING
+    written = 0
+    session_id = 1
+
+    yield b'{"logs": ['
+    while written < size:
+        events = []
+        block_size = 0
+        while block_size < WRITE_SIZE and written + block_size < size:
+            event = json.dumps({"sessionid": session_id, "time": start + session_id, "type": "log", "log": padding})
+            event = event if session_id == 1 else "," + event
+            events.append(event)
+            block_size += len(event)
+            session_id += 1
+        written += block_size
+        yield "".join(events).encode()
+    yield b"]}"
+
+
+class NetWitnessRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle_request()
+
+    def do_POST(self):
+        self._handle_request()
+
+    def _read_body(self):
+        """Read the request body in READ_SIZE blocks. Uploads are only counted (the name of the uploaded file is
+        recorded), other bodies are returned."""
+
+        remaining = int(self.headers.get("Content-Length") or 0)
+        upload = self.path.startswith("/decoder/parsers/upload")
+        body = []
+        first = True
+        while remaining > 0:
+            chunk = self.rfile.read(min(READ_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            self.server.add_stats(bytes_received=len(chunk))
+            if not upload:
+                body.append(chunk)
+            elif first:
+                match = FILE_NAME_PATTERN.search(chunk)
+                if match:
+                    self.server.record_upload(match.group(1).decode(errors="replace"))
+            first = False
+        return b"".join(body).decode(errors="replace")
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        self.server.add_stats(bytes_sent=len(data))
+
+    def _send_stream(self, content_type, blocks):
+        """Send the blocks with chunked transfer encoding, gzip encoded if the server and the client both allow it."""
+
+        compressor = None
+        if self.server.gzip and "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        if compressor:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+
+        for block in blocks:
+            self._write_chunk(compressor.compress(block) if compressor else block)
+        if compressor:
+            self._write_chunk(compressor.flush())
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, data):
+        if data:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.server.add_stats(bytes_sent=len(data))
+
+    def _handle_request(self):
+        url = urllib.parse.urlparse(self.path)
+        body = self._read_body()
+        params = dict(urllib.parse.parse_qsl(body))
+        params.update(urllib.parse.parse_qsl(url.query))
+
+        self.server.add_stats(requests=1)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if url.path == "/sys" and params.get("msg") == "shutdown":
+            self.server.restart()
+        elif self.server.is_down() or self.server.should_fail():
+            self.server.add_stats(errors=1)
+            self._send_json(503, {"error": "Service Unavailable"})
+            return
+
+        if url.path == "/sdk/packets":
+            # a request without a selection (e.g. test connectivity) gets an empty capture
+            size = self.server.payload_size if ("sessions" in params or "time1" in params or "where" in params) else 0
+            if params.get("render") == "pcap":
+                self._send_stream("application/octet-stream", iter_pcap(size) if size else [PCAP_GLOBAL_HEADER])
+            else:
+                self._send_stream("application/json", iter_log_json(size) if size else [b'{"logs": []}'])
+        elif url.path == "/sdk" and params.get("msg") == "query" and params.get("query", "").startswith("select count("):
+            # the count query of the connector's pre-flight estimate: every selection matches the served capture
+            size = self.server.payload_size if " where " in params.get("query", "") else 0
+            fields = [{"type": "count(sessionid)", "value": str(-(-size // PACKET_SIZE))}, {"type": "sum(size)", "value": str(size)}]
+            self._send_json(200, {"flags": 0, "results": {"id1": 0, "id2": 0, "fields": fields}})
+        elif url.path == "/sdk" and params.get("msg") == "query" and params.get("query", "").startswith("select max(sessionid)"):
+            fields = [{"type": "max(sessionid)", "value": str(self.server.session_count)}]
+            self._send_json(200, {"flags": 0, "results": {"id1": 0, "id2": 0, "fields": fields}})
+        elif url.path == "/sdk" and params.get("msg") == "query":
+            fields = self.server.query_fields(params.get("query", ""), int(params.get("size") or 0), int(params.get("id1") or 0))
+            ids = [field["id1"] for field in fields]
+            self._send_json(200, {"flags": 0, "results": {"id1": min(ids, default=0), "id2": max(ids, default=0), "fields": fields}})
+        elif url.path == "/decoder/parsers/upload":
+            self._send_json(200, {"flags": 0, "params": {"uploaded": "1"}})
+        elif url.path == "/decoder/parsers":
+            self._send_json(200, {"nodes": [{"name": name, "value": "loaded"} for name in self.server.uploads]})
+        elif url.path.startswith("/sys"):
+            nodes = [
+                {"name": "version", "value": "11.7.0.0"},
+                {"name": "service", "value": "decoder"},
+                {"name": "running.since", "value": self.server.running_since},
+            ]
+            self._send_json(200, {"nodes": nodes})
+        else:
+            self._send_json(404, {"error": "Not Found"})
+
+
+class NetWitnessStandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, payload_size=0, latency=0.0, error_rate=0.0, gzip=False, seed=None, restart_time=0.0):
+        """
+        :param port: port to listen on (0 picks a free one)
+        :param payload_size: size of the captures served by /sdk/packets, in bytes
+        :param latency: delay of every response, in seconds
+        :param error_rate: fraction of the requests answered with a 503
+        :param gzip: if True, captures are gzip encoded for clients that accept it
+        :param seed: seed of the error rate's random generator
+        :param restart_time: seconds during which every request fails after a shutdown message
+        """
+
+        super().__init__(("127.0.0.1", port), NetWitnessRequestHandler)
+        self.payload_size = payload_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.gzip = gzip
+        self._random = random.Random(seed)
+        self.restart_time = restart_time
+        self._down_until = 0.0
+        self.running_since = time.strftime("%Y-%b-%d %H:%M:%S")
+        self._restart_count = 0
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "bytes_sent": 0, "bytes_received": 0, "restarts": 0}
+        self.uploads = []
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def restart(self):
+        with self._lock:
+            self.stats["restarts"] += 1
+            self._restart_count += 1
+            self._down_until = time.monotonic() + self.restart_time
+            # the start time of the service, which a restart as fast as a request would not change otherwise
+            self.running_since = f"{time.strftime('%Y-%b-%d %H:%M:%S')} ({self._restart_count})"
+
+    def is_down(self):
+        with self._lock:
+            return time.monotonic() < self._down_until
+
+    def should_fail(self):
+        with self._lock:
+            return self.error_rate > 0 and self._random.random() < self.error_rate
+
+    def add_stats(self, **counters):
+        with self._lock:
+            for name, value in counters.items():
+                self.stats[name] += value
+
+    def record_upload(self, file_name):
+        with self._lock:
+            if file_name not in self.uploads:
+                self.uploads.append(file_name)
+
+    @property
+    def session_count(self):
+        """Number of sessions of the stand-in, numbered from 1: as many as the served capture has packets."""
+
+        return -(-self.payload_size // PACKET_SIZE)
+
+    def query_fields(self, query, size=0, id1=0):
+        """Answer a select query of the SDK with the meta of the matching sessions, grouped by session. The where clause
+        only selects sessions with sessionid > N or sessionid=<IDs and ranges>, and time="start"-"end" ranges; anything
+        else matches every session. Every meta value has a fixed meta ID, so that the results can be paged with id1.
+
+        :param query: SDK query, e.g. select sessionid,time where service=443 && sessionid > 100
+        :param size: maximum number of meta values returned, 0 for no limit
+        :param id1: meta ID of the first value returned
+        :return: list of the meta fields, in session order
+        """
+
+        select, _, where = query.partition(" where ")
+        keys = [key.strip() for key in select[len("select ") :].split(",") if key.strip()]
+        session_ids = range(1, self.session_count + 1)
+
+        after = re.search(r"sessionid\s*>\s*(\d+)", where)
+        ranges = re.search(r"sessionid\s*=\s*([\d,-]+)", where)
+        if after:
+            session_ids = range(int(after.group(1)) + 1, self.session_count + 1)
+        elif ranges:
+            selected = set()
+            for part in ranges.group(1).split(","):
+                first, _, last = part.partition("-")
+                selected.update(range(int(first), int(last or first) + 1))
+            session_ids = [session_id for session_id in session_ids if session_id in selected]
+
+        start = int(time.time()) - self.session_count
+        window = re.search(r'time\s*=\s*"([^"]+)"\s*-\s*"([^"]+)"', where)
+        if window:
+            first, last = (calendar.timegm(time.strptime(value, "%Y-%m-%d %H:%M:%S")) for value in window.groups())
+            session_ids = [session_id for session_id in session_ids if first <= start + session_id <= last]
+
+        fields = []
+        for session_id in session_ids:
+            meta = {
+                "sessionid": session_id,
+                "time": start + session_id,
+                "size": PACKET_SIZE,
+                "service": 443,
+                "ip.src": "10.0.0.1",
+                "ip.dst": "10.0.0.2",
+                "ip.proto": 6,
+                "tcp.srcport": 49152,
+                "tcp.dstport": 443,
+            }
+            for index, key in enumerate(keys):
+                meta_id = session_id * 100 + index + 1
+                if key in meta and meta_id >= id1:
+                    fields.append({"id1": meta_id, "type": key, "group": session_id, "value": str(meta[key])})
+            if size and len(fields) >= size:
+                return fields[:size]
+
+        return fields
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = dict.fromkeys(self.stats, 0)
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8050)
+    parser.add_argument("--size-mb", type=float, default=10, help="size of the served captures in MB")
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay of every response in milliseconds")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of the requests answered with a 503")
+    parser.add_argument("--gzip", action="store_true", help="gzip encode captures for clients that accept it")
+    parser.add_argument("--restart-time", type=float, default=0, help="seconds during which the stand-in is down after a restart")
+    args = parser.parse_args()
+
+    server = NetWitnessStandIn(
+        args.port, int(args.size_mb * 1024 * 1024), args.latency_ms / 1000, args.error_rate, args.gzip, restart_time=args.restart_time
+    )
+    print(f"Serving the NetWitness stand-in on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
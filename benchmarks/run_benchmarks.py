@@ -0,0 +1,259 @@
+# File: run_benchmarks.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""Replay benchmarks of the connector's get pcap, get log, upload file and on poll actions against a local NetWitness stand-in.
+
+Each run executes one action in a fresh Python process, with the stand-in SOAR modules of benchmarks/stubs, against the
+stand-in server of mock_server.py, and reports its wall time, peak RSS and payload bytes per second. For example:
+
+    python benchmarks/run_benchmarks.py --size-mb 200 --repeat 3 --output bench_output.txt
+    python benchmarks/run_benchmarks.py --actions get_log --param output_format=ndjson --config compression=gzip
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+STUBS_DIR = os.path.join(BENCHMARKS_DIR, "stubs")
+APP_DIR = os.path.dirname(BENCHMARKS_DIR)
+
+ACTIONS = {
+    "get_pcap": {"identifier": "get_pcap", "parameters": {"session_ids": "1-1000000"}, "bytes": "bytes_written"},
+    "get_log": {"identifier": "get_log_capture", "parameters": {"session_ids": "1-1000000"}, "bytes": "bytes_written"},
+    "upload_file": {"identifier": "upload_file", "parameters": {}, "bytes": "bytes_sent"},
+    "on_poll": {
+        "identifier": "on_poll",
+        "parameters": {"container_count": 1000, "artifact_count": 100},
+        "config": {"poll_query": "service=443"},
+        "bytes": "bytes_written",
+    },
+}
+
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
+
+def _peak_rss():
+    """Return the peak resident set size of this process in bytes (ru_maxrss is in KB on Linux, in bytes on macOS)."""
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def _parse_pairs(pairs):
+    """Parse key=value arguments into a dictionary, converting JSON scalars (numbers, booleans)."""
+
+    parsed = {}
+    for pair in pairs or []:
+        key, _, value = pair.partition("=")
+        try:
+            parsed[key] = json.loads(value)
+        except ValueError:
+            parsed[key] = value
+    return parsed
+
+
+def _add_upload_file(size):
+    """Add a parser file of the given size to the stand-in vault and return its vault ID."""
+
+    import phantom.rules as ph_rules
+    from phantom.vault import Vault
+
+    file_path = os.path.join(Vault.get_vault_tmp_dir(), "benchmark_parser.lua")
+    block = os.urandom(UPLOAD_BLOCK_SIZE)
+    with open(file_path, "wb") as f:
+        for offset in range(0, size, UPLOAD_BLOCK_SIZE):
+            f.write(block[: size - offset])
+
+    _, _, vault_id = ph_rules.vault_add(container=1, file_location=file_path, file_name="benchmark_parser.lua")
+    return vault_id
+
+
+def run_action(action, url, size, config, parameters):
+    """Run one action in this process and return its measurements. Called in the child process of each run."""
+
+    sys.path[:0] = [STUBS_DIR, APP_DIR]
+    from netwitness_connector import NetWitnessConnector
+
+    spec = ACTIONS[action]
+    parameters = dict(spec["parameters"], **parameters)
+    if action == "upload_file":
+        parameters["vault_id"] = _add_upload_file(size)
+
+    in_json = {
+        "identifier": spec["identifier"],
+        "config": dict(
+            {"url": url, "username": "admin", "password": "netwitness", "verify_server_cert": False}, **spec.get("config", {}), **config
+        ),
+        "parameters": [parameters],
+    }
+
+    connector = NetWitnessConnector()
+    baseline_rss = _peak_rss()
+    start = time.perf_counter()
+    action_result = json.loads(connector._handle_action(json.dumps(in_json), None))[0]
+    wall_time = time.perf_counter() - start
+
+    performance = action_result["summary"].get("performance", {})
+    payload_bytes = performance.get(spec["bytes"], 0)
+    return {
+        "action": action,
+        "status": action_result["status"],
+        "message": action_result["message"],
+        "wall_time": round(wall_time, 3),
+        "baseline_rss": baseline_rss,
+        "peak_rss": _peak_rss(),
+        "bytes": payload_bytes,
+        "bytes_per_second": round(payload_bytes / wall_time) if wall_time else 0,
+        "performance": performance,
+    }
+
+
+def _run_child(args, action):
+    """Run one action in a fresh process, so that its peak RSS is not inflated by earlier runs or by the server."""
+
+    command = [sys.executable, os.path.abspath(__file__), "--child", action, "--url", args.url, "--size-mb", str(args.size_mb)]
+    for option, pairs in (("--config", args.config), ("--param", args.param)):
+        for pair in pairs or []:
+            command += [option, pair]
+
+    process = subprocess.run(command, capture_output=True, text=True, check=False)
+    if process.returncode:
+        error = process.stderr.strip().splitlines() or [f"exit status {process.returncode}"]
+        return {"action": action, "status": "failed", "message": error[-1], "bytes": 0}
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def _summarize(action, runs, server_stats):
+    """Aggregate the runs of an action: median wall time and throughput, highest peak RSS."""
+
+    succeeded = [run for run in runs if run["status"] == "success"]
+    summary = {"action": action, "runs": len(runs), "succeeded": len(succeeded), "server": server_stats}
+    if succeeded:
+        summary.update(
+            {
+                "wall_time": statistics.median(run["wall_time"] for run in succeeded),
+                "peak_rss": max(run["peak_rss"] for run in succeeded),
+                "peak_rss_delta": max(run["peak_rss"] - run["baseline_rss"] for run in succeeded),
+                "bytes": succeeded[0]["bytes"],
+                "bytes_per_second": statistics.median(run["bytes_per_second"] for run in succeeded),
+            }
+        )
+    failures = {" ".join(run["message"].split()) for run in runs if run["status"] != "success"}
+    if failures:
+        summary["failures"] = sorted(failures)
+    return summary
+
+
+def _format_report(args, summaries):
+    megabyte = 1024 * 1024
+    lines = [
+        f"NetWitness connector benchmarks: {args.size_mb} MB payloads, {args.latency_ms} ms latency, "
+        f"{args.error_rate:.0%} error rate, {args.repeat} run(s), config {_parse_pairs(args.config)}, "
+        f"parameters {_parse_pairs(args.param)}",
+        "",
+        f"{'action':<12} {'ok':>5} {'wall (s)':>9} {'peak RSS (MB)':>14} {'RSS delta (MB)':>15} {'MB/s':>9} {'requests':>9}",
+    ]
+    for summary in summaries:
+        ok = f"{summary['succeeded']}/{summary['runs']}"
+        if summary["succeeded"]:
+            lines.append(
+                f"{summary['action']:<12} {ok:>5} {summary['wall_time']:>9.3f} {summary['peak_rss'] / megabyte:>14.1f} "
+                f"{summary['peak_rss_delta'] / megabyte:>15.1f} {summary['bytes_per_second'] / megabyte:>9.1f} "
+                f"{summary['server']['requests']:>9}"
+            )
+        else:
+            lines.append(f"{summary['action']:<12} {ok:>5} {'-':>9} {'-':>14} {'-':>15} {'-':>9} {summary['server']['requests']:>9}")
+        lines.extend(f"{'':<12} failed: {failure}" for failure in summary.get("failures", []))
+    return "\n".join(lines)
+
+
+def _check_thresholds(args, summaries):
+    """Return the threshold violations of the summaries, so that the runner can fail a release check."""
+
+    megabyte = 1024 * 1024
+    violations = []
+    for summary in summaries:
+        if summary["succeeded"] < summary["runs"] and not args.error_rate:
+            violations.append(f"{summary['action']}: {summary['runs'] - summary['succeeded']} run(s) failed")
+        if not summary["succeeded"]:
+            continue
+        if args.max_rss_mb and summary["peak_rss"] > args.max_rss_mb * megabyte:
+            violations.append(f"{summary['action']}: peak RSS {summary['peak_rss'] / megabyte:.1f} MB exceeds {args.max_rss_mb} MB")
+        if args.min_mbps and summary["bytes_per_second"] < args.min_mbps * megabyte:
+            violations.append(f"{summary['action']}: {summary['bytes_per_second'] / megabyte:.1f} MB/s is below {args.min_mbps} MB/s")
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--actions", default=",".join(ACTIONS), help=f"comma-separated actions to run, among {', '.join(ACTIONS)}")
+    parser.add_argument("--size-mb", type=float, default=50, help="size of the served captures and of the uploaded file in MB")
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay of every response of the stand-in in milliseconds")
+    parser.add_argument("--error-rate", type=float, default=0, help="fraction of the requests the stand-in answers with a 503")
+    parser.add_argument("--gzip", action="store_true", help="let the stand-in gzip encode captures for clients that accept it")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs of each action")
+    parser.add_argument("--config", action="append", metavar="KEY=VALUE", help="asset configuration, e.g. compression=gzip")
+    parser.add_argument("--param", action="append", metavar="KEY=VALUE", help="action parameter, e.g. shard_count=4")
+    parser.add_argument("--seed", type=int, help="seed of the stand-in's error rate")
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--json", action="store_true", help="print the summaries as JSON instead of a table")
+    parser.add_argument("--max-rss-mb", type=float, help="exit with 1 if an action's peak RSS exceeds this many MB")
+    parser.add_argument("--min-mbps", type=float, help="exit with 1 if an action's throughput is below this many MB/s")
+    parser.add_argument("--child", choices=list(ACTIONS), help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_action(args.child, args.url, int(args.size_mb * 1024 * 1024), _parse_pairs(args.config), _parse_pairs(args.param))
+        print(json.dumps(result))
+        return 0
+
+    from mock_server import NetWitnessStandIn
+
+    server = NetWitnessStandIn(0, int(args.size_mb * 1024 * 1024), args.latency_ms / 1000, args.error_rate, args.gzip, args.seed).start()
+    args.url = server.url
+
+    summaries = []
+    try:
+        for action in [action.strip() for action in args.actions.split(",") if action.strip()]:
+            if action not in ACTIONS:
+                parser.error(f"unknown action {action}")
+            server.reset_stats()
+            runs = [_run_child(args, action) for _ in range(args.repeat)]
+            summaries.append(_summarize(action, runs, dict(server.stats)))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    report = json.dumps(summaries, indent=4) if args.json else _format_report(args, summaries)
+    print(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+
+    violations = _check_thresholds(args, summaries)
+    for violation in violations:
+        print(f"FAILED {violation}", file=sys.stderr)
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+# File: app.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""Stand-in of phantom.app: just enough of BaseConnector and ActionResult to run the connector's actions outside SOAR."""
+
+import json
+import sys
+import tempfile
+
+
+APP_SUCCESS = True
+APP_ERROR = False
+
+APP_JSON_ACTION_NAME = "action_name"
+APP_JSON_APP_RUN_ID = "app_run_id"
+APP_JSON_ARTIFACT_COUNT = "artifact_count"
+APP_JSON_CONTAINER_COUNT = "container_count"
+APP_JSON_CONTAINS = "contains"
+APP_JSON_SIZE = "size"
+APP_JSON_TYPE = "type"
+APP_JSON_VAULT_ID = "vault_id"
+APP_PROG_ADDING_TO_VAULT = "Adding file to vault"
+
+
+def is_fail(value):
+    return not value
+
+
+def is_success(value):
+    return bool(value)
+
+
+class ActionResult:
+    def __init__(self, param=None):
+        self._param = param or {}
+        self._status = APP_ERROR
+        self._message = ""
+        self._data = []
+        self._summary = {}
+
+    def set_status(self, status_code, status_message="", exception=None, **format_args):
+        self._status = status_code
+        self._message = status_message.format(**format_args) if format_args else status_message
+        if exception:
+            self._message = f"{self._message} {exception}".strip()
+        return status_code
+
+    def get_status(self):
+        return self._status
+
+    def get_message(self):
+        return self._message
+
+    def append_to_message(self, message):
+        self._message += message
+
+    def add_data(self, data):
+        self._data.append(data)
+        return data
+
+    def get_data(self):
+        return self._data
+
+    def update_summary(self, summary):
+        self._summary.update(summary)
+        return self._summary
+
+    def set_summary(self, summary):
+        self._summary = summary
+        return summary
+
+    def get_summary(self):
+        return self._summary
+
+    def add_debug_data(self, data):
+        pass
+
+    def get_dict(self):
+        return {
+            "status": "success" if self._status else "failed",
+            "message": self._message,
+            "parameter": self._param,
+            "data": self._data,
+            "summary": self._summary,
+        }
+
+
+class BaseConnector:
+    def __init__(self):
+        self._config = {}
+        self._action_identifier = None
+        self._action_results = []
+        self._state = {}
+        self._state_dir = tempfile.mkdtemp(prefix="netwitness_state_")
+        self._status = APP_SUCCESS
+        self._container_id = 1
+        self.containers = []
+        self.artifacts = []
+        self.print_progress_message = False
+
+    def _handle_action(self, in_json, handle):
+        """Run the action described by in_json the way the platform does: initialize, handle_action once per
+        parameter dictionary, finalize. Returns the action results as a JSON string."""
+
+        in_json = json.loads(in_json)
+        self._config = in_json.get("config", {})
+        self._action_identifier = in_json.get("identifier")
+        self._action_results = []
+
+        if is_success(self.initialize()):
+            for param in in_json.get("parameters", [{}]):
+                self.handle_action(param)
+        self.finalize()
+
+        return json.dumps([action_result.get_dict() for action_result in self._action_results])
+
+    def get_config(self):
+        return self._config
+
+    def get_action_identifier(self):
+        return self._action_identifier
+
+    def get_action_name(self):
+        return self._action_identifier.replace("_", " ") if self._action_identifier else None
+
+    def get_app_run_id(self):
+        return 1
+
+    def get_container_id(self):
+        return self._container_id
+
+    def get_asset_id(self):
+        return "benchmark"
+
+    def get_state_dir(self):
+        return self._state_dir
+
+    # the platform keeps the state in a file, so every load returns a new copy of it
+    def load_state(self):
+        return json.loads(json.dumps(self._state))
+
+    def save_state(self, state):
+        self._state = json.loads(json.dumps(state))
+
+    def add_action_result(self, action_result):
+        self._action_results.append(action_result)
+        return action_result
+
+    def get_action_results(self):
+        return self._action_results
+
+    def set_validator(self, contains, validator):
+        pass
+
+    def set_status(self, status_code, status_message="", exception=None, **format_args):
+        self._status = status_code
+        return status_code
+
+    def get_status(self):
+        return self._status
+
+    def is_poll_now(self):
+        return False
+
+    def save_container(self, container):
+        # containers are deduplicated by source data identifier, as the platform does
+        for container_id, saved in enumerate(self.containers, 2):
+            if saved["source_data_identifier"] == container.get("source_data_identifier"):
+                return APP_SUCCESS, "Duplicate container found", container_id
+        self.containers.append(container)
+        return APP_SUCCESS, "Container created", len(self.containers) + 1
+
+    def save_artifacts(self, artifacts):
+        self.artifacts.extend(artifacts)
+        return APP_SUCCESS, "Artifacts created", list(range(len(self.artifacts) - len(artifacts) + 1, len(self.artifacts) + 1))
+
+    def save_progress(self, progress_str_const, *unnamed_format_args, **named_format_args):
+        self.send_progress(progress_str_const, *unnamed_format_args, **named_format_args)
+
+    def send_progress(self, progress_str_const, *unnamed_format_args, **named_format_args):
+        if self.print_progress_message:
+            print(progress_str_const, file=sys.stderr)
+
+    def debug_print(self, tag, dump_object=""):
+        if self.print_progress_message:
+            print(tag, dump_object, file=sys.stderr)
+
+    def error_print(self, tag, dump_object=""):
+        print(tag, dump_object, file=sys.stderr)
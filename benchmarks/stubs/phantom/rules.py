@@ -0,0 +1,62 @@
+# File: rules.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""Stand-in of phantom.rules: an in-memory vault whose files are kept in a temporary directory."""
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+
+_vault_dir = tempfile.mkdtemp(prefix="netwitness_vault_")
+_vault = []
+
+
+def _file_hash(file_path, algorithm):
+    file_hash = hashlib.new(algorithm)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def vault_add(container=None, file_location=None, file_name=None, metadata=None, trace=False):
+    vault_id = _file_hash(file_location, "sha1")
+    path = os.path.join(_vault_dir, vault_id)
+    shutil.move(file_location, path)
+    _vault.append(
+        {
+            "container": container,
+            "vault_id": vault_id,
+            "name": file_name,
+            "path": path,
+            "size": os.path.getsize(path),
+            "metadata": dict(metadata or {}, sha1=vault_id, sha256=_file_hash(path, "sha256")),
+        }
+    )
+    return True, "Success", vault_id
+
+
+def vault_info(vault_id=None, file_name=None, container_id=None, remove_cache=False, trace=False):
+    info = [
+        item
+        for item in _vault
+        if (vault_id is None or item["vault_id"] == vault_id)
+        and (file_name is None or item["name"] == file_name)
+        and (container_id is None or item["container"] == container_id)
+    ]
+    if not info:
+        return False, "No files found", []
+    return True, "Success", info
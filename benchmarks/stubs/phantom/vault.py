@@ -0,0 +1,27 @@
+# File: vault.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+"""Stand-in of phantom.vault: a temporary directory as vault staging area."""
+
+import tempfile
+
+
+class Vault:
+    _tmp_dir = None
+
+    @classmethod
+    def get_vault_tmp_dir(cls):
+        if cls._tmp_dir is None:
+            cls._tmp_dir = tempfile.mkdtemp(prefix="netwitness_vault_tmp_")
+        return cls._tmp_dir
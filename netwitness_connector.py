@@ -12,24 +12,56 @@
 # the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
 # either express or implied. See the License for the specific language governing permissions
 # and limitations under the License.
+import copy
 import hashlib
 import json
+import math
 import os
 import re
 import shutil
-import signal
 import sys
 import tempfile
-import uuid
-from datetime import datetime
+import threading
+import time
+from collections import OrderedDict
+from contextlib import ExitStack
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
 
 # Phantom imports
+# phantom.rules and phantom.vault are slow to import, so the methods that use the vault import them when they run
 import phantom.app as phantom
-import phantom.rules as ph_rules
 import requests
 
 # Local imports
 import netwitness_consts as consts
+from netwitness_utils import (
+    CaptureCache,
+    CompressingWriter,
+    ConcurrencyLimiter,
+    ContentDecoder,
+    DecodingError,
+    MultipartFileEncoder,
+    PcapFilter,
+    PerfRecorder,
+    RetryPolicy,
+    SessionIdSet,
+    build_estimate_query,
+    capture_cache_key,
+    compress_file,
+    format_epoch_time,
+    group_query_results,
+    iter_json_strings,
+    locked_file,
+    merge_json_files,
+    merge_pcap_files,
+    parse_query_estimate,
+    parse_retry_after,
+    parse_status_nodes,
+    process_pcap,
+    split_time_window,
+    write_ndjson,
+)
 
 
 error_resp_dict = {
@@ -39,11 +71,11 @@ error_resp_dict = {
 }
 
 
-def timeout_handler(signum, frame):
-    raise Timeout()
+class Timeout(Exception):
+    pass
 
 
-class Timeout(Exception):
+class Cancelled(Exception):
     pass
 
 
@@ -56,8 +88,25 @@ class NetWitnessConnector(phantom.BaseConnector):
         # Call the BaseConnector's init first
         super().__init__()
         self._base_url = None
+        self._base_urls = []
         self._api_username = None
         self._api_password = None
+        self._session = None
+        self._cache = None
+        self._compression = None
+        self._retry_policy = None
+        self._preflight = True
+        self._auto_shard_size = None
+        self._max_capture_size = None
+        self._limiters = {}
+        self._probe_ttl = consts.NETWITNESS_DEFAULT_PROBE_TTL
+        self._down_appliances = {}
+        self._capabilities = {}
+        self._perf = PerfRecorder()
+        self._state = {}
+        self._loaded_state = {}
+        self._vault_index = OrderedDict()
+        self._vault_index_lock = threading.Lock()
         return
 
     def initialize(self):
@@ -68,24 +117,241 @@ class NetWitnessConnector(phantom.BaseConnector):
         called.
         """
 
+        self._perf = PerfRecorder()
+
         config = self.get_config()
 
+        self._state = self.load_state()
+        if not isinstance(self._state, dict):
+            self._state = {}
+        self._loaded_state = copy.deepcopy(self._state)
+        # the vault index used to be kept in the app state, where it went stale
+        self._state.pop(consts.NETWITNESS_STATE_VAULT_INDEX, None)
+
         # Initialize parameters
         self._verify = config.get(consts.NETWITNESS_CONFIG_VERIFY, True)
-        self._base_url = config[consts.NETWITNESS_CONFIG_SERVER].strip("/")
+        # the url may list several appliances, which capture actions query concurrently; the first one is the primary
+        self._base_urls = list(
+            dict.fromkeys(url.strip().strip("/") for url in config[consts.NETWITNESS_CONFIG_SERVER].split(",") if url.strip())
+        )
+        if not self._base_urls:
+            return self.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_NO_URL)
+        self._base_url = self._base_urls[0]
         self._api_username = config[consts.NETWITNESS_CONFIG_API_USERNAME]
         self._api_password = config[consts.NETWITNESS_CONFIG_API_PASSWORD]
 
+        ret_val, pool_size = self._validate_integer(
+            self, config.get(consts.NETWITNESS_CONFIG_POOL_SIZE, consts.NETWITNESS_DEFAULT_POOL_SIZE), consts.NETWITNESS_CONFIG_POOL_SIZE
+        )
+        if phantom.is_fail(ret_val):
+            return self.get_status()
+
+        self._session = self._create_session(pool_size)
+        self._limiters = {base_url: ConcurrencyLimiter(pool_size) for base_url in self._base_urls}
+        self._down_appliances = {}
+        self._capabilities = {}
+
+        ret_val, max_retries = self._validate_integer(
+            self,
+            config.get(consts.NETWITNESS_CONFIG_MAX_RETRIES, consts.NETWITNESS_DEFAULT_MAX_RETRIES),
+            consts.NETWITNESS_CONFIG_MAX_RETRIES,
+            True,
+        )
+        if phantom.is_fail(ret_val):
+            return self.get_status()
+
+        ret_val, retry_budget = self._validate_integer(
+            self,
+            config.get(consts.NETWITNESS_CONFIG_RETRY_BUDGET, consts.NETWITNESS_DEFAULT_RETRY_BUDGET),
+            consts.NETWITNESS_CONFIG_RETRY_BUDGET,
+            True,
+        )
+        if phantom.is_fail(ret_val):
+            return self.get_status()
+
+        self._retry_policy = RetryPolicy(max_retries, retry_budget)
+
+        # connect, first byte, idle stall and total transfer budgets (in seconds) of a request
+        for key, default in (
+            (consts.NETWITNESS_CONFIG_CONNECT_TIMEOUT, consts.NETWITNESS_DEFAULT_CONNECT_TIMEOUT),
+            (consts.NETWITNESS_CONFIG_READ_TIMEOUT, consts.NETWITNESS_DEFAULT_REST_TIMEOUT),
+            (consts.NETWITNESS_CONFIG_IDLE_TIMEOUT, consts.NETWITNESS_DEFAULT_IDLE_TIMEOUT),
+            (consts.NETWITNESS_CONFIG_TRANSFER_TIMEOUT, consts.NETWITNESS_DEFAULT_TRANSFER_TIMEOUT),
+        ):
+            ret_val, value = self._validate_integer(self, config.get(key, default), key)
+            if phantom.is_fail(ret_val):
+                return self.get_status()
+            setattr(self, f"_{key}", value)
+
+        ret_val, cache_size = self._validate_integer(
+            self, config.get(consts.NETWITNESS_CONFIG_CACHE_SIZE, 0), consts.NETWITNESS_CONFIG_CACHE_SIZE, True
+        )
+        if phantom.is_fail(ret_val):
+            return self.get_status()
+
+        ret_val, cache_ttl = self._validate_integer(
+            self, config.get(consts.NETWITNESS_CONFIG_CACHE_TTL, consts.NETWITNESS_DEFAULT_CACHE_TTL), consts.NETWITNESS_CONFIG_CACHE_TTL
+        )
+        if phantom.is_fail(ret_val):
+            return self.get_status()
+
+        # captures are estimated before they are fetched, to pick a fetch strategy (sizes in MB, 0 disables)
+        self._preflight = config.get(consts.NETWITNESS_CONFIG_PREFLIGHT, True)
+        for key, default in (
+            (consts.NETWITNESS_CONFIG_AUTO_SHARD_SIZE, consts.NETWITNESS_DEFAULT_AUTO_SHARD_SIZE),
+            (consts.NETWITNESS_CONFIG_MAX_CAPTURE_SIZE, 0),
+        ):
+            ret_val, value = self._validate_integer(self, config.get(key, default), key, True)
+            if phantom.is_fail(ret_val):
+                return self.get_status()
+            setattr(self, f"_{key}", value)
+
+        ret_val, self._probe_ttl = self._validate_integer(
+            self, config.get(consts.NETWITNESS_CONFIG_PROBE_TTL, consts.NETWITNESS_DEFAULT_PROBE_TTL), consts.NETWITNESS_CONFIG_PROBE_TTL, True
+        )
+        if phantom.is_fail(ret_val):
+            return self.get_status()
+
+        if cache_size:
+            try:
+                self._cache = CaptureCache(os.path.join(self.get_state_dir(), consts.NETWITNESS_CACHE_DIR), cache_size * 1024 * 1024, cache_ttl)
+            except Exception as e:
+                self.debug_print(consts.NETWITNESS_ERR_CACHE, e)
+
+        compression = config.get(consts.NETWITNESS_CONFIG_COMPRESSION, consts.NETWITNESS_COMPRESSION_NONE)
+        if compression != consts.NETWITNESS_COMPRESSION_NONE and compression not in consts.NETWITNESS_COMPRESSION_EXTENSIONS:
+            return self.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_COMPRESSION_CODEC)
+        self._compression = compression if compression != consts.NETWITNESS_COMPRESSION_NONE else None
+
         self.set_validator("netwitness session ids", self._verify_session_ids)
 
         return phantom.APP_SUCCESS
 
+    def finalize(self):
+        """Report the performance of the action, save the app state and release the pooled connections once the action
+        is complete."""
+
+        report = self._get_performance_report()
+        self.debug_print(consts.NETWITNESS_PERFORMANCE.format(report=json.dumps(report, sort_keys=True)))
+        for action_result in self.get_action_results():
+            action_result.update_summary({"performance": report})
+
+        self._save_state()
+
+        if self._session:
+            self._session.close()
+            self._session = None
+
+        return phantom.APP_SUCCESS
+
+    def _save_state(self):
+        """Save the entries of the app state that the action changed. Every action of the asset loads the state when it
+        starts and the actions run concurrently, so the state is loaded again and the changes of the action are written
+        over it, one appliance (or container) at a time: an action that ran alongside a poll does not roll the poll
+        watermarks back, and two actions probing different appliances keep both probes."""
+
+        state = self.load_state()
+        if not isinstance(state, dict):
+            state = {}
+
+        missing = object()
+        for key in set(self._state) | set(self._loaded_state):
+            value, loaded = self._state.get(key, missing), self._loaded_state.get(key, missing)
+            if value == loaded:
+                continue
+            # an entry created by the action may have been created by a concurrent one too
+            if loaded is missing and isinstance(value, dict):
+                loaded = {}
+            if isinstance(value, dict) and isinstance(loaded, dict) and isinstance(state.get(key), dict):
+                for item in set(value) | set(loaded):
+                    if value.get(item, missing) == loaded.get(item, missing):
+                        continue
+                    if item in value:
+                        state[key][item] = value[item]
+                    else:
+                        state[key].pop(item, None)
+            elif value is missing:
+                state.pop(key, None)
+            else:
+                state[key] = value
+
+        self.save_state(state)
+
+    def _get_performance_report(self):
+        """Return the timings and counters of the action, with the download throughput in bytes per second (bytes
+        received from the device over the wall time spent fetching captures) and the upload throughput.
+
+        :return: dictionary of the performance report
+        """
+
+        report = self._perf.report()
+        report.setdefault("retries", 0)
+
+        fetch_seconds = self._perf.seconds("fetch")
+        if report.get("bytes_received") and fetch_seconds:
+            report["throughput_bps"] = int(report["bytes_received"] / fetch_seconds)
+
+        upload_seconds = self._perf.seconds("upload")
+        if report.get("bytes_sent") and upload_seconds:
+            report["upload_throughput_bps"] = int(report["bytes_sent"] / upload_seconds)
+
+        return report
+
+    def _create_session(self, pool_size):
+        """Create the HTTP session shared by every REST call of the action. Connections to the device are kept alive
+        and reused (along with their TLS session) instead of being re-established for every request.
+
+        :param pool_size: maximum number of connections kept open to each appliance
+        :return: requests.Session object
+        """
+
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        session.auth = (self._api_username, self._api_password)
+        session.verify = self._verify
+
+        # block instead of opening throwaway connections when more threads than pooled connections make requests
+        adapter = HTTPAdapter(pool_connections=max(1, len(self._base_urls)), pool_maxsize=pool_size, pool_block=True)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+        return session
+
     def _verify_session_ids(self, param):
-        """This function validates the session_ids parameter. It makes sure it is a list of IDs or an ID range"""
+        """This function validates the session_ids parameter. It makes sure it is a list of IDs and ID ranges"""
+
+        try:
+            SessionIdSet(param)
+        except ValueError:
+            return False
+
+        return True
 
-        match = re.match("^ *[0-9]+ *(, *[0-9]+ *)*$|^ *[0-9]+ *- *[0-9]+ *$", param)
+    def _validate_integer(self, action_result, parameter, key, allow_zero=False):
+        """Validate that a parameter is a non-negative integer.
 
-        return bool(match)
+        :param action_result: object of ActionResult class
+        :param parameter: value of the parameter
+        :param key: name of the parameter
+        :param allow_zero: whether zero is a valid value
+        :return: status success/failure and the integer value of the parameter
+        """
+
+        if parameter is not None:
+            try:
+                if not float(parameter).is_integer():
+                    return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_INVALID_INT.format(param=key)), None
+                parameter = int(parameter)
+            except Exception:
+                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_INVALID_INT.format(param=key)), None
+
+            if parameter < 0:
+                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_NEGATIVE_INT.format(param=key)), None
+            if not allow_zero and parameter == 0:
+                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_ZERO_INT.format(param=key)), None
+
+        return phantom.APP_SUCCESS, parameter
 
     def _get_error_message_from_exception(self, e):
         """
@@ -116,43 +382,118 @@ class NetWitnessConnector(phantom.BaseConnector):
 
         return error_text
 
-    def _make_rest_call(self, action_result, endpoint=None, data=None, method="get", files=None, timeout=consts.NETWITNESS_DEFAULT_REST_TIMEOUT):
+    def _make_rest_call(
+        self,
+        action_result,
+        endpoint=None,
+        data=None,
+        method="get",
+        files=None,
+        timeout=None,
+        stream=False,
+        cancel_event=None,
+        headers=None,
+        base_url=None,
+        retry=True,
+    ):
         """Function that makes the REST call to the device. It's a generic function that can be called from various
-        action handlers.
+        action handlers. It is safe to call from worker threads.
+
+        Connection errors and the statuses of an overloaded device are retried with exponential backoff and jitter (or
+        after the device's Retry-After), within the retry budget of the action. Such failures also lower the number
+        of requests sent in parallel, which recovers as requests succeed.
 
         :param action_result: object of ActionResult class
         :param endpoint: REST endpoint that needs to appended to the base url
         :param data: request body
         :param method: get/post/put/delete
+        :param timeout: seconds to wait for the first byte of the response, defaults to the configured read timeout
+        :param stream: if True, the response body is not read here and must be consumed (and closed) by the caller
+        :param cancel_event: threading.Event that, once set, stops the request from being sent
+        :param headers: additional request headers
+        :param base_url: URL of the appliance to call, defaults to the primary appliance
+        :param retry: if False, failures are returned without being retried
         :return: status success/failure(along with appropriate message) and response obtained by making an API call
         """
 
-        api_url = f"{self._base_url}{endpoint}" if endpoint else self._base_url
+        base_url = base_url or self._base_url
+        api_url = f"{base_url}{endpoint}" if endpoint else base_url
+        limiter = self._limiters[base_url]
+        if base_url in self._down_appliances:
+            return action_result.set_status(phantom.APP_ERROR, self._down_appliances[base_url]), None
         if files is None:
             files = {}
 
-        signal.signal(signal.SIGALRM, timeout_handler)
-        signal.alarm(timeout)
+        kwargs = {
+            "data": data,
+            "files": files,
+            "headers": headers,
+            "stream": stream,
+            "timeout": (self._connect_timeout, timeout or self._read_timeout),
+        }
+
+        # Make the call, retrying connection errors and overload statuses
+        attempt = 0
+        while True:
+            if cancel_event and cancel_event.is_set():
+                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_CANCELLED), None
 
-        # Make the call
-        try:
-            kwargs = {"auth": (self._api_username, self._api_password), "data": data, "verify": self._verify, "files": files}
-            rest_resp = requests.request(method, api_url, **kwargs)  # nosemgrep: python.requests.best-practice.use-timeout.use-timeout
-        except Timeout:
+            rest_resp = error = None
+            try:
+                with limiter, self._perf.span("request"):
+                    rest_resp = self._session.request(method, api_url, **kwargs)
+            except Exception as e:
+                error = e
+
+            if not self._is_retryable(rest_resp, error):
+                if rest_resp is not None:
+                    limiter.success()
+                break
+
+            if not retry:
+                break
+
+            if limiter.failure():
+                self._perf.count("concurrency_reductions")
+                self.debug_print(consts.NETWITNESS_CONCURRENCY_LIMIT.format(limit=limiter.limit, url=base_url))
+
+            if not self._retry_policy.acquire(attempt) or not self._rewind_files(files):
+                break
+
+            retry_after = parse_retry_after(rest_resp.headers.get("Retry-After")) if rest_resp is not None else None
+            delay = self._retry_policy.delay(attempt, retry_after)
+            reason = error if error is not None else f"status code {rest_resp.status_code}"
+            self.debug_print(consts.NETWITNESS_REQUEST_RETRY.format(attempt=attempt + 1, delay=delay, reason=reason))
+            if rest_resp is not None:
+                rest_resp.close()
+
+            self._perf.count("retries")
+            with self._perf.span("backoff"):
+                if cancel_event:
+                    cancel_event.wait(delay)
+                else:
+                    time.sleep(delay)
+            attempt += 1
+
+        # the next action probes an appliance that could not be reached, instead of trusting its cached capabilities
+        if error is not None:
+            self._state.get(consts.NETWITNESS_STATE_CAPABILITIES, {}).pop(base_url, None)
+
+        if isinstance(error, requests.exceptions.Timeout) or "Connection timed out" in str(error or ""):
+            self.error_print(consts.NETWITNESS_ERR_TIMEOUT, error)
             return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_TIMEOUT), None
-        except Exception as e:
-            if "Connection timed out" in str(e):
-                self.error_print(consts.NETWITNESS_ERR_TIMEOUT, e)
-                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_TIMEOUT), None
-            self.error_print(consts.NETWITNESS_ERR_SERVER_CONNECTION, e)
-            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_SERVER_CONNECTION, e), None
-        finally:
-            signal.alarm(0)
+        if error is not None:
+            self.error_print(consts.NETWITNESS_ERR_SERVER_CONNECTION, error)
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_SERVER_CONNECTION, error), None
 
-        # store the response text in debug data, it will get dumped in the logs if an error occurs
+        # elapsed stops when the response headers are parsed
+        self._perf.timing("ttfb", rest_resp.elapsed.total_seconds())
+
+        # a successful streamed body is left untouched so that the caller can read it in chunks
         if hasattr(action_result, "add_debug_data"):
             action_result.add_debug_data({"r_status_code": rest_resp.status_code})
-            action_result.add_debug_data({"r_text": rest_resp.text})
+            if not stream or rest_resp.status_code not in consts.NETWITNESS_REST_RESP_SUCC_CODES:
+                action_result.add_debug_data({"r_text": rest_resp.text})
             action_result.add_debug_data({"r_headers": rest_resp.headers})
 
         if rest_resp.status_code in error_resp_dict:
@@ -169,7 +510,7 @@ class NetWitnessConnector(phantom.BaseConnector):
                 rest_resp,
             )
 
-        if rest_resp.status_code == consts.NETWITNESS_REST_RESP_SUCC:
+        if rest_resp.status_code in consts.NETWITNESS_REST_RESP_SUCC_CODES:
             return phantom.APP_SUCCESS, rest_resp
 
         # All other rest_resp codes from Rest call are errors
@@ -183,6 +524,40 @@ class NetWitnessConnector(phantom.BaseConnector):
             rest_resp,
         )
 
+    def _is_retryable(self, rest_resp, error):
+        """Return whether a request may be retried: connection errors (refused or reset connections, connect timeouts)
+        and the statuses of an overloaded device. A read timeout is not retried, as it means that the query itself is
+        too slow for the device, and neither are certificate and proxy errors, which fail the same way every time.
+
+        :param rest_resp: response of the request, or None if it raised an exception
+        :param error: exception raised by the request, or None
+        :return: True if the request may be retried
+        """
+
+        if error is not None:
+            # both are subclasses of ConnectionError
+            if isinstance(error, (requests.exceptions.SSLError, requests.exceptions.ProxyError)):
+                return False
+            return isinstance(error, requests.exceptions.ConnectionError)
+        return rest_resp.status_code in consts.NETWITNESS_RETRY_STATUS_CODES
+
+    def _rewind_files(self, files):
+        """Rewind the files of a multipart request before it is sent again.
+
+        :param files: files of the request, as passed to requests
+        :return: False if a file cannot be rewound, in which case the request must not be retried
+        """
+
+        for value in files.values():
+            file_obj = value[1] if isinstance(value, (tuple, list)) else value
+            if not hasattr(file_obj, "seek"):
+                continue
+            if not file_obj.seekable():
+                return False
+            file_obj.seek(0)
+
+        return True
+
     def _test_connectivity(self, param):
         """This function tests the connectivity with RSA SA with the provided credentials.
 
@@ -190,24 +565,270 @@ class NetWitnessConnector(phantom.BaseConnector):
         :return: status success/failure
         """
 
+        from concurrent.futures import ThreadPoolExecutor
+
         action_result = self.add_action_result(phantom.ActionResult(dict(param)))
         self.save_progress(consts.NETWITNESS_CONNECTION_TEST_MSG)
-        self.save_progress(f"Configured URL: {self._base_url}")
-
-        rest_ret_val, _ = self._make_rest_call(
-            action_result, endpoint=consts.NETWITNESS_ENDPOINT_GET_CAP, timeout=consts.NETWITNESS_DEFAULT_TEST_TIMEOUT
-        )
 
-        if phantom.is_fail(rest_ret_val):
-            self.save_progress(action_result.get_message())
+        # every configured appliance is probed, concurrently, and its capabilities are cached for the next actions
+        with ThreadPoolExecutor(max_workers=min(len(self._base_urls), consts.NETWITNESS_MAX_APPLIANCE_WORKERS)) as executor:
+            results = list(executor.map(lambda base_url: self._get_capabilities(base_url, force=True), self._base_urls))
+
+        failures = []
+        for base_url, (_, capabilities, message) in zip(self._base_urls, results):
+            self.save_progress(f"Configured URL: {base_url}")
+            if message:
+                self.save_progress(message)
+                failures.append((base_url, message))
+            else:
+                self.save_progress(
+                    consts.NETWITNESS_PROBE.format(service=capabilities["service"] or "service", version=capabilities["version"] or "unknown")
+                )
+
+        if failures:
+            if len(self._base_urls) == 1:
+                message = failures[0][1]
+            else:
+                message = "; ".join(consts.NETWITNESS_APPLIANCE_FAILED.format(url=url, message=msg) for url, msg in failures)
             self.set_status(phantom.APP_ERROR, consts.NETWITNESS_TEST_CONNECTIVITY_FAIL)
-            return action_result.get_status()
+            return action_result.set_status(phantom.APP_ERROR, message)
 
         self.save_progress(consts.NETWITNESS_TEST_CONNECTIVITY_PASS)
 
         return action_result.set_status(phantom.APP_SUCCESS, consts.NETWITNESS_TEST_CONNECTIVITY_PASS)
 
-    def _move_file_to_vault(self, container_id, file_size, type_str, local_file_path, action_result):
+    def _get_capabilities(self, base_url, force=False):
+        """Return what is known of an appliance: its version and service type, read from its status nodes, and whether
+        it supports the optional requests that it turned out not to support (see _set_capability). The status nodes are
+        cheap to read, and are read again once the capabilities are older than probe_ttl seconds. An appliance that does
+        not answer at all is down for the rest of the action: its requests then fail without being sent. An appliance
+        that answers with an error is still used, with the retries of the action, and probed again by the next action.
+        An appliance is probed at most once per action.
+
+        :param base_url: URL of the appliance
+        :param force: if True, the status nodes are read even if the capabilities are cached
+        :return: status failure if the appliance is down, its capabilities (None if it is down) and the error message
+        of the probe (None if it succeeded)
+        """
+
+        if not force and base_url in self._down_appliances:
+            return phantom.APP_ERROR, None, self._down_appliances[base_url]
+        # an appliance is probed at most once per action
+        if not force and base_url in self._capabilities:
+            return phantom.APP_SUCCESS, self._capabilities[base_url], None
+
+        capabilities = self._state.setdefault(consts.NETWITNESS_STATE_CAPABILITIES, {})
+        cached = capabilities.get(base_url)
+        if not force and cached and 0 <= time.time() - cached.get("checked", 0) < self._probe_ttl:
+            self._perf.count("probe_cache_hits")
+            self._capabilities[base_url] = cached
+            return phantom.APP_SUCCESS, cached, None
+
+        probe_result = phantom.ActionResult()
+        with self._perf.span("probe"):
+            ret_val, resp = self._make_rest_call(
+                probe_result, endpoint=consts.NETWITNESS_ENDPOINT_STATUS, timeout=consts.NETWITNESS_PROBE_TIMEOUT, base_url=base_url, retry=False
+            )
+
+        if resp is None:
+            capabilities.pop(base_url, None)
+            message = self._down_appliances[base_url] = consts.NETWITNESS_ERR_APPLIANCE_DOWN.format(probe_result.get_message())
+            return phantom.APP_ERROR, None, message
+
+        # an appliance whose status nodes cannot be read, e.g. an overloaded one or one that refuses the credentials, is
+        # used as if it had every capability, and probed again by the next action
+        nodes = {}
+        message = None if phantom.is_success(ret_val) else probe_result.get_message()
+        if not message:
+            try:
+                nodes = parse_status_nodes(resp.json())
+            except ValueError:
+                message = consts.NETWITNESS_ERR_STATUS_RESPONSE
+
+        cached = self._capabilities[base_url] = {
+            "checked": time.time(),
+            "version": nodes.get(consts.NETWITNESS_STATUS_VERSION),
+            "service": nodes.get(consts.NETWITNESS_STATUS_SERVICE),
+        }
+
+        if message:
+            self.debug_print(message)
+            capabilities.pop(base_url, None)
+        else:
+            capabilities[base_url] = cached
+
+        return phantom.APP_SUCCESS, cached, message
+
+    def _get_capability(self, base_url, key):
+        """Return a cached capability of an appliance, None if it is unknown
+
+        :param base_url: URL of the appliance, defaults to the primary appliance
+        :param key: name of the capability
+        """
+
+        return self._capabilities.get(base_url or self._base_url, {}).get(key)
+
+    def _set_capability(self, base_url, key, value):
+        """Record a capability of an appliance learned during the action, e.g. that it cannot run a request. It is kept
+        with the capabilities read from the status nodes, until they are read again.
+
+        :param base_url: URL of the appliance, defaults to the primary appliance
+        :param key: name of the capability
+        :param value: value of the capability
+        """
+
+        capabilities = self._capabilities.get(base_url or self._base_url)
+        if capabilities is not None:
+            capabilities[key] = value
+
+    def _probe_appliances(self, base_urls):
+        """Make sure that the appliances an action uses are up before it starts, reading their status nodes unless their
+        capabilities are cached. Appliances are probed concurrently.
+
+        :param base_urls: URLs of the appliances
+        :return: list of (URL, error message) tuples of the appliances that are down
+        """
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        if len(base_urls) == 1:
+            results = [self._get_capabilities(base_urls[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(base_urls), consts.NETWITNESS_MAX_APPLIANCE_WORKERS)) as executor:
+                results = list(executor.map(self._get_capabilities, base_urls))
+
+        return [(base_url, message) for base_url, (ret_val, _, message) in zip(base_urls, results) if phantom.is_fail(ret_val)]
+
+    def _create_temp_dir(self):
+        """Create the working directory of a capture inside the vault's staging directory. Captures are then written
+        once, on the file system of the vault, and vault_add can move them into the vault instead of copying them.
+
+        :return: path of the directory
+        """
+
+        from phantom.vault import Vault
+
+        try:
+            return tempfile.mkdtemp(dir=Vault.get_vault_tmp_dir())
+        except Exception as e:
+            self.debug_print(consts.NETWITNESS_ERR_VAULT_TMP_DIR, e)
+            return tempfile.mkdtemp()
+
+    def _get_vault_index(self, container_id):
+        """Return the index of the vault items of a container, keyed by SHA-256. Converted or compressed captures are
+        keyed by the SHA-256 of the downloaded capture prefixed with the format and codec (see _get_vault_index_key), and
+        every item, including those vaulted without these details, by the SHA-256 the vault computed. The index is built from vault_info the first time the action run sees the container, so that it includes the files
+        added by anyone since the last run; _move_file_to_vault adds the files it vaults. The indexes of the least
+        recently used containers are dropped. Must be called with _vault_index_lock held.
+
+        :param container_id: ID of the container
+        :return: dictionary mapping index keys to vault_id, name, size and event statistics of the vault items
+        """
+
+        import phantom.rules as ph_rules
+
+        vault_index = self._vault_index
+        container_key = str(container_id)
+
+        if container_key in vault_index:
+            vault_index.move_to_end(container_key)
+        else:
+            _, _, vault_meta_info = ph_rules.vault_info(container_id=container_id)
+
+            index = vault_index[container_key] = {}
+            for vault in vault_meta_info or []:
+                metadata = vault.get("metadata") or {}
+                vault_item = {"vault_id": vault.get(phantom.APP_JSON_VAULT_ID), "name": vault.get("name"), "size": vault.get("size")}
+                vault_item.update({key: metadata[key] for key in consts.NETWITNESS_EVENT_STATS_KEYS if key in metadata})
+                if metadata.get("raw_sha256") and (metadata.get("compression") or metadata.get("format")):
+                    index[self._get_vault_index_key(metadata["raw_sha256"], metadata.get("compression"), metadata.get("format"))] = vault_item
+                if metadata.get("sha256"):
+                    index.setdefault(metadata["sha256"], vault_item)
+
+            while len(vault_index) > consts.NETWITNESS_VAULT_INDEX_MAX_CONTAINERS:
+                vault_index.popitem(last=False)
+
+        return vault_index[container_key]
+
+    def _get_vault_index_key(self, file_hash, compression=None, output_format=None):
+        """Key of a capture in the vault index. Converted or compressed captures are identified by the content of the
+        downloaded capture, so that a duplicate is detected before it is converted or compressed.
+
+        :param file_hash: SHA-256 hex digest of the downloaded capture
+        :param compression: codec the capture is stored with, None if it is not compressed
+        :param output_format: format the capture is converted to, None if it is stored as downloaded
+        :return: index key
+        """
+
+        return ":".join([part for part in (output_format, compression) if part] + [file_hash])
+
+    def _get_vault_lookup_keys(self, file_hash, output_format=None):
+        """Vault index keys under which a capture added to the vault as it is, or converted to output_format, could
+        already be there: its own key, then, for a capture compressed as it is added, the SHA-256 of the capture itself,
+        which is the key of the same capture vaulted uncompressed, for example before compression was configured.
+
+        :param file_hash: SHA-256 hex digest of the downloaded capture
+        :param output_format: format the capture is converted to, None if it is stored as downloaded
+        :return: list of index keys, the key of the capture as it is vaulted first
+        """
+
+        index_keys = [self._get_vault_index_key(file_hash, self._compression, output_format)]
+        if self._compression and not output_format:
+            index_keys.append(file_hash)
+
+        return index_keys
+
+    def _find_in_vault(self, container_id, index_keys):
+        """Look for a vault item of the container with the given content.
+
+        :param container_id: ID of the container
+        :param index_keys: vault index keys of the file, looked up in order
+        :return: dictionary with the vault_id, name and size of the vault item, or None if there is no such item
+        """
+
+        import phantom.rules as ph_rules
+
+        for index_key in index_keys:
+            with self._perf.span("vault_info"):
+                with self._vault_index_lock:
+                    vault_item = self._get_vault_index(container_id).get(index_key)
+
+                if not vault_item:
+                    continue
+
+                # the item may have been deleted since it was indexed
+                success, _, vault_meta_info = ph_rules.vault_info(vault_id=vault_item["vault_id"], container_id=container_id)
+
+            if success and vault_meta_info:
+                return vault_item
+
+            with self._vault_index_lock:
+                self._get_vault_index(container_id).pop(index_key, None)
+
+        return None
+
+    def _report_vault_item(self, action_result, vault_item, type_str):
+        """Report a vault item that already holds the requested capture as the result of the action.
+
+        :param action_result: object of ActionResult class
+        :param vault_item: vault item returned by _find_in_vault
+        :param type_str: file type
+        :return: status success
+        """
+
+        self.send_progress(consts.NETWITNESS_REPORT_ALREADY_AVAILABLE)
+        vault_details = {
+            phantom.APP_JSON_SIZE: vault_item["size"],
+            phantom.APP_JSON_TYPE: type_str,
+            phantom.APP_JSON_VAULT_ID: vault_item["vault_id"],
+            consts.NETWITNESS_JSON_FILE_NAME: vault_item["name"],
+        }
+        action_result.update_summary({key: vault_item[key] for key in consts.NETWITNESS_EVENT_STATS_KEYS if key in vault_item})
+        action_result.update_summary({"file_availability": True})
+        action_result.add_data(vault_details)
+        return action_result.set_status(phantom.APP_SUCCESS)
+
+    def _move_file_to_vault(self, container_id, file_size, type_str, local_file_path, action_result, file_hash=None, metadata=None):
         """Moves the downloaded file to vault.
 
         :param container_id: ID of the container in which we need to add vault file
@@ -215,15 +836,22 @@ class NetWitnessConnector(phantom.BaseConnector):
         :param type_str: file type
         :param local_file_path: path where file is stored
         :param action_result: object of ActionResult class
+        :param file_hash: vault index key of the file, used to add it to the vault index of the container
+        :param metadata: details of a converted or compressed file (raw size and SHA-256, format, codec...) that are
+        added to the vault metadata and to the action result
         :return: status success/failure
         """
 
+        import phantom.rules as ph_rules
+
         self.send_progress(phantom.APP_PROG_ADDING_TO_VAULT)
 
         if not file_size:
             file_size = os.path.getsize(local_file_path)
 
         file_details = {phantom.APP_JSON_SIZE: file_size, phantom.APP_JSON_TYPE: type_str}
+        if metadata:
+            file_details.update(metadata)
 
         vault_details = {
             phantom.APP_JSON_CONTAINS: [type_str],
@@ -237,9 +865,10 @@ class NetWitnessConnector(phantom.BaseConnector):
 
         # Adding file to vault
         try:
-            success, message, vault_id = ph_rules.vault_add(
-                file_location=local_file_path, container=container_id, file_name=file_name, metadata=vault_details
-            )
+            with self._perf.span("vault_add"):
+                success, message, vault_id = ph_rules.vault_add(
+                    file_location=local_file_path, container=container_id, file_name=file_name, metadata=vault_details
+                )
         except Exception as e:
             msg = self._get_error_message_from_exception(e)
             return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_VAULT_INFO.format(msg))
@@ -249,6 +878,12 @@ class NetWitnessConnector(phantom.BaseConnector):
             file_details[phantom.APP_JSON_VAULT_ID] = vault_id
             file_details[consts.NETWITNESS_JSON_FILE_NAME] = file_name
             action_result.add_data(file_details)
+
+            if file_hash:
+                index_entry = {"vault_id": vault_id, "name": file_name, "size": file_size}
+                index_entry.update({key: metadata[key] for key in consts.NETWITNESS_EVENT_STATS_KEYS if key in (metadata or {})})
+                with self._vault_index_lock:
+                    self._get_vault_index(container_id)[file_hash] = index_entry
             self.send_progress(consts.NETWITNESS_SUCC_FILE_ADD_TO_VAULT, vault_id=vault_id)
             return phantom.APP_SUCCESS
 
@@ -260,13 +895,13 @@ class NetWitnessConnector(phantom.BaseConnector):
         # will most probably return as is
         return phantom.APP_ERROR
 
-    def _check_for_bad_cap(self, cap):
-        """The API sometimes returns an empty or corrupted capture when there is no capture data"""
-
-        if not cap:
-            return True
+    def _check_for_bad_cap(self, cap_size, cap_hash):
+        """The API sometimes returns an empty or corrupted capture when there is no capture data
 
-        cap_size = sys.getsizeof(cap)
+        :param cap_size: number of bytes in the capture
+        :param cap_hash: SHA-256 hex digest of the capture
+        :return: True if the capture does not contain any usable data
+        """
 
         if not cap_size:
             return True
@@ -274,206 +909,2017 @@ class NetWitnessConnector(phantom.BaseConnector):
         if cap_size not in consts.NETWITNESS_BAD_CAP_SIZES:
             return False
 
-        if hashlib.sha256(cap).hexdigest() in consts.NETWITNESS_BAD_CAP_HASHES:
+        if cap_hash in consts.NETWITNESS_BAD_CAP_HASHES:
             return True
 
         return False
 
-    def _get_capture(self, param, cap_type):
-        """Download a capture file from RSA NetWitness based on given criteria"""
+    def _set_idle_timeout(self, resp):
+        """Once the headers have arrived, replace the first byte timeout of a streamed response with the (usually
+        shorter) idle stall timeout, which then applies to every read of the body.
 
-        action_result = self.add_action_result(phantom.ActionResult(dict(param)))
-        summary_data = action_result.update_summary({})
+        :param resp: streamed response object
+        """
 
-        # Check for optional input parameters
-        query = param.get(consts.NETWITNESS_JSON_QUERY)
-        time2 = param.get(consts.NETWITNESS_JSON_END_TIME)
-        time1 = param.get(consts.NETWITNESS_JSON_START_TIME)
-        filename = param.get(consts.NETWITNESS_JSON_FILE_NAME)
-        if filename and (filename in {".", ".."} or "/" in filename or "\\" in filename):
-            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_UNSAFE_FILE_NAME)
-        session_id = param.get(consts.NETWITNESS_JSON_SESSION_ID)
+        connection = getattr(resp.raw, "connection", None) or getattr(resp.raw, "_connection", None)
+        sock = getattr(connection, "sock", None)
+        if sock is not None:
+            sock.settimeout(self._idle_timeout)
 
-        # Need either a session ID, or a complete timeframe
-        if not (session_id or query or (time1 and time2)):
-            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_BAD_PARAMS)
+    def _iter_raw_content(self, resp):
+        """Yield the body of a streamed response as it is received, without decoding its content encoding. The urllib3
+        errors are raised as the requests exceptions iter_content would raise.
 
-        if session_id and "-" in session_id:
-            num_list = list(map(int, session_id.split("-")))
-            if num_list[0] > num_list[1]:
-                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_BAD_RANGE)
+        :param resp: streamed response object
+        """
 
-        if session_id:
-            data = {"sessions": session_id}
+        import urllib3
 
-            if query:
-                data["where"] = query
+        try:
+            yield from resp.raw.stream(consts.NETWITNESS_DOWNLOAD_CHUNK_SIZE, decode_content=False)
+        except urllib3.exceptions.ProtocolError as e:
+            raise requests.exceptions.ChunkedEncodingError(e) from e
+        except urllib3.exceptions.ReadTimeoutError as e:
+            raise requests.exceptions.ConnectionError(e) from e
+        except urllib3.exceptions.SSLError as e:
+            raise requests.exceptions.SSLError(e) from e
+
+    def _stream_capture_to_file(self, resp, file_path, deadline, decoder, cancel_event=None, offset=0, codec=None):
+        """Write a streamed capture response to disk chunk by chunk, so that memory usage does not depend on the size of
+        the capture. The size and SHA-256 of the capture are computed, and the capture is compressed, on the same pass.
+
+        :param resp: streamed response object
+        :param file_path: path of the file to write
+        :param deadline: time.monotonic() value by which the transfer must be complete
+        :param decoder: ContentDecoder of the response, which also counts the bytes received
+        :param cancel_event: threading.Event that, once set, aborts the transfer
+        :param offset: number of bytes of file_path already downloaded, the response body is appended to them
+        :param codec: gzip or zstd to compress the capture as it is written (not with an offset)
+        :return: size of the capture in bytes and its SHA-256 hex digest, before compression
+        """
 
-            # Set filename
-            if not filename:
-                filename = "netwitness-{}".format(session_id.replace(",", "_")[:50])
+        cap_size = 0
+        cap_hash = hashlib.sha256()
+
+        if offset:
+            with open(file_path, "rb") as file_obj:
+                for chunk in iter(lambda: file_obj.read(consts.NETWITNESS_DOWNLOAD_CHUNK_SIZE), b""):
+                    cap_hash.update(chunk)
+                    cap_size += len(chunk)
+
+        self._set_idle_timeout(resp)
+
+        with self._perf.span("transfer"), open(file_path, "ab" if offset else "wb") as file_obj, CompressingWriter(file_obj, codec) as writer:
+            # the body is decoded here rather than by requests, so that the bytes received can be counted for any
+            # transfer encoding (urllib3 does not count the bytes of chunked responses)
+            for raw_chunk in self._iter_raw_content(resp):
+                if cancel_event and cancel_event.is_set():
+                    raise Cancelled()
+                if time.monotonic() > deadline:
+                    raise Timeout()
+                for chunk in decoder.decode(raw_chunk):
+                    writer.write(chunk)
+                    cap_hash.update(chunk)
+                    cap_size += len(chunk)
+                    self._perf.count("bytes_written", len(chunk))
+
+            chunk = decoder.flush()
+            writer.write(chunk)
+            cap_hash.update(chunk)
+            cap_size += len(chunk)
+            self._perf.count("bytes_written", len(chunk))
+
+        return cap_size, cap_hash.hexdigest()
+
+    def _download_capture(self, action_result, data, file_path, cancel_event=None, resume=False, identity=False, base_url=None, codec=None):
+        """Request a capture from /sdk/packets and stream it into file_path.
+
+        JSON log captures are requested with a compressed content encoding, which is decoded chunk by chunk as the
+        capture is written. If the encoded body cannot be decoded, the capture is downloaded again uncompressed. The
+        number of bytes received on the wire is added to the transfer_size of the summary.
 
-        elif query:
-            if time1 and time2:
-                try:
-                    datetime.strptime(time1, "%Y-%m-%d %H:%M:%S")
-                    datetime.strptime(time2, "%Y-%m-%d %H:%M:%S")
-                except Exception as e:
-                    return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_INVALID_PARAM.format(message=e))
+        :param action_result: object of ActionResult class
+        :param data: request body
+        :param file_path: path of the file to write
+        :param cancel_event: threading.Event that, once set, aborts the download
+        :param resume: if file_path holds the beginning of an interrupted download, ask the device for the rest of it
+        :param identity: ask for an uncompressed body
+        :param base_url: URL of the appliance to download from, defaults to the primary appliance
+        :param codec: gzip or zstd to compress the capture as it is written (not with resume)
+        :return: status success/failure, size of the capture and its SHA-256 hex digest, before compression
+        """
 
-                query += f' && time="{time1}"-"{time2}"'
+        deadline = time.monotonic() + self._transfer_timeout
+
+        offset = os.path.getsize(file_path) if resume and os.path.exists(file_path) else 0
+        headers = {}
+
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+            # a range applies to the encoded body while the offset counts decoded bytes
+            headers["Accept-Encoding"] = consts.NETWITNESS_ACCEPT_ENCODING_IDENTITY
+        elif identity:
+            headers["Accept-Encoding"] = consts.NETWITNESS_ACCEPT_ENCODING_IDENTITY
+        elif data.get("render") == consts.NETWITNESS_CAP_TYPE_DICT[consts.NETWITNESS_CAP_TYPE_LOG]:
+            headers["Accept-Encoding"] = consts.NETWITNESS_ACCEPT_ENCODING_LOG
+
+        rest_ret_val, resp = self._make_rest_call(
+            action_result,
+            endpoint=consts.NETWITNESS_ENDPOINT_GET_CAP,
+            data=data,
+            stream=True,
+            cancel_event=cancel_event,
+            headers=headers,
+            base_url=base_url,
+        )
 
-            data = {"where": query}
+        # Something went wrong with the request
+        if phantom.is_fail(rest_ret_val):
+            return rest_ret_val, None, None
 
-            # Set filename
-            if not filename:
-                filename = f"netwitness-{uuid.uuid4()}"
+        # closing the response also aborts a transfer that is cut short
+        with resp:
+            # Check content-type of response
+            content_type = resp.headers.get("content-type", "")
+            if content_type.find("application/octet-stream") == -1 and content_type.find("application/json") == -1:
+                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_GET_PCAPS_FAIL), None, None
+
+            if resp.status_code != consts.NETWITNESS_REST_RESP_PARTIAL:
+                # the device does not support ranges (or nothing was downloaded yet), the capture is sent from the start
+                offset = 0
+            elif not resp.headers.get("content-range", "").startswith(f"bytes {offset}-"):
+                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_TRANSFER), None, None
+
+            encoding = resp.headers.get("content-encoding", consts.NETWITNESS_ACCEPT_ENCODING_IDENTITY)
+            decoder = None
 
-        elif time1 and time2:
             try:
-                datetime.strptime(time1, "%Y-%m-%d %H:%M:%S")
-                datetime.strptime(time2, "%Y-%m-%d %H:%M:%S")
+                decoder = ContentDecoder(encoding)
+                file_size, file_hash = self._stream_capture_to_file(resp, file_path, deadline, decoder, cancel_event, offset, codec)
+            except DecodingError as e:
+                if headers.get("Accept-Encoding") == consts.NETWITNESS_ACCEPT_ENCODING_IDENTITY:
+                    self.error_print(consts.NETWITNESS_ERR_TRANSFER, e)
+                    return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_TRANSFER, e), None, None
+                self.debug_print(consts.NETWITNESS_ERR_CONTENT_DECODING.format(encoding=encoding), e)
+                self._perf.count("encoding_fallbacks")
+                file_size = None
+            except Timeout:
+                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_TIMEOUT), None, None
+            except Cancelled:
+                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_CANCELLED), None, None
+            except requests.exceptions.RequestException as e:
+                self.error_print(consts.NETWITNESS_ERR_TRANSFER, e)
+                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_TRANSFER, e), None, None
             except Exception as e:
-                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_INVALID_PARAM.format(message=e))
+                self.error_print(consts.NETWITNESS_FILE_ERR, e)
+                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_FILE_ERR, e), None, None
 
-            if time1 > time2:
-                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_REVERSE_TIMES)
+            wire_size = decoder.wire_size if decoder else 0
+            self._perf.count("bytes_received", wire_size)
 
-            # Prepare request body
-            data = {"time1": time1, "time2": time2}
+        if file_size is None:
+            return self._download_capture(action_result, data, file_path, cancel_event, identity=True, base_url=base_url, codec=codec)
 
-            # Set filename
-            if not filename:
-                filename = (f"netwitness-{time1}_{time2}").replace("/", "-")
+        self.debug_print(consts.NETWITNESS_TRANSFER_SIZE.format(wire_size=wire_size, encoding=encoding, size=file_size - offset))
+        action_result.update_summary({"transfer_size": action_result.get_summary().get("transfer_size", 0) + wire_size})
 
-        if not (filename.endswith(".pcap") or filename.endswith(".json")):
-            filename = f"{filename}.{consts.NETWITNESS_FILE_TYPE_DICT[cap_type]}"
+        return phantom.APP_SUCCESS, file_size, file_hash
 
-        # Set the cap type in the request body
-        data["render"] = consts.NETWITNESS_CAP_TYPE_DICT[cap_type]
+    def _download_shard(self, data, file_path, cancel_event, resume=False, base_url=None):
+        """Download one shard of a capture, retrying it if it fails. Runs on a worker thread, so it reports through its
+        own ActionResult.
 
-        rest_ret_val, resp = self._make_rest_call(action_result, endpoint=consts.NETWITNESS_ENDPOINT_GET_CAP, data=data)
+        In resume mode a checkpoint is written next to every completed shard, and a shard that already has one is not
+        downloaded again. The partial file of an interrupted shard is kept so that its download can be resumed.
 
-        # Something went wrong with the request
-        if phantom.is_fail(rest_ret_val):
-            return rest_ret_val
+        :param data: request body of the shard
+        :param file_path: path of the file to write
+        :param cancel_event: threading.Event that, once set, aborts the download
+        :param resume: whether to use and write checkpoints
+        :param base_url: URL of the appliance to download from, defaults to the primary appliance
+        :return: status success/failure, ActionResult of the shard, size of the shard and its SHA-256 hex digest
+        """
 
-        # Check content-type of response
-        content_type = resp.headers["content-type"]
-        if content_type.find("application/octet-stream") != -1 or content_type.find("application/json") != -1:
-            rest_resp = resp.content
-        else:
-            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_GET_PCAPS_FAIL)
+        checkpoint_path = f"{file_path}.json"
+        part_path = f"{file_path}.part"
 
-        if self._check_for_bad_cap(rest_resp):
-            summary_data["file_availability"] = False
-            return action_result.set_status(phantom.APP_SUCCESS, consts.NETWITNESS_ERR_BAD_CAP)
+        shard_result = phantom.ActionResult()
+        if resume and os.path.exists(checkpoint_path) and os.path.exists(file_path):
+            try:
+                with open(checkpoint_path) as checkpoint_file:
+                    checkpoint = json.load(checkpoint_file)
+                return phantom.APP_SUCCESS, shard_result, checkpoint["size"], checkpoint["sha256"]
+            except Exception as e:
+                self.debug_print(consts.NETWITNESS_ERR_CHECKPOINT, e)
 
-        # Creating file
-        try:
-            temp_dir = tempfile.mkdtemp()
-            file_path = os.path.join(temp_dir, filename)
-            with open(file_path, "wb") as file_obj:
-                file_obj.write(rest_resp)
-        except Exception as e:
-            self.error_print(consts.NETWITNESS_FILE_ERR, e)
-            shutil.rmtree(temp_dir)
-            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_FILE_ERR, e)
+        for attempt in range(consts.NETWITNESS_SHARD_RETRIES + 1):
+            shard_result = phantom.ActionResult()
+            ret_val, file_size, file_hash = self._download_capture(shard_result, data, part_path, cancel_event, resume, base_url=base_url)
 
-        container_id = self.get_container_id()
+            if phantom.is_success(ret_val) or cancel_event.is_set() or not self._retry_policy.acquire(attempt):
+                break
 
-        # Check if file with same file name and size is available in vault and save only if it is not available
-        try:
-            _, _, vault_meta_info = ph_rules.vault_info(container_id=container_id)
-        except Exception as e:
-            msg = self._get_error_message_from_exception(e)
-            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_VAULT_INFO.format(msg))
+            self.debug_print(consts.NETWITNESS_SHARD_RETRY.format(attempt=attempt + 1, message=shard_result.get_message()))
+            self._perf.count("retries")
+            if not resume and os.path.exists(part_path):
+                os.remove(part_path)
 
-        # Iterate through each vault item in the container and compare name and size of file
-        for vault in vault_meta_info:
-            if vault.get("name") == filename and vault.get("size") == os.path.getsize(file_path):
-                self.send_progress(consts.NETWITNESS_REPORT_ALREADY_AVAILABLE)
-                vault_details = {
-                    phantom.APP_JSON_SIZE: vault.get("size"),
-                    phantom.APP_JSON_TYPE: consts.NETWITNESS_FILE_TYPE_DICT[cap_type],
-                    phantom.APP_JSON_VAULT_ID: vault.get(phantom.APP_JSON_VAULT_ID),
-                    consts.NETWITNESS_JSON_FILE_NAME: filename,
-                }
-                summary_data["file_availability"] = True
-
-                shutil.rmtree(temp_dir)
-                action_result.add_data(vault_details)
-                return action_result.set_status(phantom.APP_SUCCESS)
-
-        return_val = self._move_file_to_vault(
-            container_id, os.path.getsize(file_path), consts.NETWITNESS_FILE_TYPE_DICT[cap_type], file_path, action_result
-        )
-        shutil.rmtree(temp_dir)
+            with self._perf.span("backoff"):
+                cancel_event.wait(self._retry_policy.delay(attempt))
 
-        # Something went wrong while moving file to vault
-        if phantom.is_fail(return_val):
-            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_VAULT)
+        if phantom.is_fail(ret_val):
+            return ret_val, shard_result, file_size, file_hash
 
-        summary_data["file_availability"] = True
-        return action_result.set_status(phantom.APP_SUCCESS)
+        os.replace(part_path, file_path)
 
-    def _get_pcap(self, param):
-        return self._get_capture(param, consts.NETWITNESS_CAP_TYPE_PACKET)
+        if resume:
+            with open(checkpoint_path, "w") as checkpoint_file:
+                json.dump({"size": file_size, "sha256": file_hash}, checkpoint_file)
 
-    def _get_log_capture(self, param):
-        return self._get_capture(param, consts.NETWITNESS_CAP_TYPE_LOG)
+        return ret_val, shard_result, file_size, file_hash
 
-    def _upload_file(self, param):
-        """This method uploads a parser from the vault to a NetWitness decoder"""
+    def _get_checkpoint_dir(self, data, base_url=None):
+        """Return the checkpoint directory of a capture, keyed by the device and the request body of the whole capture
+        (session IDs or query, time window and capture type), so that a retried action finds the shards an earlier run
+        completed however it is split this time. Checkpoints that have not been touched for a day are removed.
 
-        self.debug_print(param)
-        action_result = self.add_action_result(phantom.ActionResult(dict(param)))
+        :param data: request body of the whole capture
+        :param base_url: URL of the appliance, defaults to the primary appliance
+        :return: path of the checkpoint directory
+        """
 
-        vault_id = param[phantom.APP_JSON_VAULT_ID]
+        checkpoint_root = os.path.join(self.get_state_dir(), consts.NETWITNESS_CHECKPOINT_DIR)
+
+        if os.path.isdir(checkpoint_root):
+            for name in os.listdir(checkpoint_root):
+                path = os.path.join(checkpoint_root, name)
+                if time.time() - os.path.getmtime(path) > consts.NETWITNESS_CHECKPOINT_TTL:
+                    if os.path.isdir(path):
+                        shutil.rmtree(path, ignore_errors=True)
+                    else:
+                        # lock file of a checkpoint directory
+                        os.remove(path)
+
+        checkpoint_dir = os.path.join(checkpoint_root, capture_cache_key(base_url or self._base_url, data))
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+        return checkpoint_dir
+
+    def _get_shard_plan(self, checkpoint_dir, shard_bodies, window_end=None):
+        """Return the shards of a checkpointed capture: those planned by the run that started it, whatever the estimate
+        makes of the capture now, or shard_bodies, which become the plan, if it is a new capture. The checkpoints of a
+        capture whose time window had not ended when they were planned are discarded, as the device may have recorded
+        more sessions since.
+
+        :param checkpoint_dir: checkpoint directory of the capture
+        :param shard_bodies: list of request bodies, one per shard, of this run
+        :param window_end: end of the time window of the capture (UTC), if it has one
+        :return: list of request bodies, one per shard
+        """
 
-        # check the vault for a file with the supplied ID
-        try:
-            success, message, vault_meta_info = ph_rules.vault_info(vault_id=vault_id)
-            if not success:
-                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_VAULT_INFO.format(message))
-            file_info = next(iter(vault_meta_info))
-            file_path = file_info.get("path")
-        except Exception as e:
-            msg = self._get_error_message_from_exception(e)
-            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_VAULT_INFO.format(msg))
+        plan_path = os.path.join(checkpoint_dir, consts.NETWITNESS_CHECKPOINT_PLAN)
 
-        if not file_path:
-            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_NOT_IN_VAULT)
+        if os.path.exists(plan_path):
+            try:
+                with open(plan_path) as plan_file:
+                    plan = json.load(plan_file)
+                if not window_end or window_end < plan["created"]:
+                    return plan["shards"]
+            except Exception as e:
+                self.debug_print(consts.NETWITNESS_ERR_CHECKPOINT, e)
 
-        upfile = open(file_path, "rb")
-        endpoint = "/decoder/parsers/upload"
+            # the checkpoints do not belong to this plan anymore
+            shutil.rmtree(checkpoint_dir, ignore_errors=True)
+            os.makedirs(checkpoint_dir, exist_ok=True)
 
-        ret_val, _ = self._make_rest_call(action_result, endpoint=endpoint, files={"file": (file_info["name"], upfile)}, method="post")
+        created = datetime.now(timezone.utc).strftime(consts.NETWITNESS_TIME_FORMAT)
+        with open(plan_path, "w") as plan_file:
+            json.dump({"shards": shard_bodies, "created": created}, plan_file)
 
-        if not ret_val:
-            return ret_val
+        return shard_bodies
 
-        return action_result.set_status(phantom.APP_SUCCESS, consts.NETWITNESS_SUCC_UPLOAD)
+    def _download_sharded_capture(self, action_result, shard_bodies, cap_type, work_dir, file_path, resume=False, base_url=None, codec=None):
+        """Download the shards of a capture concurrently and merge the non-empty ones, in order, into file_path. Shards
+        are downloaded uncompressed so that they can be resumed, the capture is compressed as they are merged.
 
-    def _restart_device(self, param):
-        """This method restarts the configured device"""
+        :param action_result: object of ActionResult class
+        :param shard_bodies: list of request bodies, one per shard
+        :param cap_type: capture type
+        :param work_dir: directory in which the shards are written
+        :param file_path: path of the merged file
+        :param resume: whether to use and write shard checkpoints, the shards are then kept for the caller to remove
+        :param base_url: URL of the appliance to download from, defaults to the primary appliance
+        :param codec: gzip or zstd to compress the merged capture
+        :return: status success/failure, size of the merged capture and its SHA-256 hex digest, before compression
+        """
 
-        action_result = self.add_action_result(phantom.ActionResult(dict(param)))
+        from concurrent.futures import ThreadPoolExecutor, as_completed
 
-        endpoint = "/sys?msg=shutdown"
+        shard_paths = [os.path.join(work_dir, f"shard-{index:05d}") for index in range(len(shard_bodies))]
+        max_workers = min(len(shard_bodies), consts.NETWITNESS_MAX_SHARD_WORKERS)
 
-        ret_val, _ = self._make_rest_call(action_result, endpoint=endpoint)
+        self.save_progress(consts.NETWITNESS_SHARD_PROGRESS.format(shards=len(shard_bodies), workers=max_workers))
 
-        if phantom.is_fail(ret_val):
-            return ret_val
+        cancel_event = threading.Event()
+        shard_results = [None] * len(shard_bodies)
+        failed_index = None
 
-        return action_result.set_status(phantom.APP_SUCCESS, consts.NETWITNESS_SUCC_RESTART)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._download_shard, shard_body, shard_path, cancel_event, resume, base_url): index
+                for index, (shard_body, shard_path) in enumerate(zip(shard_bodies, shard_paths))
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                shard_results[index] = future.result()
+                if failed_index is None and phantom.is_fail(shard_results[index][0]):
+                    # the capture can no longer be completed, stop the shards that are still running
+                    failed_index = index
+                    cancel_event.set()
 
-    def handle_action(self, param):
-        """This function gets current action identifier and calls member function of it's own to handle the action.
+        if failed_index is not None:
+            shard_result = shard_results[failed_index][1]
+            return (
+                action_result.set_status(
+                    phantom.APP_ERROR,
+                    consts.NETWITNESS_ERR_SHARD.format(index=failed_index + 1, total=len(shard_bodies), message=shard_result.get_message()),
+                ),
+                None,
+                None,
+            )
 
-        :param param: dictionary which contains information about the actions to be executed
-        :return: status success/failure
+        action_result.update_summary(
+            {"transfer_size": sum(shard_result.get_summary().get("transfer_size", 0) for _, shard_result, _, _ in shard_results)}
+        )
+
+        good_shards = [
+            (shard_paths[index], shard_size, shard_hash)
+            for index, (_, _, shard_size, shard_hash) in enumerate(shard_results)
+            if not self._check_for_bad_cap(shard_size, shard_hash)
+        ]
+
+        merge_files = merge_pcap_files if cap_type == consts.NETWITNESS_CAP_TYPE_PACKET else merge_json_files
+
+        try:
+            if not good_shards:
+                file_size, file_hash = 0, None
+            elif len(good_shards) == 1:
+                # nothing to merge, the only shard with data is the capture
+                shard_path, file_size, file_hash = good_shards[0]
+                if codec:
+                    with self._perf.span("compress"):
+                        compress_file(shard_path, file_path, codec)
+                else:
+                    shutil.move(shard_path, file_path)
+            else:
+                with self._perf.span("merge"):
+                    # time slices are interleaved by time, session ID groups are already in session order
+                    by_time = "sessions" not in shard_bodies[0]
+                    file_size, file_hash = merge_files([shard_path for shard_path, _, _ in good_shards], file_path, codec, by_time)
+        except Exception as e:
+            msg = self._get_error_message_from_exception(e)
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_MERGE.format(msg)), None, None
+        finally:
+            # checkpointed shards are kept until the capture is complete, in case the merge fails
+            if not resume:
+                for shard_path in shard_paths:
+                    if os.path.exists(shard_path):
+                        os.remove(shard_path)
+
+        return phantom.APP_SUCCESS, file_size, file_hash
+
+    def _fetch_capture(
+        self, action_result, data, shard_bodies, cap_type, temp_dir, file_path, resume=False, base_url=None, codec=None, window_end=None
+    ):
+        """Download a capture from the device into file_path, as a single request or as parallel shards.
+
+        :param action_result: object of ActionResult class
+        :param data: request body of the whole capture
+        :param shard_bodies: list of request bodies if the capture is split into shards, None otherwise
+        :param cap_type: capture type
+        :param temp_dir: temporary directory of the action
+        :param file_path: path of the capture file
+        :param resume: whether to checkpoint the download
+        :param base_url: URL of the appliance to download from, defaults to the primary appliance
+        :param codec: gzip or zstd to compress the capture as it is written
+        :param window_end: end of the time window of the capture (UTC), if it has one
+        :return: status success/failure, size of the capture and its SHA-256 hex digest, before compression
+        """
+
+        if resume:
+            with ExitStack() as stack:
+                # a capture that is not sharded is downloaded as a single checkpointed shard
+                try:
+                    work_dir = self._get_checkpoint_dir(data, base_url)
+                    # the lock file sits next to the directory, which is removed and recreated while the lock is held
+                    stack.enter_context(locked_file(f"{work_dir}.lock", blocking=False))
+                    shard_bodies = self._get_shard_plan(work_dir, shard_bodies or [data], window_end)
+                except BlockingIOError:
+                    return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_CHECKPOINT_BUSY), None, None
+                except Exception as e:
+                    msg = self._get_error_message_from_exception(e)
+                    return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_CHECKPOINT_DIR.format(msg)), None, None
+
+                ret_val, file_size, file_hash = self._download_sharded_capture(
+                    action_result, shard_bodies, cap_type, work_dir, file_path, resume=True, base_url=base_url, codec=codec
+                )
+
+                # the checkpoints of a failed download are kept for the next run
+                if phantom.is_success(ret_val):
+                    shutil.rmtree(work_dir, ignore_errors=True)
+
+                return ret_val, file_size, file_hash
+
+        if shard_bodies:
+            return self._download_sharded_capture(action_result, shard_bodies, cap_type, temp_dir, file_path, base_url=base_url, codec=codec)
+
+        return self._download_capture(action_result, data, file_path, base_url=base_url, codec=codec)
+
+    def _get_cached_capture(self, cache_key, file_path):
+        """Look up a capture in the capture cache, and make it available at file_path if it is cached.
+
+        :param cache_key: cache key of the request
+        :param file_path: path of the capture file
+        :return: size of the cached capture and its SHA-256 hex digest, or None if it is not cached
+        """
+
+        if not self._cache:
+            return None
+
+        try:
+            with self._perf.span("cache_lookup"):
+                cached = self._cache.get(cache_key, file_path)
+        except Exception as e:
+            self.debug_print(consts.NETWITNESS_ERR_CACHE, e)
+            return None
+
+        if cached:
+            self.save_progress(consts.NETWITNESS_CACHE_HIT)
+
+        return cached
+
+    def _cache_capture(self, cache_key, file_path, file_size, file_hash, compression=None):
+        """Add a downloaded capture to the capture cache. Failures are logged and otherwise ignored.
+
+        :param cache_key: cache key of the request
+        :param file_path: path of the capture file
+        :param file_size: size of the capture in bytes, before compression
+        :param file_hash: SHA-256 hex digest of the capture, before compression
+        :param compression: gzip or zstd if the capture file is compressed
+        """
+
+        if not self._cache:
+            return
+
+        try:
+            with self._perf.span("cache_store"):
+                self._cache.put(cache_key, file_path, file_size, file_hash, compression)
+        except Exception as e:
+            self.debug_print(consts.NETWITNESS_ERR_CACHE, e)
+
+    def _find_cached_capture_in_vault(self, request, output_format=None):
+        """Look for the capture of a request in the vault of the container without obtaining it, which is possible when
+        the capture cache knows its content. Only a capture of the primary appliance added to the vault as it is, or
+        converted to output_format, can be looked up this way; failures are logged and otherwise ignored.
+
+        :param request: capture request built by _build_capture_request
+        :param output_format: format the capture is converted to, None if it is stored as downloaded
+        :return: the vault item, or None if it is not in the vault or not known
+        """
+
+        if not self._cache or request["pcap_options"] or len(self._base_urls) > 1:
+            return None
+
+        try:
+            cached = self._cache.peek(capture_cache_key(self._base_url, request["data"], request["compression"]))
+            if not cached:
+                return None
+            return self._find_in_vault(self.get_container_id(), self._get_vault_lookup_keys(cached[1], output_format))
+        except Exception as e:
+            self.debug_print(consts.NETWITNESS_ERR_VAULT_LOOKUP, e)
+            return None
+
+    def _build_capture_request(self, action_result, param, cap_type):
+        """Validate the capture parameters and build the /sdk/packets request for them.
+
+        :param action_result: object of ActionResult class
+        :param param: dictionary of input parameters
+        :param cap_type: capture type
+        :return: status success/failure and a dictionary with the request body ("data"), the shard request bodies
+        ("shard_bodies", None if the capture is not split), the file name, the resume flag, the output format, the pcap
+        post-processing options and whether the captures of several appliances are merged
+        """
+
+        import uuid
+
+        # Check for optional input parameters
+        query = param.get(consts.NETWITNESS_JSON_QUERY)
+        time2 = param.get(consts.NETWITNESS_JSON_END_TIME)
+        time1 = param.get(consts.NETWITNESS_JSON_START_TIME)
+        filename = param.get(consts.NETWITNESS_JSON_FILE_NAME)
+        if filename and (filename in {".", ".."} or "/" in filename or "\\" in filename):
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_UNSAFE_FILE_NAME), None
+        session_id = param.get(consts.NETWITNESS_JSON_SESSION_ID)
+
+        ret_val, shard_count = self._validate_integer(
+            action_result, param.get(consts.NETWITNESS_JSON_SHARD_COUNT, 1), consts.NETWITNESS_JSON_SHARD_COUNT
+        )
+        if phantom.is_fail(ret_val):
+            return action_result.get_status(), None
+
+        resume = param.get(consts.NETWITNESS_JSON_RESUME, False)
+
+        output_format = param.get(consts.NETWITNESS_JSON_OUTPUT_FORMAT, consts.NETWITNESS_OUTPUT_FORMAT_JSON)
+        if output_format not in (consts.NETWITNESS_OUTPUT_FORMAT_JSON, consts.NETWITNESS_OUTPUT_FORMAT_NDJSON):
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_OUTPUT_FORMAT), None
+
+        ret_val, pcap_options = self._get_pcap_options(action_result, param)
+        if phantom.is_fail(ret_val):
+            return action_result.get_status(), None
+
+        merge = param.get(consts.NETWITNESS_JSON_MERGE, False)
+
+        ret_val, time_slice = self._validate_integer(
+            action_result, param.get(consts.NETWITNESS_JSON_TIME_SLICE), consts.NETWITNESS_JSON_TIME_SLICE
+        )
+        if phantom.is_fail(ret_val):
+            return action_result.get_status(), None
+
+        # Need either a session ID, or a complete timeframe
+        if not (session_id or query or (time1 and time2)):
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_BAD_PARAMS), None
+
+        if session_id:
+            try:
+                session_id = SessionIdSet(session_id)
+            except ValueError as e:
+                return action_result.set_status(phantom.APP_ERROR, str(e)), None
+
+        shard_bodies = None
+        base_query = None
+
+        if session_id:
+            # duplicate and adjacent IDs are coalesced into ranges
+            data = {"sessions": str(session_id)}
+
+            if query:
+                data["where"] = query
+
+            # Set filename
+            if not filename:
+                filename = "netwitness-{}".format(data["sessions"].replace(",", "_")[:50])
+
+            # session IDs too long for a single request are requested in several ones
+            sessions = session_id.split(shard_count, consts.NETWITNESS_MAX_SESSIONS_LENGTH)
+            if len(sessions) > 1:
+                shard_bodies = [dict(data, sessions=group) for group in sessions]
+
+        elif query:
+            base_query = query
+            if time1 and time2:
+                try:
+                    datetime.strptime(time1, consts.NETWITNESS_TIME_FORMAT)
+                    datetime.strptime(time2, consts.NETWITNESS_TIME_FORMAT)
+                except Exception as e:
+                    return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_INVALID_PARAM.format(message=e)), None
+
+                if time_slice:
+                    shard_bodies = [
+                        {"where": f'{query} && time="{start}"-"{end}"'} for start, end in split_time_window(time1, time2, time_slice)
+                    ]
+
+                query += f' && time="{time1}"-"{time2}"'
+
+            data = {"where": query}
+
+            # Set filename
+            if not filename:
+                filename = f"netwitness-{uuid.uuid4()}"
+
+        elif time1 and time2:
+            try:
+                datetime.strptime(time1, consts.NETWITNESS_TIME_FORMAT)
+                datetime.strptime(time2, consts.NETWITNESS_TIME_FORMAT)
+            except Exception as e:
+                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_INVALID_PARAM.format(message=e)), None
+
+            if time1 > time2:
+                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_REVERSE_TIMES), None
+
+            # Prepare request body
+            data = {"time1": time1, "time2": time2}
+
+            if time_slice:
+                shard_bodies = [{"time1": start, "time2": end} for start, end in split_time_window(time1, time2, time_slice)]
+
+            # Set filename
+            if not filename:
+                filename = (f"netwitness-{time1}_{time2}").replace("/", "-")
+
+        if not (filename.endswith(".pcap") or filename.endswith(".json")):
+            filename = f"{filename}.{consts.NETWITNESS_FILE_TYPE_DICT[cap_type]}"
+
+        if shard_bodies and len(shard_bodies) > consts.NETWITNESS_MAX_SHARDS:
+            return (
+                action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_TOO_MANY_SHARDS.format(max=consts.NETWITNESS_MAX_SHARDS)),
+                None,
+            )
+
+        # Set the cap type in the request body
+        data["render"] = consts.NETWITNESS_CAP_TYPE_DICT[cap_type]
+
+        if shard_bodies and len(shard_bodies) > 1:
+            for shard_body in shard_bodies:
+                shard_body["render"] = data["render"]
+        else:
+            shard_bodies = None
+
+        return phantom.APP_SUCCESS, {
+            "data": data,
+            "shard_bodies": shard_bodies,
+            "file_name": filename,
+            "resume": resume,
+            "output_format": output_format,
+            "pcap_options": pcap_options if cap_type == consts.NETWITNESS_CAP_TYPE_PACKET else None,
+            "merge": merge,
+            # a capture that is added to the vault as it is downloaded is compressed on the fly
+            "compression": self._get_capture_codec(output_format, pcap_options, merge and len(self._base_urls) > 1),
+            # criteria from which the capture can be split into shards of another size
+            "split": {"session_ids": session_id, "query": base_query, "time1": time1, "time2": time2},
+        }
+
+    def _get_capture_codec(self, output_format, pcap_options, merged=False):
+        """Return the codec with which a capture is compressed as it is downloaded or merged: the configured compression
+        if the capture is added to the vault as it is, None if it is converted, processed or merged afterwards
+        """
+
+        if output_format == consts.NETWITNESS_OUTPUT_FORMAT_NDJSON or pcap_options or merged:
+            return None
+
+        return self._compression
+
+    def _get_pcap_options(self, action_result, param):
+        """Validate the packet capture post-processing parameters.
+
+        :param action_result: object of ActionResult class
+        :param param: dictionary of input parameters
+        :return: status success/failure and the keyword arguments of process_pcap, None if no post-processing is requested
+        """
+
+        options = {}
+
+        for key in (consts.NETWITNESS_JSON_SNAPLEN, consts.NETWITNESS_JSON_SPLIT_SIZE, consts.NETWITNESS_JSON_SPLIT_COUNT):
+            ret_val, options[key] = self._validate_integer(action_result, param.get(key), key)
+            if phantom.is_fail(ret_val):
+                return action_result.get_status(), None
+
+        if options[consts.NETWITNESS_JSON_SPLIT_SIZE]:
+            # split_size is given in MB
+            options[consts.NETWITNESS_JSON_SPLIT_SIZE] *= 1024 * 1024
+
+        packet_filter = param.get(consts.NETWITNESS_JSON_PACKET_FILTER)
+        if packet_filter:
+            try:
+                options[consts.NETWITNESS_JSON_PACKET_FILTER] = PcapFilter(packet_filter)
+            except ValueError as e:
+                return action_result.set_status(phantom.APP_ERROR, str(e)), None
+
+        return phantom.APP_SUCCESS, options if any(options.values()) else None
+
+    def _obtain_capture(self, action_result, request, cap_type, temp_dir, base_url=None):
+        """Get a capture from the capture cache, or download it from the device into temp_dir.
+
+        :param action_result: object of ActionResult class
+        :param request: capture request built by _build_capture_request
+        :param cap_type: capture type
+        :param temp_dir: directory in which the capture is downloaded
+        :param base_url: URL of the appliance to download from, defaults to the primary appliance
+        :return: status success/failure and a dictionary with the path, size and SHA-256 of the capture (before
+        compression) and its compression; None if there is no capture data. The caller owns the capture file, which is
+        a link to the cache entry on a cache hit: it may be moved or removed, not modified in place.
+        """
+
+        codec = request["compression"]
+        cache_key = capture_cache_key(base_url or self._base_url, request["data"], codec)
+        file_path = os.path.join(temp_dir, request["file_name"])
+        cached = self._get_cached_capture(cache_key, file_path)
+
+        if cached:
+            file_size, file_hash = cached
+            action_result.update_summary({"cache_hit": True})
+            return phantom.APP_SUCCESS, {"path": file_path, "size": file_size, "sha256": file_hash, "compression": codec}
+
+        # the appliance is only probed when the capture is not cached, so that a cache hit does not contact it at all
+        ret_val, _, message = self._get_capabilities(base_url or self._base_url)
+        if phantom.is_fail(ret_val):
+            return action_result.set_status(phantom.APP_ERROR, message), None
+
+        shard_bodies = request["shard_bodies"]
+        if self._preflight:
+            ret_val, strategy, shard_bodies = self._plan_capture(action_result, request, base_url)
+            if phantom.is_fail(ret_val):
+                return action_result.get_status(), None
+            if strategy == consts.NETWITNESS_FETCH_NONE:
+                return phantom.APP_SUCCESS, None
+
+        with self._perf.span("fetch"):
+            ret_val, file_size, file_hash = self._fetch_capture(
+                action_result,
+                request["data"],
+                shard_bodies,
+                cap_type,
+                temp_dir,
+                file_path,
+                request["resume"],
+                base_url,
+                codec,
+                None if request["split"]["session_ids"] else request["split"]["time2"],
+            )
+        if phantom.is_fail(ret_val):
+            return action_result.get_status(), None
+
+        if self._check_for_bad_cap(file_size, file_hash):
+            return phantom.APP_SUCCESS, None
+
+        self._cache_capture(cache_key, file_path, file_size, file_hash, codec)
+
+        return phantom.APP_SUCCESS, {"path": file_path, "size": file_size, "sha256": file_hash, "compression": codec}
+
+    def _plan_capture(self, action_result, request, base_url=None):
+        """Estimate the number of sessions and bytes of a capture with an SDK count query for the same criteria, and
+        choose how to fetch it: not at all if it is empty, as parallel shards of about auto_shard_size MB if it is
+        larger than that and not already split, and as requested otherwise. A capture larger than max_capture_size MB
+        is refused. If the device cannot estimate the capture, it is fetched as requested.
+
+        :param action_result: object of ActionResult class
+        :param request: capture request built by _build_capture_request
+        :param base_url: URL of the appliance to query, defaults to the primary appliance
+        :return: status success/failure, fetch strategy and the shard request bodies (None if the capture is not split)
+        """
+
+        shard_bodies = request["shard_bodies"]
+        strategy = consts.NETWITNESS_FETCH_SHARDED if shard_bodies else consts.NETWITNESS_FETCH_SINGLE
+
+        # the count query would be as long as the session IDs that do not fit in a single request
+        if len(request["data"].get("sessions", "")) > consts.NETWITNESS_MAX_SESSIONS_LENGTH:
+            return phantom.APP_SUCCESS, strategy, shard_bodies
+
+        if self._get_capability(base_url, "estimate") is False:
+            return phantom.APP_SUCCESS, strategy, shard_bodies
+
+        estimate_result = phantom.ActionResult()
+        data = {"msg": "query", "query": build_estimate_query(request["data"]), "force-content-type": "application/json"}
+        with self._perf.span("estimate"):
+            ret_val, resp = self._make_rest_call(estimate_result, endpoint=consts.NETWITNESS_ENDPOINT_SDK, data=data, base_url=base_url)
+
+        estimate = body = None
+        if phantom.is_success(ret_val):
+            try:
+                body = resp.json()
+            except ValueError:
+                pass
+            estimate = parse_query_estimate(body)
+        if estimate is None:
+            # a device without the count query, or that answers it without counts, is not asked again; other errors,
+            # such as a malformed where clause, come from the request and leave the capability alone
+            if body is not None or (resp is not None and resp.status_code in consts.NETWITNESS_ESTIMATE_UNSUPPORTED_STATUS_CODES):
+                self._set_capability(base_url, "estimate", False)
+            self.debug_print(consts.NETWITNESS_ERR_ESTIMATE.format(estimate_result.get_message() or consts.NETWITNESS_ERR_ESTIMATE_RESPONSE))
+            return phantom.APP_SUCCESS, strategy, shard_bodies
+
+        sessions, size = estimate
+        action_result.update_summary({"estimated_sessions": sessions, "estimated_size": size})
+
+        if not sessions:
+            strategy = consts.NETWITNESS_FETCH_NONE
+            shard_bodies = None
+        elif self._max_capture_size and size > self._max_capture_size * 1024 * 1024:
+            return (
+                action_result.set_status(
+                    phantom.APP_ERROR,
+                    consts.NETWITNESS_ERR_CAPTURE_TOO_LARGE.format(
+                        sessions=sessions, size=math.ceil(size / (1024 * 1024)), max=self._max_capture_size
+                    ),
+                ),
+                None,
+                None,
+            )
+        elif not shard_bodies and self._auto_shard_size and size > self._auto_shard_size * 1024 * 1024:
+            shards = min(math.ceil(size / (self._auto_shard_size * 1024 * 1024)), consts.NETWITNESS_MAX_SHARDS)
+            shard_bodies = self._split_capture_request(request, shards)
+            if shard_bodies:
+                strategy = consts.NETWITNESS_FETCH_SHARDED
+
+        self.debug_print(consts.NETWITNESS_ESTIMATE.format(sessions=sessions, size=size, strategy=strategy))
+        action_result.update_summary({"fetch_strategy": strategy})
+
+        return phantom.APP_SUCCESS, strategy, shard_bodies
+
+    def _split_capture_request(self, request, shards):
+        """Split a capture request into shards, by session IDs or by time slices, the way shard_count and time_slice do.
+
+        :param request: capture request built by _build_capture_request
+        :param shards: number of shards to create
+        :return: list of shard request bodies, None if the request cannot be split
+        """
+
+        split = request["split"]
+        render = request["data"]["render"]
+
+        if split["session_ids"]:
+            shard_bodies = [
+                dict(request["data"], sessions=sessions)
+                for sessions in split["session_ids"].split(shards, consts.NETWITNESS_MAX_SESSIONS_LENGTH)
+            ]
+        elif split["time1"] and split["time2"]:
+            start = datetime.strptime(split["time1"], consts.NETWITNESS_TIME_FORMAT)
+            end = datetime.strptime(split["time2"], consts.NETWITNESS_TIME_FORMAT)
+            slice_minutes = max(1, math.ceil(((end - start).total_seconds() + 1) / 60 / shards))
+            time_slices = split_time_window(split["time1"], split["time2"], slice_minutes)
+            if split["query"]:
+                shard_bodies = [{"where": f'{split["query"]} && time="{first}"-"{last}"', "render": render} for first, last in time_slices]
+            else:
+                shard_bodies = [{"time1": first, "time2": last, "render": render} for first, last in time_slices]
+        else:
+            return None
+
+        return shard_bodies if len(shard_bodies) > 1 else None
+
+    def _obtain_appliance_captures(self, action_result, request, cap_type, temp_dir):
+        """Obtain the capture of a request from every configured appliance. With several appliances, they are queried
+        concurrently, so that the action takes as long as the slowest of them, and an appliance that fails does not
+        fail the others.
+
+        :param action_result: object of ActionResult class
+        :param request: capture request built by _build_capture_request
+        :param cap_type: capture type
+        :param temp_dir: directory in which the captures are downloaded
+        :return: status success/failure, the captures (see _obtain_capture) of the appliances that have capture data,
+        with the URL of their appliance ("appliance") when there are several, and the errors of the failed appliances
+        """
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        if len(self._base_urls) == 1:
+            ret_val, capture = self._obtain_capture(action_result, request, cap_type, temp_dir)
+            return ret_val, [capture] if capture else [], []
+
+        max_workers = min(len(self._base_urls), consts.NETWITNESS_MAX_APPLIANCE_WORKERS)
+        self.save_progress(consts.NETWITNESS_APPLIANCE_PROGRESS.format(appliances=len(self._base_urls), workers=max_workers))
+
+        def obtain(base_url):
+            appliance_result = phantom.ActionResult()
+            ret_val, capture = self._obtain_capture(appliance_result, request, cap_type, tempfile.mkdtemp(dir=temp_dir), base_url)
+            return ret_val, appliance_result, capture
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(obtain, self._base_urls))
+
+        captures = []
+        failures = []
+        for base_url, (ret_val, appliance_result, capture) in zip(self._base_urls, results):
+            if phantom.is_fail(ret_val):
+                failures.append(consts.NETWITNESS_APPLIANCE_FAILED.format(url=base_url, message=appliance_result.get_message()))
+            elif capture:
+                captures.append(dict(capture, appliance=base_url))
+
+        action_result.update_summary(
+            {
+                "transfer_size": sum(appliance_result.get_summary().get("transfer_size", 0) for _, appliance_result, _ in results),
+                "appliances": len(self._base_urls),
+                "appliances_with_data": len(captures),
+                "failed_appliances": len(failures),
+            }
+        )
+
+        if len(failures) == len(self._base_urls):
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_ALL_APPLIANCES.format("; ".join(failures))), [], failures
+
+        return phantom.APP_SUCCESS, captures, failures
+
+    def _report_appliance_failures(self, action_result, failures, total=None):
+        """Add the errors of the appliances that failed, out of total (all the configured appliances by default), to the
+        message of a successful action result"""
+
+        total = total or len(self._base_urls)
+        details = consts.NETWITNESS_APPLIANCES_FAILED.format(failed=len(failures), total=total, details="; ".join(failures))
+        message = action_result.get_message()
+        action_result.set_status(phantom.APP_SUCCESS, f"{message}. {details}" if message else details)
+
+    def _get_appliance_file_name(self, file_name, base_url):
+        """Return the name of the vault file of an appliance's capture: the file name suffixed with the appliance host"""
+
+        host = re.sub(r"[^A-Za-z0-9._-]", "_", urlparse(base_url).netloc or base_url)
+        stem, extension = os.path.splitext(file_name)
+
+        return f"{stem}-{host}{extension}"
+
+    def _merge_captures(self, action_result, captures, file_path, cap_type, codec=None):
+        """Merge uncompressed captures, in order, into file_path.
+
+        :param action_result: object of ActionResult class
+        :param captures: captures returned by _obtain_capture
+        :param file_path: path of the merged capture
+        :param cap_type: capture type
+        :param codec: gzip or zstd to compress the merged capture as it is written
+        :return: status success/failure and the merged capture
+        """
+
+        merge_files = merge_pcap_files if cap_type == consts.NETWITNESS_CAP_TYPE_PACKET else merge_json_files
+
+        try:
+            with self._perf.span("merge"):
+                file_size, file_hash = merge_files([capture["path"] for capture in captures], file_path, codec)
+        except Exception as e:
+            msg = self._get_error_message_from_exception(e)
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_MERGE.format(msg)), None
+
+        return phantom.APP_SUCCESS, {"path": file_path, "size": file_size, "sha256": file_hash, "compression": codec}
+
+    def _vault_appliance_captures(self, action_result, request, captures, cap_type, temp_dir):
+        """Add the captures of several appliances to the vault, merged into one file if the request asks for it, or
+        as one file per appliance named after it. The data of every vault file reports its appliance(s).
+
+        :param action_result: object of ActionResult class
+        :param request: capture request built by _build_capture_request
+        :param captures: captures returned by _obtain_appliance_captures
+        :param cap_type: capture type
+        :param temp_dir: temporary directory of the action
+        :return: status success/failure
+        """
+
+        if request["merge"] and len(captures) > 1:
+            file_path = os.path.join(temp_dir, request["file_name"])
+            codec = self._get_capture_codec(request["output_format"], request["pcap_options"])
+            ret_val, merged = self._merge_captures(action_result, captures, file_path, cap_type, codec)
+            if phantom.is_fail(ret_val):
+                return ret_val
+            vault_files = [(merged, request["file_name"], ", ".join(capture["appliance"] for capture in captures))]
+        else:
+            vault_files = [
+                (capture, self._get_appliance_file_name(request["file_name"], capture["appliance"]), capture["appliance"])
+                for capture in captures
+            ]
+
+        for capture, file_name, appliance in vault_files:
+            first_entry = len(action_result.get_data())
+            ret_val = self._vault_capture(
+                action_result,
+                capture,
+                file_name,
+                cap_type,
+                temp_dir,
+                request["output_format"],
+                request["pcap_options"],
+                {"appliance": appliance},
+            )
+            if phantom.is_fail(ret_val):
+                return ret_val
+            for vault_details in action_result.get_data()[first_entry:]:
+                vault_details["appliance"] = appliance
+
+        return action_result.get_status()
+
+    def _vault_capture(
+        self, action_result, capture, file_name, cap_type, temp_dir, output_format=None, pcap_options=None, metadata=None, container_id=None
+    ):
+        """Add a capture to the vault of the container, unless a file with the same content is already there.
+
+        :param action_result: object of ActionResult class
+        :param capture: capture returned by _obtain_capture
+        :param file_name: name of the vault file
+        :param cap_type: capture type
+        :param temp_dir: directory in which the vault file is prepared
+        :param output_format: NETWITNESS_OUTPUT_FORMAT_NDJSON to convert a log capture to NDJSON
+        :param pcap_options: keyword arguments of process_pcap to filter, truncate or split a packet capture
+        :param metadata: details added to the vault metadata of the file
+        :param container_id: ID of the container, defaults to the container of the action
+        :return: status success/failure
+        """
+
+        if pcap_options:
+            return self._vault_processed_pcap(action_result, capture, file_name, temp_dir, pcap_options)
+
+        container_id = container_id or self.get_container_id()
+        type_str = consts.NETWITNESS_FILE_TYPE_DICT[cap_type]
+        if output_format != consts.NETWITNESS_OUTPUT_FORMAT_NDJSON:
+            output_format = None
+        index_keys = self._get_vault_lookup_keys(capture["sha256"], output_format)
+
+        # Check if a file with the same content is already available in the vault and save only if it is not available
+        try:
+            vault_item = self._find_in_vault(container_id, index_keys)
+        except Exception as e:
+            msg = self._get_error_message_from_exception(e)
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_VAULT_INFO.format(msg))
+
+        if vault_item:
+            return self._report_vault_item(action_result, vault_item, output_format or type_str)
+
+        # the file the vault receives is the downloaded capture, possibly converted, and compressed as it was written
+        source_path = capture["path"]
+        file_size = capture["size"]
+        metadata = dict(metadata or {})
+        compressed = bool(self._compression) and capture.get("compression") == self._compression
+
+        if output_format:
+            type_str = output_format
+            file_name = f"{file_name[: -len('.json')] if file_name.endswith('.json') else file_name}.{output_format}"
+            ndjson_path = os.path.join(temp_dir, f"{file_name}.tmp")
+
+            try:
+                with self._perf.span("ndjson"):
+                    file_size, _, stats = write_ndjson(source_path, ndjson_path, self._compression)
+            except Exception as e:
+                msg = self._get_error_message_from_exception(e)
+                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_NDJSON.format(msg))
+
+            os.remove(source_path)
+            source_path = ndjson_path
+            compressed = bool(self._compression)
+            metadata.update(stats, format=output_format)
+            action_result.update_summary(stats)
+
+        if self._compression:
+            file_name = f"{file_name}.{consts.NETWITNESS_COMPRESSION_EXTENSIONS[self._compression]}"
+
+        file_path = os.path.join(temp_dir, file_name)
+
+        if self._compression and not compressed:
+            # a capture downloaded to be merged that turned out to be the only one, as when a single appliance has data
+            try:
+                with self._perf.span("compress"):
+                    compress_file(source_path, file_path, self._compression)
+            except Exception as e:
+                msg = self._get_error_message_from_exception(e)
+                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_COMPRESSION.format(msg))
+
+            # the uncompressed file is not needed anymore, free its space before the vault copies the file
+            os.remove(source_path)
+        elif source_path != file_path:
+            try:
+                os.replace(source_path, file_path)
+            except Exception as e:
+                self.error_print(consts.NETWITNESS_FILE_ERR, e)
+                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_FILE_ERR, e)
+
+        if self._compression:
+            file_size = os.path.getsize(file_path)
+            metadata.update(compression=self._compression, compressed_size=file_size)
+
+        if metadata:
+            metadata.update(raw_size=capture["size"], raw_sha256=capture["sha256"])
+
+        return_val = self._move_file_to_vault(container_id, file_size, type_str, file_path, action_result, index_keys[0], metadata)
+
+        # Something went wrong while moving file to vault
+        if phantom.is_fail(return_val):
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_VAULT)
+
+        action_result.update_summary({"file_availability": True})
+        return action_result.set_status(phantom.APP_SUCCESS)
+
+    def _vault_processed_pcap(self, action_result, capture, file_name, temp_dir, pcap_options):
+        """Filter, truncate and split a packet capture, then add the resulting files to the vault. Every file is
+        deduplicated on its own content.
+
+        :param action_result: object of ActionResult class
+        :param capture: capture returned by _obtain_capture
+        :param file_name: name of the vault file, numbered when the capture is split
+        :param temp_dir: temporary directory of the action
+        :param pcap_options: keyword arguments of process_pcap
+        :return: status success/failure
+        """
+
+        try:
+            with self._perf.span("pcap_processing"):
+                outputs = process_pcap(capture["path"], tempfile.mkdtemp(dir=temp_dir), file_name, codec=self._compression, **pcap_options)
+        except Exception as e:
+            msg = self._get_error_message_from_exception(e)
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_PCAP_PROCESSING.format(msg))
+
+        os.remove(capture["path"])
+
+        # the captures of several appliances add up in the summary
+        summary = action_result.get_summary()
+        action_result.update_summary(
+            {
+                "packet_count": summary.get("packet_count", 0) + sum(output["packet_count"] for output in outputs),
+                "parts": summary.get("parts", 0) + len(outputs),
+            }
+        )
+
+        if not outputs:
+            action_result.update_summary({"file_availability": summary.get("file_availability", False)})
+            return action_result.set_status(phantom.APP_SUCCESS, consts.NETWITNESS_ERR_NO_MATCHING_PACKETS)
+
+        for index, output in enumerate(outputs):
+            metadata = {"packet_count": output["packet_count"], "source_sha256": capture["sha256"]}
+            if len(outputs) > 1:
+                metadata.update(part=index + 1, parts=len(outputs))
+
+            ret_val = self._vault_capture(
+                action_result,
+                {"path": output["path"], "size": output["size"], "sha256": output["sha256"], "compression": self._compression},
+                output["name"],
+                consts.NETWITNESS_CAP_TYPE_PACKET,
+                temp_dir,
+                metadata=metadata,
+            )
+            if phantom.is_fail(ret_val):
+                return ret_val
+
+        return action_result.set_status(phantom.APP_SUCCESS)
+
+    def _capture_to_vault(self, action_result, request, cap_type):
+        """Obtain a capture, from every configured appliance, and add it to the vault.
+
+        :param action_result: object of ActionResult class
+        :param request: capture request built by _build_capture_request
+        :param cap_type: capture type
+        :return: status success/failure
+        """
+
+        # a capture whose content is known from the cache is looked up in the vault before it is fetched, or even linked
+        output_format = request["output_format"] if request["output_format"] == consts.NETWITNESS_OUTPUT_FORMAT_NDJSON else None
+        vault_item = self._find_cached_capture_in_vault(request, output_format)
+        if vault_item:
+            action_result.update_summary({"cache_hit": True})
+            return self._report_vault_item(action_result, vault_item, output_format or consts.NETWITNESS_FILE_TYPE_DICT[cap_type])
+
+        temp_dir = self._create_temp_dir()
+
+        try:
+            ret_val, captures, failures = self._obtain_appliance_captures(action_result, request, cap_type, temp_dir)
+            if phantom.is_fail(ret_val):
+                return action_result.get_status()
+
+            if not captures:
+                action_result.update_summary({"file_availability": False})
+                ret_val = action_result.set_status(phantom.APP_SUCCESS, consts.NETWITNESS_ERR_BAD_CAP)
+            elif len(self._base_urls) == 1:
+                return self._vault_capture(
+                    action_result, captures[0], request["file_name"], cap_type, temp_dir, request["output_format"], request["pcap_options"]
+                )
+            else:
+                ret_val = self._vault_appliance_captures(action_result, request, captures, cap_type, temp_dir)
+
+            if failures and phantom.is_success(ret_val):
+                self._report_appliance_failures(action_result, failures)
+
+            return ret_val
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _get_capture(self, param, cap_type):
+        """Download a capture file from RSA NetWitness based on given criteria"""
+
+        action_result = self.add_action_result(phantom.ActionResult(dict(param)))
+        action_result.update_summary({})
+
+        ret_val, request = self._build_capture_request(action_result, param, cap_type)
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        return self._capture_to_vault(action_result, request, cap_type)
+
+    def _capture_batch_item(self, item_param, cap_type, merge, temp_dir):
+        """Process one item of a batch capture. Runs on a worker thread, so it reports through its own ActionResult.
+
+        :param item_param: capture parameters of the item
+        :param cap_type: capture type
+        :param merge: if True the capture is only downloaded (to be merged), otherwise it is added to the vault
+        :param temp_dir: directory in which captures to merge are downloaded
+        :return: ActionResult of the item and, when merging, the captures returned by _obtain_appliance_captures
+        """
+
+        item_result = phantom.ActionResult(dict(item_param))
+
+        session_ids = item_param.get(consts.NETWITNESS_JSON_SESSION_ID)
+        if session_ids and not self._verify_session_ids(session_ids):
+            item_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_INVALID_SESSION_IDS.format(session_ids=session_ids))
+            return item_result, []
+
+        ret_val, request = self._build_capture_request(item_result, item_param, cap_type)
+        if phantom.is_fail(ret_val):
+            return item_result, []
+
+        if not merge:
+            self._capture_to_vault(item_result, request, cap_type)
+            return item_result, []
+
+        # the captures of the items are merged before they are compressed
+        request["compression"] = None
+        ret_val, captures, failures = self._obtain_appliance_captures(item_result, request, cap_type, tempfile.mkdtemp(dir=temp_dir))
+        if phantom.is_success(ret_val):
+            item_result.update_summary({"file_availability": bool(captures)})
+            item_result.set_status(phantom.APP_SUCCESS, "" if captures else consts.NETWITNESS_ERR_BAD_CAP)
+            if failures:
+                self._report_appliance_failures(item_result, failures)
+
+        return item_result, captures
+
+    def _batch_capture(self, param):
+        """Download the captures of several session ID sets and/or queries in one action run, either as one vault file
+        per item or merged into a single capture"""
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        action_result = self.add_action_result(phantom.ActionResult(dict(param)))
+
+        cap_type = param.get(consts.NETWITNESS_JSON_CAPTURE_TYPE, consts.NETWITNESS_CAP_TYPE_PACKET)
+        if cap_type not in consts.NETWITNESS_FILE_TYPE_DICT:
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_CAPTURE_TYPE)
+
+        merge = param.get(consts.NETWITNESS_JSON_MERGE, False)
+
+        ret_val, max_concurrency = self._validate_integer(
+            action_result,
+            param.get(consts.NETWITNESS_JSON_MAX_CONCURRENCY, consts.NETWITNESS_DEFAULT_BATCH_WORKERS),
+            consts.NETWITNESS_JSON_MAX_CONCURRENCY,
+        )
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        filename = param.get(consts.NETWITNESS_JSON_FILE_NAME)
+        if filename and (filename in {".", ".."} or "/" in filename or "\\" in filename):
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_UNSAFE_FILE_NAME)
+
+        items = [
+            {consts.NETWITNESS_JSON_SESSION_ID: session_ids.strip()}
+            for session_ids in param.get(consts.NETWITNESS_JSON_SESSION_ID_SETS, "").split(";")
+            if session_ids.strip()
+        ]
+
+        queries = param.get(consts.NETWITNESS_JSON_QUERIES)
+        if queries:
+            try:
+                queries = json.loads(queries)
+                if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+                    raise ValueError(consts.NETWITNESS_ERR_QUERIES)
+            except Exception:
+                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_QUERIES)
+
+            for query in queries:
+                item = {consts.NETWITNESS_JSON_QUERY: query}
+                for key in (consts.NETWITNESS_JSON_START_TIME, consts.NETWITNESS_JSON_END_TIME):
+                    if param.get(key):
+                        item[key] = param[key]
+                items.append(item)
+
+        if not items:
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_NO_BATCH_ITEMS)
+
+        if len(items) > consts.NETWITNESS_MAX_BATCH_ITEMS:
+            return action_result.set_status(
+                phantom.APP_ERROR, consts.NETWITNESS_ERR_TOO_MANY_BATCH_ITEMS.format(max=consts.NETWITNESS_MAX_BATCH_ITEMS)
+            )
+
+        max_workers = min(len(items), max_concurrency, consts.NETWITNESS_MAX_BATCH_WORKERS)
+        self.save_progress(consts.NETWITNESS_BATCH_PROGRESS.format(items=len(items), workers=max_workers))
+
+        temp_dir = self._create_temp_dir()
+
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(lambda item: self._capture_batch_item(item, cap_type, merge, temp_dir), items))
+
+            succeeded = 0
+            for item, (item_result, _) in zip(items, results):
+                item_data = dict(item)
+                item_data["status"] = "success" if phantom.is_success(item_result.get_status()) else "failed"
+                item_data["message"] = item_result.get_message()
+                item_data["file_availability"] = item_result.get_summary().get("file_availability", False)
+                # an item has one vault file per appliance and per part of a split packet capture
+                if not merge:
+                    item_data["files"] = item_result.get_data()
+                action_result.add_data(item_data)
+                succeeded += phantom.is_success(item_result.get_status())
+
+            action_result.update_summary({"total_items": len(items), "successful_items": succeeded, "failed_items": len(items) - succeeded})
+
+            if not succeeded:
+                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_BATCH_FAILED)
+
+            if merge:
+                captures = [capture for _, item_captures in results for capture in item_captures]
+                ret_val = self._vault_merged_batch(action_result, captures, filename, cap_type, temp_dir)
+                if phantom.is_fail(ret_val):
+                    return action_result.get_status()
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        return action_result.set_status(phantom.APP_SUCCESS, consts.NETWITNESS_SUCC_BATCH.format(succeeded=succeeded, total=len(items)))
+
+    def _vault_merged_batch(self, action_result, captures, filename, cap_type, temp_dir):
+        """Merge the captures of a batch, in item order, into a single capture and add it to the vault.
+
+        :param action_result: object of ActionResult class
+        :param captures: captures returned by _obtain_capture for the items that have capture data
+        :param filename: name of the merged file, generated if not given
+        :param cap_type: capture type
+        :param temp_dir: working directory of the batch
+        :return: status success/failure
+        """
+
+        import uuid
+
+        type_str = consts.NETWITNESS_FILE_TYPE_DICT[cap_type]
+
+        if not captures:
+            action_result.update_summary({"file_availability": False})
+            return phantom.APP_SUCCESS
+
+        if not filename:
+            filename = f"netwitness-batch-{uuid.uuid4()}"
+        if not filename.endswith(f".{type_str}"):
+            filename = f"{filename}.{type_str}"
+
+        ret_val, merged = self._merge_captures(action_result, captures, os.path.join(temp_dir, filename), cap_type, self._compression)
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        ret_val = self._vault_capture(action_result, merged, filename, cap_type, temp_dir)
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        # the vault file is reported in the summary, the data holds one entry per item
+        vault_details = action_result.get_data().pop()
+        action_result.update_summary(
+            {
+                consts.NETWITNESS_JSON_FILE_NAME: vault_details[consts.NETWITNESS_JSON_FILE_NAME],
+                phantom.APP_JSON_VAULT_ID: vault_details[phantom.APP_JSON_VAULT_ID],
+            }
+        )
+
+        return phantom.APP_SUCCESS
+
+    def _get_pcap(self, param):
+        return self._get_capture(param, consts.NETWITNESS_CAP_TYPE_PACKET)
+
+    def _get_log_capture(self, param):
+        return self._get_capture(param, consts.NETWITNESS_CAP_TYPE_LOG)
+
+    def _upload_file(self, param):
+        """This method uploads a parser from the vault to a NetWitness decoder"""
+
+        self.debug_print(param)
+        action_result = self.add_action_result(phantom.ActionResult(dict(param)))
+
+        ret_val, file_info = self._get_vault_file(action_result, param[phantom.APP_JSON_VAULT_ID])
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        return self._send_file(action_result, file_info, param.get(consts.NETWITNESS_JSON_VERIFY, False), report_progress=True)
+
+    def _get_vault_file(self, action_result, vault_id):
+        """Look up a file in the vault.
+
+        :param action_result: object of ActionResult class
+        :param vault_id: vault ID of the file
+        :return: status success/failure and the vault info of the file
+        """
+
+        import phantom.rules as ph_rules
+
+        # check the vault for a file with the supplied ID
+        try:
+            success, message, vault_meta_info = ph_rules.vault_info(vault_id=vault_id)
+            if not success:
+                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_VAULT_INFO.format(message)), None
+            file_info = next(iter(vault_meta_info))
+        except Exception as e:
+            msg = self._get_error_message_from_exception(e)
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_VAULT_INFO.format(msg)), None
+
+        if not file_info.get("path"):
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_NOT_IN_VAULT), None
+
+        return phantom.APP_SUCCESS, file_info
+
+    def _send_file(self, action_result, file_info, verify, report_progress=False, base_url=None):
+        """Upload a parser or feed file from the vault to a decoder and set the status of the action result. The size,
+        SHA-256 and throughput of the upload are added to its summary.
+
+        :param action_result: object of ActionResult class
+        :param file_info: vault info of the file
+        :param verify: if True, check that the decoder lists the file after the upload
+        :param report_progress: if True, report the progress of the upload
+        :param base_url: URL of the decoder, defaults to the primary appliance
+        :return: status success/failure
+        """
+
+        service = self._get_capability(base_url, "service")
+        if service and service.lower() not in consts.NETWITNESS_DECODER_SERVICES:
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_NOT_DECODER.format(service=service))
+
+        file_name = file_info["name"]
+        start = time.monotonic()
+        next_report = consts.NETWITNESS_UPLOAD_PROGRESS_STEP
+
+        def progress(sent, total):
+            nonlocal next_report
+            percent = sent * 100 // total if total else 100
+            if percent + consts.NETWITNESS_UPLOAD_PROGRESS_STEP < next_report:
+                # the body is sent again from the start when the request is retried
+                next_report = consts.NETWITNESS_UPLOAD_PROGRESS_STEP
+            if percent < next_report and sent < total:
+                return
+            next_report = percent - percent % consts.NETWITNESS_UPLOAD_PROGRESS_STEP + consts.NETWITNESS_UPLOAD_PROGRESS_STEP
+            rate = int(sent / max(time.monotonic() - start, 0.001))
+            self.send_progress(consts.NETWITNESS_UPLOAD_PROGRESS.format(sent=sent, total=total, percent=percent, rate=rate))
+
+        try:
+            encoder = MultipartFileEncoder("file", file_name, file_info["path"], progress=progress if report_progress else None)
+        except OSError as e:
+            msg = self._get_error_message_from_exception(e)
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_READ_VAULT_FILE.format(msg))
+
+        # the file is streamed from the vault, so memory usage does not depend on its size
+        with self._perf.span("upload"):
+            ret_val, _ = self._make_rest_call(
+                action_result,
+                endpoint=consts.NETWITNESS_ENDPOINT_UPLOAD,
+                data=encoder,
+                headers={"Content-Type": encoder.content_type},
+                method="post",
+                base_url=base_url,
+            )
+
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        self._perf.count("bytes_sent", encoder.file_size)
+        upload_seconds = time.monotonic() - start
+        action_result.update_summary(
+            {
+                "size": encoder.file_size,
+                "sha256": encoder.sha256,
+                "throughput_bps": int(encoder.file_size / upload_seconds) if upload_seconds else 0,
+            }
+        )
+
+        # the file read from the vault must be the file that was added to it
+        expected_hash = (file_info.get("metadata") or {}).get("sha256")
+        if expected_hash and encoder.sha256 and expected_hash.lower() != encoder.sha256:
+            return action_result.set_status(
+                phantom.APP_ERROR, consts.NETWITNESS_ERR_UPLOAD_CHECKSUM.format(sha256=encoder.sha256, expected=expected_hash)
+            )
+
+        if not verify:
+            return action_result.set_status(phantom.APP_SUCCESS, consts.NETWITNESS_SUCC_UPLOAD)
+
+        ret_val = self._verify_upload(action_result, file_name, base_url)
+        action_result.update_summary({"verified": phantom.is_success(ret_val)})
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        return action_result.set_status(phantom.APP_SUCCESS, consts.NETWITNESS_SUCC_UPLOAD_VERIFIED)
+
+    def _verify_upload(self, action_result, file_name, base_url=None):
+        """Check that the decoder lists an uploaded parser or feed file, under its name or its name without extension.
+
+        :param action_result: object of ActionResult class
+        :param file_name: name of the uploaded file
+        :param base_url: URL of the decoder, defaults to the primary appliance
+        :return: status success/failure
+        """
+
+        ret_val, resp = self._make_rest_call(action_result, endpoint=consts.NETWITNESS_ENDPOINT_PARSERS, base_url=base_url)
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        try:
+            names = {name.lower() for name in iter_json_strings(resp.json())}
+        except ValueError:
+            names = set(resp.text.lower().split())
+
+        if not names & {file_name.lower(), os.path.splitext(file_name)[0].lower()}:
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_UPLOAD_NOT_LISTED.format(file_name=file_name))
+
+        return phantom.APP_SUCCESS
+
+    def _restart_device(self, param):
+        """This method restarts the configured device"""
+
+        action_result = self.add_action_result(phantom.ActionResult(dict(param)))
+
+        ret_val = self._send_restart(action_result)
+
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        return action_result.set_status(phantom.APP_SUCCESS, consts.NETWITNESS_SUCC_RESTART)
+
+    def _send_restart(self, action_result, base_url=None):
+        """Ask a device to restart. The request is not retried: a device that dropped the connection may have received
+        it, and a retry could then restart it a second time.
+
+        :param action_result: object of ActionResult class
+        :param base_url: URL of the device, defaults to the primary appliance
+        :return: status success/failure
+        """
+
+        ret_val, _ = self._make_rest_call(action_result, endpoint=consts.NETWITNESS_ENDPOINT_RESTART, base_url=base_url, retry=False)
+
+        # the device may come back with another version, e.g. after a deployment
+        self._state.get(consts.NETWITNESS_STATE_CAPABILITIES, {}).pop(base_url or self._base_url, None)
+
+        return ret_val
+
+    def _get_start_time(self, base_url=None):
+        """Return the time the service of a device started, from its status nodes, None if it cannot be read
+
+        :param base_url: URL of the device, defaults to the primary appliance
+        """
+
+        status_result = phantom.ActionResult()
+        ret_val, resp = self._make_rest_call(
+            status_result, endpoint=consts.NETWITNESS_ENDPOINT_STATUS, timeout=consts.NETWITNESS_PROBE_TIMEOUT, base_url=base_url, retry=False
+        )
+        if phantom.is_fail(ret_val):
+            return None
+
+        try:
+            return parse_status_nodes(resp.json()).get(consts.NETWITNESS_STATUS_RUNNING_SINCE)
+        except ValueError:
+            return None
+
+    def _wait_until_healthy(self, action_result, base_url, timeout, started=None):
+        """Poll a restarted device until it answers again. The device has restarted once a poll saw it down, or once its
+        service reports another start time than started. A device whose start time is not known is only considered
+        restarted once the restart grace period is over, so that the poll does not end before the device goes down, and
+        its restart is then reported as unconfirmed (restart_confirmed is False in the summary).
+
+        :param action_result: object of ActionResult class
+        :param base_url: URL of the device
+        :param timeout: seconds to wait for the device
+        :param started: start time of the service of the device before the restart request, None if it is not known
+        :return: status success/failure
+        """
+
+        start = time.monotonic()
+        went_down = False
+        running_since = None
+
+        with self._perf.span("health_wait"):
+            while True:
+                poll_result = phantom.ActionResult()
+                ret_val, resp = self._make_rest_call(
+                    poll_result,
+                    endpoint=consts.NETWITNESS_ENDPOINT_STATUS,
+                    timeout=consts.NETWITNESS_DEFAULT_TEST_TIMEOUT,
+                    base_url=base_url,
+                    retry=False,
+                )
+                elapsed = time.monotonic() - start
+                if phantom.is_fail(ret_val):
+                    went_down = True
+                else:
+                    try:
+                        running_since = parse_status_nodes(resp.json()).get(consts.NETWITNESS_STATUS_RUNNING_SINCE)
+                    except ValueError:
+                        running_since = None
+
+                    if went_down or (started and running_since and running_since != started):
+                        action_result.update_summary({"restart_seconds": round(elapsed, 3), "restart_confirmed": True})
+                        return phantom.APP_SUCCESS
+
+                    # without start times, a device that keeps answering may have restarted between two polls
+                    if not (started and running_since) and elapsed >= consts.NETWITNESS_RESTART_GRACE_PERIOD:
+                        self.save_progress(consts.NETWITNESS_RESTART_UNCONFIRMED.format(url=base_url, seconds=round(elapsed)))
+                        action_result.update_summary({"restart_seconds": round(elapsed, 3), "restart_confirmed": False})
+                        return phantom.APP_SUCCESS
+
+                if elapsed >= timeout:
+                    if started and running_since == started:
+                        return action_result.set_status(
+                            phantom.APP_ERROR, consts.NETWITNESS_ERR_NOT_RESTARTED.format(timeout=timeout, since=started)
+                        )
+                    return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_NOT_HEALTHY.format(timeout=timeout))
+
+                time.sleep(min(consts.NETWITNESS_HEALTH_POLL_INTERVAL, max(timeout - elapsed, 0)))
+
+    def _deploy_file(self, param):
+        """Upload a parser or feed file to several decoders concurrently, then restart them in rolling batches, waiting
+        for every batch to be healthy again before restarting the next one"""
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.debug_print(param)
+        action_result = self.add_action_result(phantom.ActionResult(dict(param)))
+
+        verify = param.get(consts.NETWITNESS_JSON_VERIFY, False)
+        restart = param.get(consts.NETWITNESS_JSON_RESTART, True)
+
+        ret_val, max_concurrency = self._validate_integer(
+            action_result,
+            param.get(consts.NETWITNESS_JSON_MAX_CONCURRENCY, consts.NETWITNESS_MAX_APPLIANCE_WORKERS),
+            consts.NETWITNESS_JSON_MAX_CONCURRENCY,
+        )
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        ret_val, batch_size = self._validate_integer(
+            action_result,
+            param.get(consts.NETWITNESS_JSON_RESTART_BATCH_SIZE, consts.NETWITNESS_DEFAULT_RESTART_BATCH_SIZE),
+            consts.NETWITNESS_JSON_RESTART_BATCH_SIZE,
+        )
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        ret_val, health_timeout = self._validate_integer(
+            action_result,
+            param.get(consts.NETWITNESS_JSON_HEALTH_TIMEOUT, consts.NETWITNESS_DEFAULT_HEALTH_TIMEOUT),
+            consts.NETWITNESS_JSON_HEALTH_TIMEOUT,
+        )
+        if phantom.is_fail(ret_val):
+            return action_result.get_status()
+
+        # the decoders are the asset's appliances, or a subset of them
+        decoders = self._base_urls
+        if param.get(consts.NETWITNESS_JSON_APPLIANCES):
+            decoders = list(dict.fromkeys(url.strip().strip("/") for url in param[consts.NETWITNESS_JSON_APPLIANCES].split(",") if url.strip()))
+            unknown = [url for url in decoders if url not in self._limiters]
+            if unknown or not decoders:
+                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_UNKNOWN_APPLIANCES.format(", ".join(unknown)))
+
+        ret_val, file_info = self._get_vault_file(action_result, param[phantom.APP_JSON_VAULT_ID])
+        if phantom.is_fail(ret_val):
+            return ret_val
+
+        max_workers = min(len(decoders), max_concurrency, consts.NETWITNESS_MAX_APPLIANCE_WORKERS)
+        self.save_progress(
+            consts.NETWITNESS_DEPLOY_UPLOAD_PROGRESS.format(file_name=file_info["name"], decoders=len(decoders), workers=max_workers)
+        )
+
+        def upload(base_url):
+            decoder_result = phantom.ActionResult()
+            self._send_file(decoder_result, file_info, verify, base_url=base_url)
+            return decoder_result
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = dict(zip(decoders, executor.map(upload, decoders)))
+
+        uploaded = [url for url in decoders if phantom.is_success(results[url].get_status())]
+
+        # decoders are restarted batch by batch, and the rollout stops at the first batch that does not come back
+        restarted = []
+        if restart and uploaded:
+            batches = [uploaded[i : i + batch_size] for i in range(0, len(uploaded), batch_size)]
+            for index, batch in enumerate(batches):
+                self.save_progress(
+                    consts.NETWITNESS_DEPLOY_RESTART_PROGRESS.format(batch=index + 1, batches=len(batches), decoders=", ".join(batch))
+                )
+
+                def restart_decoder(base_url):
+                    decoder_result = results[base_url]
+                    # the start time tells a restart apart from a restart request that the decoder ignored
+                    started = self._get_start_time(base_url)
+                    ret_val = self._send_restart(decoder_result, base_url)
+                    if phantom.is_success(ret_val):
+                        ret_val = self._wait_until_healthy(decoder_result, base_url, health_timeout, started)
+                    return ret_val
+
+                with ThreadPoolExecutor(max_workers=len(batch)) as executor:
+                    batch_ret_vals = list(executor.map(restart_decoder, batch))
+
+                restarted.extend(url for url, ret_val in zip(batch, batch_ret_vals) if phantom.is_success(ret_val))
+                if not all(phantom.is_success(ret_val) for ret_val in batch_ret_vals):
+                    for base_url in uploaded[(index + 1) * batch_size :]:
+                        results[base_url].set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_ROLLOUT_STOPPED)
+                    break
+
+        failures = []
+        for base_url in decoders:
+            decoder_result = results[base_url]
+            succeeded = phantom.is_success(decoder_result.get_status())
+            if succeeded and base_url in restarted:
+                decoder_result.set_status(phantom.APP_SUCCESS, consts.NETWITNESS_SUCC_DEPLOY_RESTARTED)
+            elif not succeeded:
+                failures.append(consts.NETWITNESS_APPLIANCE_FAILED.format(url=base_url, message=decoder_result.get_message()))
+            action_result.add_data(
+                dict(
+                    decoder_result.get_summary(),
+                    appliance=base_url,
+                    uploaded=base_url in uploaded,
+                    restarted=base_url in restarted,
+                    status="success" if succeeded else "failed",
+                    message=decoder_result.get_message(),
+                )
+            )
+
+        action_result.update_summary(
+            {
+                "appliances": len(decoders),
+                "uploaded": len(uploaded),
+                "restarted": len(restarted),
+                "failed_appliances": len(failures),
+            }
+        )
+
+        if len(failures) == len(decoders):
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_ALL_APPLIANCES.format("; ".join(failures)))
+
+        action_result.set_status(
+            phantom.APP_SUCCESS, consts.NETWITNESS_SUCC_DEPLOY.format(succeeded=len(decoders) - len(failures), total=len(decoders))
+        )
+        if failures:
+            self._report_appliance_failures(action_result, failures, len(decoders))
+
+        return action_result.get_status()
+
+    def _on_poll(self, param):
+        """Ingest the sessions matching the asset's poll query that are newer than the last ingested session of every
+        appliance. Each batch of sessions becomes a container with one artifact per session and, unless the asset's
+        poll_capture_type is none, the capture of its sessions. The extraction load then only depends on the new data."""
+
+        action_result = self.add_action_result(phantom.ActionResult(dict(param)))
+        config = self.get_config()
+
+        query = config.get(consts.NETWITNESS_CONFIG_POLL_QUERY)
+        if not query:
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_NO_POLL_QUERY)
+
+        cap_type = config.get(consts.NETWITNESS_CONFIG_POLL_CAPTURE_TYPE, consts.NETWITNESS_CAP_TYPE_LOG)
+        if cap_type != consts.NETWITNESS_POLL_CAPTURE_NONE and cap_type not in consts.NETWITNESS_FILE_TYPE_DICT:
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_POLL_CAPTURE_TYPE)
+
+        limits = {}
+        for key, default in (
+            (consts.NETWITNESS_CONFIG_POLL_BATCH_SIZE, consts.NETWITNESS_DEFAULT_POLL_BATCH_SIZE),
+            (consts.NETWITNESS_CONFIG_POLL_MAX_SESSIONS, consts.NETWITNESS_DEFAULT_POLL_MAX_SESSIONS),
+            (consts.NETWITNESS_CONFIG_POLL_LOOKBACK, consts.NETWITNESS_DEFAULT_POLL_LOOKBACK),
+        ):
+            ret_val, limits[key] = self._validate_integer(action_result, config.get(key, default), key)
+            if phantom.is_fail(ret_val):
+                return action_result.get_status()
+
+        # the container and artifact counts of the poll, if given, bound the containers and their sessions further
+        for key in (phantom.APP_JSON_CONTAINER_COUNT, phantom.APP_JSON_ARTIFACT_COUNT):
+            ret_val, limits[key] = self._validate_integer(action_result, param.get(key), key)
+            if phantom.is_fail(ret_val):
+                return action_result.get_status()
+
+        batch_size = min(limits[consts.NETWITNESS_CONFIG_POLL_BATCH_SIZE], limits[phantom.APP_JSON_ARTIFACT_COUNT] or math.inf)
+        max_sessions = min(
+            limits[consts.NETWITNESS_CONFIG_POLL_MAX_SESSIONS], (limits[phantom.APP_JSON_CONTAINER_COUNT] or math.inf) * batch_size
+        )
+
+        watermarks = self._state.setdefault(consts.NETWITNESS_STATE_POLL_WATERMARKS, {})
+        temp_dir = self._create_temp_dir()
+
+        sessions = containers = 0
+        failures = []
+        try:
+            for base_url in self._base_urls:
+                appliance_result = phantom.ActionResult()
+                ret_val, ingested, watermark = self._poll_appliance(
+                    appliance_result,
+                    base_url,
+                    query,
+                    watermarks.get(base_url),
+                    cap_type,
+                    batch_size,
+                    max_sessions,
+                    limits[consts.NETWITNESS_CONFIG_POLL_LOOKBACK],
+                    temp_dir,
+                )
+                sessions += ingested
+                containers += math.ceil(ingested / batch_size)
+
+                # a poll now is a test run, it does not move the watermark
+                if watermark and not self.is_poll_now():
+                    watermarks[base_url] = watermark
+                if phantom.is_fail(ret_val):
+                    failures.append(consts.NETWITNESS_APPLIANCE_FAILED.format(url=base_url, message=appliance_result.get_message()))
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        action_result.update_summary({"ingested_sessions": sessions, "containers": containers, "failed_appliances": len(failures)})
+
+        if len(failures) == len(self._base_urls):
+            message = failures[0].split(": ", 1)[1] if len(failures) == 1 else "; ".join(failures)
+            return action_result.set_status(phantom.APP_ERROR, message)
+
+        action_result.set_status(phantom.APP_SUCCESS, consts.NETWITNESS_SUCC_POLL.format(sessions=sessions, containers=containers))
+        if failures:
+            self._report_appliance_failures(action_result, failures)
+
+        return action_result.get_status()
+
+    def _poll_appliance(self, action_result, base_url, query, watermark, cap_type, batch_size, max_sessions, lookback, temp_dir):
+        """Ingest the new sessions of an appliance, batch by batch, in ascending session order.
+
+        :param action_result: object of ActionResult class
+        :param base_url: URL of the appliance
+        :param query: where clause of the sessions to ingest
+        :param watermark: last ingested session of the appliance, None if it was never polled
+        :param cap_type: capture type added to the containers, or NETWITNESS_POLL_CAPTURE_NONE
+        :param batch_size: maximum number of sessions per container
+        :param max_sessions: maximum number of sessions to ingest
+        :param lookback: hours of sessions the first poll ingests
+        :param temp_dir: directory in which the captures are downloaded
+        :return: status success/failure, number of sessions ingested and the watermark after the last ingested batch
+        """
+
+        end = datetime.now(timezone.utc)
+        if watermark:
+            where = f"({query}) && sessionid > {watermark['session_id']}"
+        else:
+            start = end - timedelta(hours=lookback)
+            where = f'({query}) && time="{start.strftime(consts.NETWITNESS_TIME_FORMAT)}"-"{end.strftime(consts.NETWITNESS_TIME_FORMAT)}"'
+
+        ret_val, new_sessions = self._query_sessions(action_result, f"select sessionid where {where}", max_sessions, base_url)
+        if phantom.is_fail(ret_val):
+            return ret_val, 0, watermark
+
+        # the session IDs of a rebuilt device start again from 1, below the watermark, which then hides the new sessions:
+        # they are found by time instead
+        if watermark and not new_sessions and watermark.get("time"):
+            last_session_id = self._get_last_session_id(base_url)
+            if last_session_id is not None and last_session_id < watermark["session_id"]:
+                start = datetime.strptime(watermark["time"], consts.NETWITNESS_EVENT_TIME_FORMAT) + timedelta(seconds=1)
+                self.save_progress(
+                    consts.NETWITNESS_POLL_ROLLOVER.format(
+                        url=base_url, last=last_session_id, watermark=watermark["session_id"], time=watermark["time"]
+                    )
+                )
+                where = f'({query}) && time="{start.strftime(consts.NETWITNESS_TIME_FORMAT)}"-"{end.strftime(consts.NETWITNESS_TIME_FORMAT)}"'
+                ret_val, new_sessions = self._query_sessions(action_result, f"select sessionid where {where}", max_sessions, base_url)
+                if phantom.is_fail(ret_val):
+                    return ret_val, 0, watermark
+
+        session_ids = list(new_sessions)[:max_sessions]
+        self.save_progress(consts.NETWITNESS_POLL_PROGRESS.format(url=base_url, sessions=len(session_ids)))
+
+        ingested = 0
+        for index in range(0, len(session_ids), batch_size):
+            batch = session_ids[index : index + batch_size]
+            ret_val, last_time = self._ingest_sessions(action_result, base_url, query, batch, cap_type, temp_dir)
+            if phantom.is_fail(ret_val):
+                return ret_val, ingested, watermark
+
+            ingested += len(batch)
+            watermark = {"session_id": batch[-1], "time": last_time or (watermark or {}).get("time")}
+
+        return phantom.APP_SUCCESS, ingested, watermark
+
+    def _query_sessions(self, action_result, query, size=None, base_url=None):
+        """Run an SDK query and group its results by session. The query is run in pages of NETWITNESS_QUERY_PAGE_SIZE
+        meta values, each one starting after the last meta ID of the previous page, until every value is read.
+
+        :param action_result: object of ActionResult class
+        :param query: SDK query
+        :param size: maximum number of meta values returned, None to read them all
+        :param base_url: URL of the appliance, defaults to the primary appliance
+        :return: status success/failure and the meta of the sessions, keyed by session ID in ascending order
+        """
+
+        fields = []
+        data = {"msg": "query", "query": query, "force-content-type": "application/json"}
+
+        while True:
+            data["size"] = consts.NETWITNESS_QUERY_PAGE_SIZE if size is None else min(consts.NETWITNESS_QUERY_PAGE_SIZE, size - len(fields))
+            with self._perf.span("query"):
+                ret_val, resp = self._make_rest_call(action_result, endpoint=consts.NETWITNESS_ENDPOINT_SDK, data=data, base_url=base_url)
+            if phantom.is_fail(ret_val):
+                return ret_val, None
+
+            try:
+                results = resp.json()["results"]
+                page = results.get("fields") or []
+                last_id = int(results.get("id2") or max((int(field["id1"]) for field in page), default=0))
+            except (AttributeError, KeyError, TypeError, ValueError):
+                return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_QUERY_RESPONSE), None
+
+            # a device that ignores id1 answers with the first page again, which would be read forever
+            if last_id < data.get("id1", 0):
+                break
+
+            fields.extend(page)
+            if len(page) < data["size"] or len(fields) == size:
+                break
+            data["id1"] = last_id + 1
+
+        try:
+            return phantom.APP_SUCCESS, group_query_results({"results": {"fields": fields}})
+        except ValueError:
+            return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_QUERY_RESPONSE), None
+
+    def _get_last_session_id(self, base_url=None):
+        """Return the highest session ID of an appliance, None if it cannot be read. Failures are logged and otherwise
+        ignored.
+
+        :param base_url: URL of the appliance, defaults to the primary appliance
+        """
+
+        query_result = phantom.ActionResult()
+        data = {"msg": "query", "query": consts.NETWITNESS_POLL_LAST_SESSION_QUERY, "size": 1, "force-content-type": "application/json"}
+        with self._perf.span("query"):
+            ret_val, resp = self._make_rest_call(query_result, endpoint=consts.NETWITNESS_ENDPOINT_SDK, data=data, base_url=base_url)
+        if phantom.is_fail(ret_val):
+            self.debug_print(query_result.get_message())
+            return None
+
+        try:
+            fields = resp.json()["results"].get("fields") or []
+            return int(float(fields[0]["value"])) if fields else 0
+        except (AttributeError, KeyError, TypeError, ValueError):
+            self.debug_print(consts.NETWITNESS_ERR_QUERY_RESPONSE)
+            return None
+
+    def _ingest_sessions(self, action_result, base_url, query, session_ids, cap_type, temp_dir):
+        """Save a batch of sessions as a container with one artifact per session and, unless cap_type is
+        NETWITNESS_POLL_CAPTURE_NONE, the capture of the sessions in its vault.
+
+        :param action_result: object of ActionResult class
+        :param base_url: URL of the appliance
+        :param query: poll query, used as the description of the container
+        :param session_ids: IDs of the sessions, in ascending order
+        :param cap_type: capture type, or NETWITNESS_POLL_CAPTURE_NONE
+        :param temp_dir: directory in which the capture is downloaded
+        :return: status success/failure and the time of the last session (ISO 8601), if known
+        """
+
+        first, last = session_ids[0], session_ids[-1]
+        session_set = SessionIdSet(",".join(str(session_id) for session_id in session_ids))
+
+        ret_val, sessions = self._query_sessions(
+            action_result,
+            "select {} where sessionid={}".format(",".join(consts.NETWITNESS_POLL_META_KEYS), session_set),
+            base_url=base_url,
+        )
+        if phantom.is_fail(ret_val):
+            return ret_val, None
+
+        # the container of a batch is identified by its sessions, so that a batch ingested again is not duplicated
+        host = urlparse(base_url).netloc or base_url
+        container = {
+            "name": consts.NETWITNESS_POLL_CONTAINER_NAME.format(first=first, last=last, host=host),
+            "source_data_identifier": f"{host}:{session_set}",
+            "description": query,
+        }
+        ret_val, message, container_id = self.save_container(container)
+        if phantom.is_fail(ret_val):
+            return action_result.set_status(
+                phantom.APP_ERROR, consts.NETWITNESS_ERR_SAVE_CONTAINER.format(first=first, last=last, message=message)
+            ), None
+
+        artifacts = []
+        last_time = None
+        for session_id in session_ids:
+            meta = sessions.get(session_id, {})
+            cef = {consts.NETWITNESS_POLL_SESSION_ID_CEF: session_id}
+            for key, value in meta.items():
+                if key != "sessionid":
+                    cef[consts.NETWITNESS_POLL_CEF_MAPPING.get(key, key)] = value
+            event_time = format_epoch_time(meta.get("time"))
+            last_time = event_time or last_time
+
+            artifact = {
+                "container_id": container_id,
+                "name": consts.NETWITNESS_POLL_ARTIFACT_NAME.format(session_id=session_id),
+                "label": "event",
+                "source_data_identifier": f"{host}:{session_id}",
+                "cef": cef,
+                "cef_types": {consts.NETWITNESS_POLL_SESSION_ID_CEF: ["netwitness session ids"]},
+                # automation runs once per container, when its last artifact is saved
+                "run_automation": session_id == last,
+            }
+            if event_time:
+                artifact["start_time"] = event_time
+            artifacts.append(artifact)
+
+        ret_val, message, _ = self.save_artifacts(artifacts)
+        if phantom.is_fail(ret_val):
+            return action_result.set_status(
+                phantom.APP_ERROR, consts.NETWITNESS_ERR_SAVE_ARTIFACTS.format(first=first, last=last, message=message)
+            ), None
+
+        if cap_type == consts.NETWITNESS_POLL_CAPTURE_NONE:
+            return phantom.APP_SUCCESS, last_time
+
+        ret_val, request = self._build_capture_request(action_result, {consts.NETWITNESS_JSON_SESSION_ID: str(session_set)}, cap_type)
+        if phantom.is_fail(ret_val):
+            return ret_val, None
+
+        ret_val, capture = self._obtain_capture(action_result, request, cap_type, temp_dir, base_url)
+        if phantom.is_fail(ret_val):
+            return ret_val, None
+
+        if capture:
+            ret_val = self._vault_capture(action_result, capture, request["file_name"], cap_type, temp_dir, container_id=container_id)
+            if phantom.is_fail(ret_val):
+                return ret_val, None
+
+        return phantom.APP_SUCCESS, last_time
+
+    def handle_action(self, param):
+        """This function gets current action identifier and calls member function of it's own to handle the action.
+
+        :param param: dictionary which contains information about the actions to be executed
+        :return: status success/failure
         """
 
         # Dictionary containing function name of each action
@@ -483,12 +2929,26 @@ class NetWitnessConnector(phantom.BaseConnector):
             "restart_device": self._restart_device,
             "upload_file": self._upload_file,
             "get_pcap": self._get_pcap,
+            "batch_capture": self._batch_capture,
+            "deploy_file": self._deploy_file,
+            "on_poll": self._on_poll,
         }
 
         action = self.get_action_identifier()
         return_value = phantom.APP_SUCCESS
 
         if action in action_details:
+            # fail fast when the appliances of the action are down, rather than after the timeouts of its requests
+            if action in consts.NETWITNESS_PROBED_ACTIONS:
+                base_urls = [self._base_url] if action in consts.NETWITNESS_PRIMARY_APPLIANCE_ACTIONS else self._base_urls
+                failures = self._probe_appliances(base_urls)
+                if len(failures) == len(base_urls):
+                    action_result = self.add_action_result(phantom.ActionResult(dict(param)))
+                    if len(base_urls) == 1:
+                        return action_result.set_status(phantom.APP_ERROR, failures[0][1])
+                    details = "; ".join(consts.NETWITNESS_APPLIANCE_FAILED.format(url=url, message=message) for url, message in failures)
+                    return action_result.set_status(phantom.APP_ERROR, consts.NETWITNESS_ERR_ALL_APPLIANCES.format(details))
+
             action_function = action_details[action]
             return_value = action_function(param)
 
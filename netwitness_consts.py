@@ -13,30 +13,117 @@
 # either express or implied. See the License for the specific language governing permissions
 # and limitations under the License.
 NETWITNESS_ERR_BAD_RANGE = "Session ID parameter has a bad range - smaller number should come first"
+NETWITNESS_ERR_SESSION_IDS = "Session ID parameter must be a comma separated list of session IDs and ranges, not '{token}'"
 NETWITNESS_ERR_BAD_PARAMS = "This action requires a session ID, query, or start and end times"
 NETWITNESS_ERR_REVERSE_TIMES = "Given time range is invalid - times appear to be reversed"
 NETWITNESS_ERR_UNSAFE_FILE_NAME = "File name must not contain path separators or traversal sequences"
 NETWITNESS_ERR_VAULT_INFO = "Unable to get Vault item details from Phantom. Details: {0}"
 NETWITNESS_ERR_FROM_SERVER = "API failed\nStatus code: {status}\nDetail: {detail}"
 NETWITNESS_ERR_TIMEOUT = "Request timed out. Try limiting the scope of the search"
+NETWITNESS_ERR_CANCELLED = "Request cancelled"
+NETWITNESS_ERR_TRANSFER = "Capture transfer was interrupted"
 NETWITNESS_ERR_BAD_CAP = "Found no capture data based on the given parameters"
 NETWITNESS_ERR_NOT_IN_VAULT = "Specified vault ID not found in vault"
+NETWITNESS_ERR_UNKNOWN_APPLIANCES = "The appliances must be a comma-separated list of the asset's appliance URLs. Unknown appliances: {0}"
+NETWITNESS_ERR_NOT_HEALTHY = "The device did not come back within {timeout} seconds of its restart"
+NETWITNESS_ERR_NOT_RESTARTED = "The device did not restart within {timeout} seconds, it is still running since {since}"
+NETWITNESS_RESTART_UNCONFIRMED = "{url} answers {seconds} seconds after its restart request, but no poll saw it restart"
+NETWITNESS_ERR_ROLLOUT_STOPPED = "Not restarted: the rollout stopped after a restart failed"
+NETWITNESS_ERR_CAPTURE_TOO_LARGE = (
+    "The capture is estimated at {sessions} sessions and {size} MB, more than the asset's max_capture_size of {max} MB. "
+    "Narrow the session IDs, query or time frame"
+)
+NETWITNESS_ERR_ESTIMATE_RESPONSE = "Unexpected response to the SDK count query"
+NETWITNESS_ERR_ESTIMATE = "Could not estimate the size of the capture, fetching it without an estimate: {0}"
+NETWITNESS_ERR_NO_POLL_QUERY = "Polling requires the asset's poll_query"
+NETWITNESS_ERR_POLL_CAPTURE_TYPE = "Please provide 'none', 'log' or 'pcap' in the asset's poll_capture_type"
+NETWITNESS_ERR_QUERY_RESPONSE = "Unexpected response to the SDK query"
+NETWITNESS_ERR_SAVE_CONTAINER = "Could not save the container of sessions {first} to {last}: {message}"
+NETWITNESS_ERR_SAVE_ARTIFACTS = "Could not save the artifacts of sessions {first} to {last}: {message}"
+NETWITNESS_ERR_APPLIANCE_DOWN = "The appliance did not answer its status probe. Details: {0}"
+NETWITNESS_ERR_STATUS_RESPONSE = "Unexpected response to the status probe"
+NETWITNESS_ERR_NOT_DECODER = "The appliance is a {service}, parser and feed files can only be uploaded to decoders"
+NETWITNESS_ERR_READ_VAULT_FILE = "Could not read the vault file: {0}"
+NETWITNESS_ERR_UPLOAD_CHECKSUM = "The uploaded file does not match its vault checksum (SHA-256 {sha256} instead of {expected})"
+NETWITNESS_ERR_UPLOAD_NOT_LISTED = "The uploaded file {file_name} is not listed by the decoder"
 NETWITNESS_ERR_API_UNSUPPORTED_METHOD = "Unsupported method {method}"
 NETWITNESS_ERR_SERVER_CONNECTION = "Connection failed"
 NETWITNESS_ERR_VAULT = "Could not move file to vault"
+NETWITNESS_ERR_VAULT_TMP_DIR = "Unable to use the vault staging directory, falling back to the system temporary directory"
+NETWITNESS_ERR_SHARD = "Failed to download capture shard {index} of {total}. Details: {message}"
+NETWITNESS_ERR_TOO_MANY_SHARDS = "The capture would be split into more than {max} requests. Please use a larger time_slice or shard_count"
+NETWITNESS_ERR_CHECKPOINT = "Ignoring unreadable capture checkpoint"
+NETWITNESS_ERR_CHECKPOINT_DIR = "Unable to create the capture checkpoint directory. Details: {0}"
+NETWITNESS_ERR_CHECKPOINT_BUSY = "The same capture is already being downloaded with resume by another run, please retry once it completes"
+NETWITNESS_ERR_CACHE = "Capture cache is unavailable"
+NETWITNESS_ERR_VAULT_LOOKUP = "Could not look up the cached capture in the vault"
+NETWITNESS_ERR_CAPTURE_TYPE = "Please provide 'pcap' or 'log' in the 'capture_type' parameter"
+NETWITNESS_ERR_QUERIES = "The 'queries' parameter must be a JSON list of query strings"
+NETWITNESS_ERR_NO_BATCH_ITEMS = "This action requires at least one session ID set or query"
+NETWITNESS_ERR_TOO_MANY_BATCH_ITEMS = "A batch can contain at most {max} session ID sets and queries"
+NETWITNESS_ERR_INVALID_SESSION_IDS = "Invalid session IDs: {session_ids}"
+NETWITNESS_ERR_BATCH_FAILED = "All batch items failed"
+NETWITNESS_ERR_NO_URL = "Please provide the URL of at least one appliance in the 'url' parameter"
+NETWITNESS_ERR_ALL_APPLIANCES = "The request failed on every appliance. Details: {0}"
+NETWITNESS_ERR_COMPRESSION_CODEC = "Please provide 'none', 'gzip' or 'zstd' in the 'compression' parameter"
+NETWITNESS_ERR_COMPRESSION = "Error while compressing the capture. Details: {0}"
+NETWITNESS_ERR_CONTENT_DECODING = "Could not decode the {encoding} encoded capture, downloading it again without compression"
+NETWITNESS_ERR_OUTPUT_FORMAT = "Please provide 'json' or 'ndjson' in the 'output_format' parameter"
+NETWITNESS_ERR_NDJSON = "Error while converting the capture to NDJSON. Details: {0}"
+NETWITNESS_ERR_MERGE = "Unable to merge the capture shards. Details: {0}"
+NETWITNESS_ERR_PCAP_HEADER = "File {file} does not start with a valid pcap header"
+NETWITNESS_ERR_PCAP_RECORD = "The capture ends with a truncated pcap record"
+NETWITNESS_ERR_PACKET_FILTER = "Invalid packet filter: {filter}"
+NETWITNESS_ERR_PCAP_PROCESSING = "Error while processing the packet capture. Details: {0}"
+NETWITNESS_ERR_NO_MATCHING_PACKETS = "No packets of the capture matched the packet filter"
+NETWITNESS_ERR_PCAP_MISMATCH = "File {file} has a different pcap format than the first shard"
+NETWITNESS_ERR_JSON_CAPTURE = "JSON capture does not contain a list of events"
+NETWITNESS_ERR_INVALID_INT = "Please provide a valid integer value in the '{param}' parameter"
+NETWITNESS_ERR_NEGATIVE_INT = "Please provide a valid non-negative integer value in the '{param}' parameter"
+NETWITNESS_ERR_ZERO_INT = "Please provide a non-zero positive integer value in the '{param}' parameter"
 
 NETWITNESS_GET_PCAPS_FAIL = "Response from server was incorrect data type"
 NETWITNESS_CONNECTION_TEST_MSG = "Querying endpoint to test connectivity"
+NETWITNESS_PROBE = "NetWitness {service} version {version}"
+NETWITNESS_CACHE_HIT = "Capture found in the local capture cache"
 NETWITNESS_REPORT_ALREADY_AVAILABLE = "Report already available in vault"
 NETWITNESS_CAP_TYPE_DICT = {"log": "application/json", "pcap": "pcap"}
 NETWITNESS_SUCC_FILE_ADD_TO_VAULT = "Successfully added file to Vault"
 NETWITNESS_SUCC_UPLOAD = "Feed/Parser file successfully uploaded"
+NETWITNESS_SUCC_UPLOAD_VERIFIED = "Feed/Parser file successfully uploaded and listed by the decoder"
+NETWITNESS_SUCC_POLL = "Ingested {sessions} new sessions in {containers} containers"
+NETWITNESS_SUCC_BATCH = "{succeeded} of {total} batch items succeeded"
 NETWITNESS_SUCC_RESTART = "Device successfully restarted"
+NETWITNESS_SUCC_DEPLOY = "{succeeded} of {total} decoders deployed"
+NETWITNESS_SUCC_DEPLOY_RESTARTED = "Feed/Parser file successfully uploaded and device restarted"
 NETWITNESS_FILE_TYPE_DICT = {"pcap": "pcap", "log": "json"}
 NETWITNESS_INVALID_PARAM = "Invalid parameters: {message}"
 NETWITNESS_EXCEPTION_OCCURRED = "Exception occurred"
 NETWITNESS_FILE_ERR = "Error while creating file"
+NETWITNESS_SHARD_RETRY = "Capture shard download failed (attempt {attempt}). Details: {message}"
+NETWITNESS_REQUEST_RETRY = "Request failed (attempt {attempt}), retrying in {delay:.1f} seconds. Details: {reason}"
+NETWITNESS_CONCURRENCY_LIMIT = "Lowered the number of parallel requests to {url} to {limit} after a failed request"
+NETWITNESS_BATCH_PROGRESS = "Capturing {items} batch items using {workers} parallel workers"
+NETWITNESS_APPLIANCE_PROGRESS = "Querying {appliances} appliances using {workers} parallel workers"
+NETWITNESS_APPLIANCE_FAILED = "{url}: {message}"
+NETWITNESS_APPLIANCES_FAILED = "{failed} of {total} appliances failed: {details}"
+NETWITNESS_TRANSFER_SIZE = "Received {wire_size} bytes ({encoding}) for {size} bytes of capture"
+NETWITNESS_PERFORMANCE = "Performance: {report}"
+NETWITNESS_UPLOAD_PROGRESS = "Uploaded {sent} of {total} bytes ({percent}%, {rate} bytes/s)"
+NETWITNESS_DEPLOY_UPLOAD_PROGRESS = "Uploading {file_name} to {decoders} decoders using {workers} parallel uploads"
+NETWITNESS_DEPLOY_RESTART_PROGRESS = "Restarting batch {batch} of {batches}: {decoders}"
+NETWITNESS_ESTIMATE = "Estimated {sessions} sessions and {size} bytes of capture, fetched as: {strategy}"
+NETWITNESS_POLL_PROGRESS = "{url}: {sessions} new sessions to ingest"
+NETWITNESS_POLL_ROLLOVER = "{url}: the last session ID is {last}, below the last ingested one ({watermark}), polling the sessions since {time}"
+NETWITNESS_POLL_CONTAINER_NAME = "NetWitness sessions {first} to {last} ({host})"
+NETWITNESS_POLL_ARTIFACT_NAME = "NetWitness session {session_id}"
+NETWITNESS_SHARD_PROGRESS = "Downloading capture in {shards} shards using {workers} parallel requests"
 NETWITNESS_ENDPOINT_GET_CAP = "/sdk/packets"
+NETWITNESS_ENDPOINT_SDK = "/sdk"
+NETWITNESS_ENDPOINT_UPLOAD = "/decoder/parsers/upload"
+NETWITNESS_ENDPOINT_PARSERS = "/decoder/parsers?msg=ls&force-content-type=application/json"
+NETWITNESS_ENDPOINT_RESTART = "/sys?msg=shutdown"
+NETWITNESS_ENDPOINT_STATUS = "/sys/stats?msg=ls&force-content-type=application/json"
 
 NETWITNESS_REST_RESP_UNAUTHORIZED_MSG = "Invalid username or password"
 NETWITNESS_REST_RESP_RESOURCE_NOT_FOUND_MSG = "No data found"
@@ -45,7 +132,9 @@ NETWITNESS_REST_RESP_BAD_REQUEST_MSG = "Bad Request"
 NETWITNESS_REST_RESP_RESOURCE_NOT_FOUND = 404
 NETWITNESS_REST_RESP_UNAUTHORIZED = 401
 NETWITNESS_REST_RESP_BAD_REQUEST = 400
+NETWITNESS_REST_RESP_PARTIAL = 206
 NETWITNESS_REST_RESP_SUCC = 200
+NETWITNESS_REST_RESP_SUCC_CODES = [NETWITNESS_REST_RESP_SUCC, NETWITNESS_REST_RESP_PARTIAL]
 
 NETWITNESS_TEST_CONNECTIVITY_PASS = "Connectivity test succeeded"
 NETWITNESS_TEST_CONNECTIVITY_FAIL = "Connectivity test failed"
@@ -54,15 +143,59 @@ NETWITNESS_CONFIG_VERIFY = "verify_server_cert"
 NETWITNESS_CONFIG_API_USERNAME = "username"
 NETWITNESS_CONFIG_API_PASSWORD = "password"  # pragma: allowlist secret
 NETWITNESS_CONFIG_SERVER = "url"
+NETWITNESS_CONFIG_POOL_SIZE = "pool_size"
+NETWITNESS_CONFIG_CONNECT_TIMEOUT = "connect_timeout"
+NETWITNESS_CONFIG_READ_TIMEOUT = "read_timeout"
+NETWITNESS_CONFIG_IDLE_TIMEOUT = "idle_timeout"
+NETWITNESS_CONFIG_TRANSFER_TIMEOUT = "transfer_timeout"
+NETWITNESS_CONFIG_CACHE_SIZE = "cache_size"
+NETWITNESS_CONFIG_CACHE_TTL = "cache_ttl"
+NETWITNESS_CONFIG_COMPRESSION = "compression"
+NETWITNESS_CONFIG_MAX_RETRIES = "max_retries"
+NETWITNESS_CONFIG_RETRY_BUDGET = "retry_budget"
+NETWITNESS_CONFIG_PREFLIGHT = "preflight"
+NETWITNESS_CONFIG_AUTO_SHARD_SIZE = "auto_shard_size"
+NETWITNESS_CONFIG_MAX_CAPTURE_SIZE = "max_capture_size"
+NETWITNESS_CONFIG_POLL_QUERY = "poll_query"
+NETWITNESS_CONFIG_POLL_CAPTURE_TYPE = "poll_capture_type"
+NETWITNESS_CONFIG_POLL_BATCH_SIZE = "poll_batch_size"
+NETWITNESS_CONFIG_POLL_MAX_SESSIONS = "poll_max_sessions"
+NETWITNESS_CONFIG_POLL_LOOKBACK = "poll_lookback"
+NETWITNESS_CONFIG_PROBE_TTL = "probe_ttl"
 
 NETWITNESS_JSON_START_TIME = "start_time"
 NETWITNESS_JSON_SESSION_ID = "session_ids"
 NETWITNESS_JSON_FILE_NAME = "file_name"
 NETWITNESS_JSON_END_TIME = "end_time"
 NETWITNESS_JSON_QUERY = "query"
+NETWITNESS_JSON_SHARD_COUNT = "shard_count"
+NETWITNESS_JSON_TIME_SLICE = "time_slice"
+NETWITNESS_JSON_RESUME = "resume"
+NETWITNESS_JSON_OUTPUT_FORMAT = "output_format"
+NETWITNESS_JSON_SNAPLEN = "snaplen"
+NETWITNESS_JSON_PACKET_FILTER = "packet_filter"
+NETWITNESS_JSON_SPLIT_SIZE = "split_size"
+NETWITNESS_JSON_SPLIT_COUNT = "split_count"
+NETWITNESS_JSON_SESSION_ID_SETS = "session_id_sets"
+NETWITNESS_JSON_QUERIES = "queries"
+NETWITNESS_JSON_CAPTURE_TYPE = "capture_type"
+NETWITNESS_JSON_MERGE = "merge"
+NETWITNESS_JSON_MAX_CONCURRENCY = "max_concurrency"
+NETWITNESS_JSON_VERIFY = "verify"
+NETWITNESS_JSON_RESTART = "restart"
+NETWITNESS_JSON_RESTART_BATCH_SIZE = "restart_batch_size"
+NETWITNESS_JSON_HEALTH_TIMEOUT = "health_timeout"
+NETWITNESS_JSON_APPLIANCES = "appliances"
 
+NETWITNESS_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+NETWITNESS_EVENT_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+NETWITNESS_DEFAULT_CONNECT_TIMEOUT = 30
 NETWITNESS_DEFAULT_REST_TIMEOUT = 300
+NETWITNESS_DEFAULT_IDLE_TIMEOUT = 120
+NETWITNESS_DEFAULT_TRANSFER_TIMEOUT = 3600
 NETWITNESS_DEFAULT_TEST_TIMEOUT = 30
+NETWITNESS_DEFAULT_POOL_SIZE = 10
 
 NETWITNESS_CAP_TYPE_PACKET = "pcap"
 NETWITNESS_CAP_TYPE_LOG = "log"
@@ -72,8 +205,162 @@ NETWITNESS_BAD_CAP_HASHES = [
     "8eba672603c531f466c75ca729b66378b92271d78ef1570574757cd5fd8244e6",  # pragma: allowlist secret
 ]
 
-# Updating bad CAP sizes for Python 3 support
-NETWITNESS_BAD_CAP_SIZES = [73, 37]
+# Sizes (in bytes) of the empty/corrupted captures returned by the API
+NETWITNESS_BAD_CAP_SIZES = [40, 4]
+
+# Captures are streamed to disk in chunks of this many bytes
+NETWITNESS_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Parser and feed files are read and sent in chunks of this many bytes, and their progress is reported every step
+# percent
+NETWITNESS_UPLOAD_CHUNK_SIZE = 1024 * 1024
+NETWITNESS_UPLOAD_PROGRESS_STEP = 10
+
+# Upper bound on the number of capture shards downloaded at the same time
+NETWITNESS_MAX_SHARD_WORKERS = 8
+# Number of files merged at once when time slices are merged in time order, more are merged in several passes
+NETWITNESS_MERGE_FAN_IN = 64
+# Default and maximum number of batch capture items processed at the same time, and maximum number of items
+NETWITNESS_DEFAULT_BATCH_WORKERS = 4
+NETWITNESS_MAX_BATCH_WORKERS = 8
+NETWITNESS_MAX_BATCH_ITEMS = 500
+# Upper bound on the number of appliances queried at the same time when the asset lists several of them
+NETWITNESS_MAX_APPLIANCE_WORKERS = 8
+# Decoders restarted at a time by deploy file, and the seconds to wait for each of them to come back. A restarted
+# decoder is polled every interval seconds, and is back once a poll saw it down or its service reports a later start
+# time. A decoder that does not report its start time is considered back if it answers after the grace period even
+# when no poll saw it down, and its restart is reported as unconfirmed.
+NETWITNESS_DEFAULT_RESTART_BATCH_SIZE = 1
+NETWITNESS_DEFAULT_HEALTH_TIMEOUT = 600
+NETWITNESS_HEALTH_POLL_INTERVAL = 5
+NETWITNESS_RESTART_GRACE_PERIOD = 15
+# Captures estimated larger than this many MB are downloaded as parallel shards of about this size, unless the asset
+# configures otherwise. The fetch strategy chosen from the estimate is reported in the summary.
+NETWITNESS_DEFAULT_AUTO_SHARD_SIZE = 256
+NETWITNESS_FETCH_NONE = "none"
+NETWITNESS_FETCH_SINGLE = "single"
+NETWITNESS_FETCH_SHARDED = "sharded"
+# Statuses of a device that does not support the SDK count query of the estimate
+NETWITNESS_ESTIMATE_UNSUPPORTED_STATUS_CODES = [404, 501]
+# Session IDs longer than this many characters once formatted are requested in several /sdk/packets requests
+NETWITNESS_MAX_SESSIONS_LENGTH = 8192
+# Upper bound on the number of shards (session groups or time slices) a single capture is split into
+NETWITNESS_MAX_SHARDS = 1000
+# Number of times a failed or timed out shard is retried
+NETWITNESS_SHARD_RETRIES = 2
+
+# REST calls failing with these status codes or with a connection error are retried with exponential backoff (base
+# and maximum delay in seconds) and full jitter, up to max_retries times per request and retry_budget times per action.
+# A Retry-After of the device is honored up to NETWITNESS_RETRY_MAX_RETRY_AFTER seconds.
+NETWITNESS_RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+NETWITNESS_RETRY_BACKOFF = 1
+NETWITNESS_RETRY_MAX_BACKOFF = 30
+NETWITNESS_RETRY_MAX_RETRY_AFTER = 120
+NETWITNESS_DEFAULT_MAX_RETRIES = 3
+NETWITNESS_DEFAULT_RETRY_BUDGET = 20
+
+# Checkpoints of resumable captures are kept in this folder of the app state directory, for up to a day
+NETWITNESS_CHECKPOINT_DIR = "capture_checkpoints"
+NETWITNESS_CHECKPOINT_TTL = 24 * 60 * 60
+# Shard request bodies of a checkpointed capture, written by the run that starts it
+NETWITNESS_CHECKPOINT_PLAN = "plan.json"
+
+# Captures are cached in this folder of the app state directory, keyed by these request body fields
+NETWITNESS_CACHE_DIR = "capture_cache"
+NETWITNESS_CACHE_KEY_FIELDS = ["sessions", "where", "time1", "time2", "render"]
+NETWITNESS_DEFAULT_CACHE_TTL = 3600
+
+# Content encodings requested for JSON log captures, which are decoded as they are streamed to disk. Binary packet
+# captures keep the default of the HTTP session.
+NETWITNESS_ACCEPT_ENCODING_LOG = "gzip, deflate"
+NETWITNESS_ACCEPT_ENCODING_IDENTITY = "identity"
+
+# Output formats of log captures. NDJSON files hold one event per line, and their summary reports the number of events
+# and the span of their time field (in seconds since the epoch).
+NETWITNESS_OUTPUT_FORMAT_JSON = "json"
+NETWITNESS_OUTPUT_FORMAT_NDJSON = "ndjson"
+NETWITNESS_EVENT_TIME_FIELD = "time"
+NETWITNESS_EVENT_STATS_KEYS = ("event_count", "first_event", "last_event", "time_span")
+
+# Compression of the captures added to the vault, and the extension appended to their name
+NETWITNESS_COMPRESSION_NONE = "none"
+NETWITNESS_COMPRESSION_GZIP = "gzip"
+NETWITNESS_COMPRESSION_ZSTD = "zstd"
+NETWITNESS_COMPRESSION_EXTENSIONS = {NETWITNESS_COMPRESSION_GZIP: "gz", NETWITNESS_COMPRESSION_ZSTD: "zst"}
+NETWITNESS_GZIP_LEVEL = 6
+NETWITNESS_ZSTD_LEVEL = 3
+
+# on_poll keeps the last ingested session of every appliance, and its time, in the app state. Each poll ingests at most
+# max sessions (the first one looks back lookback hours), in containers of at most batch size sessions, one artifact per
+# session. When the session IDs of an appliance start again below the last ingested one, the sessions newer than its
+# time are ingested. The artifacts hold the meta keys below, under their CEF name when there is one.
+NETWITNESS_STATE_POLL_WATERMARKS = "poll_watermarks"
+NETWITNESS_DEFAULT_POLL_BATCH_SIZE = 100
+NETWITNESS_DEFAULT_POLL_MAX_SESSIONS = 1000
+NETWITNESS_DEFAULT_POLL_LOOKBACK = 24
+NETWITNESS_POLL_CAPTURE_NONE = "none"
+NETWITNESS_POLL_META_KEYS = (
+    "time",
+    "size",
+    "service",
+    "ip.src",
+    "ip.dst",
+    "ip.proto",
+    "tcp.srcport",
+    "tcp.dstport",
+    "udp.srcport",
+    "udp.dstport",
+    "alias.host",
+    "username",
+    "device.type",
+    "event.cat.name",
+)
+# SDK queries are run in pages of this many meta values, each page starting after the last meta ID of the previous one
+NETWITNESS_QUERY_PAGE_SIZE = 10000
+# Highest session ID of an appliance, lower than the last ingested one once the device is rebuilt
+NETWITNESS_POLL_LAST_SESSION_QUERY = "select max(sessionid) where sessionid exists"
+NETWITNESS_POLL_CEF_MAPPING = {
+    "ip.src": "sourceAddress",
+    "ip.dst": "destinationAddress",
+    "ip.proto": "transportProtocol",
+    "tcp.srcport": "sourcePort",
+    "tcp.dstport": "destinationPort",
+    "udp.srcport": "sourcePort",
+    "udp.dstport": "destinationPort",
+    "alias.host": "destinationHostName",
+    "username": "sourceUserName",
+    "device.type": "deviceProduct",
+}
+NETWITNESS_POLL_SESSION_ID_CEF = "netwitnessSessionId"
+
+# Before an action that uses the capabilities of its appliances starts, or before a capture that is not in the capture
+# cache is requested, their status nodes are read, to learn their version and service type. The capabilities of every
+# appliance are kept in the app state and read again once they are older than probe_ttl seconds; those of a probe that
+# failed are only kept for the action. An appliance that does not answer the probe within the timeout fails every
+# request of the action without it being sent. Parser and feed files are only uploaded to the decoder services, and
+# upload_file only uses the primary appliance.
+NETWITNESS_STATE_CAPABILITIES = "capabilities"
+NETWITNESS_DEFAULT_PROBE_TTL = 300
+NETWITNESS_PROBE_TIMEOUT = 10
+NETWITNESS_STATUS_VERSION = "version"
+NETWITNESS_STATUS_SERVICE = "service"
+NETWITNESS_STATUS_RUNNING_SINCE = "running.since"
+NETWITNESS_DECODER_SERVICES = ("decoder", "logdecoder")
+NETWITNESS_PROBED_ACTIONS = ("upload_file", "deploy_file")
+NETWITNESS_PRIMARY_APPLIANCE_ACTIONS = ("upload_file",)
+
+# The SHA-256 index of vault items is built once per action run and kept for this many recently used containers. It
+# used to be kept in the app state, under this key.
+NETWITNESS_STATE_VAULT_INDEX = "vault_index"
+NETWITNESS_VAULT_INDEX_MAX_CONTAINERS = 100
+
+NETWITNESS_PCAP_GLOBAL_HEADER_LEN = 24
+NETWITNESS_PCAP_MAGICS = [b"\xd4\xc3\xb2\xa1", b"\xa1\xb2\xc3\xd4", b"\x4d\x3c\xb2\xa1", b"\xa1\xb2\x3c\x4d"]
+
+# Link types whose packets the packet filter can decode
+NETWITNESS_LINKTYPE_ETHERNET = 1
+NETWITNESS_LINKTYPE_LINUX_SLL = 113
+NETWITNESS_LINKTYPES_RAW_IP = (12, 14, 101, 228, 229)
+NETWITNESS_MAX_PORT = 65535
 
 # Constants relating to '_get_error_message_from_exception'
 NETWITNESS_ERR_MSG_UNAVAILABLE = "Error message unavailable. Please check the asset configuration and|or action parameters"
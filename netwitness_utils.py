@@ -0,0 +1,1416 @@
+# File: netwitness_utils.py
+#
+# Copyright (c) 2017-2026 Splunk Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions
+# and limitations under the License.
+import hashlib
+import json
+import os
+import re
+import shutil
+import struct
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timedelta, timezone
+
+# Local imports
+import netwitness_consts as consts
+
+
+class HashingWriter:
+    """File-like wrapper that keeps track of the number of bytes written and their SHA-256"""
+
+    def __init__(self, file_obj):
+        self._file_obj = file_obj
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self._file_obj.write(data)
+        self._hash.update(data)
+        self.size += len(data)
+        return len(data)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+
+class CompressingWriter:
+    """File-like wrapper that compresses the data written to it with gzip or zstd before it reaches the file, or passes
+    it through unchanged when no codec is given. The output only depends on the input (the gzip header carries no name
+    or timestamp), so the same data always compresses to the same bytes. close() ends the compressed stream and leaves
+    the file open.
+    """
+
+    def __init__(self, file_obj, codec=None):
+        self._file_obj = file_obj
+        self._stream = None
+
+        # the codecs are imported here so that the actions which do not compress captures do not load them
+        if codec == consts.NETWITNESS_COMPRESSION_GZIP:
+            import gzip
+
+            self._stream = gzip.GzipFile(filename="", mode="wb", compresslevel=consts.NETWITNESS_GZIP_LEVEL, fileobj=file_obj, mtime=0)
+        elif codec == consts.NETWITNESS_COMPRESSION_ZSTD:
+            import zstandard
+
+            self._stream = zstandard.ZstdCompressor(level=consts.NETWITNESS_ZSTD_LEVEL).stream_writer(
+                file_obj, write_size=consts.NETWITNESS_DOWNLOAD_CHUNK_SIZE, closefd=False
+            )
+
+    def write(self, data):
+        return (self._stream or self._file_obj).write(data)
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class DecodingError(ValueError):
+    """The content encoding of a response body is not supported, or the body is not validly encoded"""
+
+
+class ContentDecoder:
+    """Incremental decoder of an HTTP response body in the gzip or deflate content encoding (or none), which counts
+    the encoded bytes it is given. The decoded bytes are produced in pieces of bounded size, whatever the compression
+    ratio of the body.
+    """
+
+    def __init__(self, encoding=None):
+        import zlib
+
+        self.encoding = (encoding or consts.NETWITNESS_ACCEPT_ENCODING_IDENTITY).strip().lower()
+        self.wire_size = 0
+        # bytes given before the first decoded byte, to decode them again if the deflate stream turns out to be raw
+        self._head = b""
+
+        if self.encoding in ("gzip", "x-gzip"):
+            self._wbits = 16 + zlib.MAX_WBITS
+        elif self.encoding == "deflate":
+            self._wbits = zlib.MAX_WBITS
+        elif self.encoding == consts.NETWITNESS_ACCEPT_ENCODING_IDENTITY:
+            self._wbits = None
+        else:
+            raise DecodingError(f"Unsupported content encoding {encoding}")
+
+        self._decompressor = zlib.decompressobj(self._wbits) if self._wbits else None
+
+    def decode(self, data, max_length=consts.NETWITNESS_DOWNLOAD_CHUNK_SIZE):
+        """Yield the decoded bytes of the next piece of the body, in pieces of at most max_length bytes"""
+
+        import zlib
+
+        self.wire_size += len(data)
+
+        if not self._decompressor:
+            if data:
+                yield data
+            return
+
+        if self._head is not None:
+            self._head += data
+
+        while data:
+            try:
+                piece = self._decompressor.decompress(data, max_length)
+            except zlib.error as e:
+                if self.encoding == "deflate" and self._wbits > 0 and self._head is not None:
+                    # some servers send a raw deflate stream, without the zlib header
+                    self._wbits = -zlib.MAX_WBITS
+                    self._decompressor = zlib.decompressobj(self._wbits)
+                    data = self._head
+                    continue
+                raise DecodingError(str(e)) from e
+
+            data = self._decompressor.unconsumed_tail
+            if self._decompressor.eof and self._decompressor.unused_data:
+                # a gzip body can be made of several members
+                data = self._decompressor.unused_data
+                self._decompressor = zlib.decompressobj(self._wbits)
+            if piece:
+                self._head = None
+                yield piece
+
+    def flush(self):
+        """Return the decoded bytes still buffered once the whole body was given"""
+
+        return self._decompressor.flush() if self._decompressor else b""
+
+
+class MultipartFileEncoder:
+    """Streaming multipart/form-data body of a single file upload. The file is read in chunks as the body is sent, so
+    that memory usage does not depend on its size, and its SHA-256 is computed on the same pass. The length of the body
+    is known up front, so it is sent with a Content-Length rather than chunked. Every iteration (e.g. when the request
+    is retried) reads the file again from the start.
+    """
+
+    def __init__(self, field_name, file_name, file_path, chunk_size=consts.NETWITNESS_UPLOAD_CHUNK_SIZE, progress=None):
+        """
+        :param field_name: name of the form field of the file
+        :param file_name: file name sent to the server
+        :param file_path: path of the file to upload
+        :param chunk_size: number of bytes read at a time
+        :param progress: function called with the number of file bytes sent so far and the file size, after each chunk
+        """
+
+        import uuid
+
+        boundary = uuid.uuid4().hex
+        # the file name is escaped the way browsers (and urllib3) do
+        quoted_name = file_name.translate({10: "%0A", 13: "%0D", 34: "%22"})
+
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        self.file_size = os.path.getsize(file_path)
+        self.sha256 = None
+        self._file_path = file_path
+        self._chunk_size = chunk_size
+        self._progress = progress
+        self._head = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field_name}"; filename="{quoted_name}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode()
+        self._tail = f"\r\n--{boundary}--\r\n".encode()
+
+    def __len__(self):
+        return len(self._head) + self.file_size + len(self._tail)
+
+    def __iter__(self):
+        file_hash = hashlib.sha256()
+        sent = 0
+
+        yield self._head
+
+        with open(self._file_path, "rb") as file_obj:
+            for chunk in iter(lambda: file_obj.read(self._chunk_size), b""):
+                file_hash.update(chunk)
+                sent += len(chunk)
+                yield chunk
+                if self._progress:
+                    self._progress(sent, self.file_size)
+
+        self.sha256 = file_hash.hexdigest()
+
+        yield self._tail
+
+
+def iter_json_strings(value):
+    """Yield every string of a decoded JSON document, keys excluded"""
+
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from iter_json_strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from iter_json_strings(item)
+
+
+class PerfRecorder:
+    """Thread-safe collector of the timings and counters of an action run. Every timing (a phase of the action, or the
+    time to first byte of a request) is aggregated into a count, a total and a maximum.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self._timings = {}
+        self._counters = {}
+
+    @contextmanager
+    def span(self, name):
+        """Time the block as an occurrence of the named phase"""
+
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.timing(name, time.monotonic() - start)
+
+    def timing(self, name, seconds):
+        with self._lock:
+            timing = self._timings.setdefault(name, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+            timing["count"] += 1
+            timing["seconds"] += seconds
+            timing["max_seconds"] = max(timing["max_seconds"], seconds)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def seconds(self, name):
+        """Return the total time spent in a phase"""
+
+        with self._lock:
+            return self._timings.get(name, {}).get("seconds", 0.0)
+
+    def report(self):
+        """Return the timings and counters as a JSON serializable dictionary, times in seconds rounded to milliseconds"""
+
+        with self._lock:
+            report = {
+                "total_seconds": round(time.monotonic() - self._start, 3),
+                "phases": {
+                    name: {key: round(value, 3) if isinstance(value, float) else value for key, value in timing.items()}
+                    for name, timing in self._timings.items()
+                },
+            }
+            report.update(self._counters)
+
+        return report
+
+
+class RetryPolicy:
+    """Thread-safe retry policy of the REST calls of an action: exponential backoff with full jitter, a number of
+    retries per request and a budget of retries shared by all the requests of the action.
+    """
+
+    def __init__(self, max_retries, budget, backoff=consts.NETWITNESS_RETRY_BACKOFF, max_backoff=consts.NETWITNESS_RETRY_MAX_BACKOFF):
+        """
+        :param max_retries: number of times a single request is retried
+        :param budget: total number of retries allowed for the action
+        :param backoff: base delay in seconds, doubled at every attempt
+        :param max_backoff: upper bound of the delay in seconds
+        """
+
+        self._lock = threading.Lock()
+        self._max_retries = max_retries
+        self._budget = budget
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+
+    def acquire(self, attempt):
+        """Return True and consume one retry of the budget if the request may be retried after the given attempt"""
+
+        with self._lock:
+            if attempt >= self._max_retries or self._budget <= 0:
+                return False
+            self._budget -= 1
+            return True
+
+    def delay(self, attempt, retry_after=None):
+        """Return the seconds to wait before retrying after the given attempt (0 is the first one). The server's
+        Retry-After hint takes precedence over the backoff, within max_retry_after.
+        """
+
+        import random
+
+        if retry_after is not None:
+            return min(retry_after, consts.NETWITNESS_RETRY_MAX_RETRY_AFTER)
+        return random.uniform(0, min(self._max_backoff, self._backoff * 2**attempt))
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (delay in seconds or HTTP date) into seconds, or None if it is missing or invalid"""
+
+    from email.utils import parsedate_to_datetime
+
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class ConcurrencyLimiter:
+    """Adaptive limit on the number of requests in flight (additive increase, multiplicative decrease). The limit is
+    halved when requests fail with a retryable error, at most once per cooldown so that a burst of concurrent failures
+    counts once, and raised by one after as many successes as the current limit.
+    """
+
+    def __init__(self, max_limit, cooldown=consts.NETWITNESS_RETRY_BACKOFF):
+        self._condition = threading.Condition()
+        self._max_limit = max(1, max_limit)
+        self._cooldown = cooldown
+        self.limit = self._max_limit
+        self._active = 0
+        self._successes = 0
+        self._last_decrease = None
+
+    def __enter__(self):
+        with self._condition:
+            while self._active >= self.limit:
+                self._condition.wait()
+            self._active += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        with self._condition:
+            self._active -= 1
+            self._condition.notify()
+
+    def success(self):
+        with self._condition:
+            if self.limit < self._max_limit:
+                self._successes += 1
+                if self._successes >= self.limit:
+                    self.limit += 1
+                    self._successes = 0
+                    self._condition.notify()
+
+    def failure(self):
+        """Record a retryable failure. Returns True if the limit was lowered."""
+
+        with self._condition:
+            now = time.monotonic()
+            if self.limit == 1 or (self._last_decrease is not None and now - self._last_decrease < self._cooldown):
+                return False
+            self.limit = max(1, self.limit // 2)
+            self._successes = 0
+            self._last_decrease = now
+            return True
+
+
+def link_or_copy(src, dst):
+    """Hard-link src to dst, or copy it when both are not on the same file system"""
+
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+@contextmanager
+def locked_file(path, blocking=True):
+    """Hold an exclusive lock on the file at path, which is created if needed, for the duration of the block. If
+    blocking is False and the lock is held elsewhere, BlockingIOError is raised instead of waiting for it."""
+
+    import fcntl
+
+    with open(path, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class SessionIdSet:
+    """Set of session IDs given as a comma separated list of IDs and a-b ranges, in any order and possibly overlapping
+    (e.g. "1-100,205,300-400"). The value is parsed in a single pass, without regular expressions, and kept as sorted,
+    disjoint ranges in which duplicate and adjacent IDs are coalesced, so that it is formatted in the most compact form
+    the sessions parameter of /sdk/packets accepts.
+    """
+
+    def __init__(self, session_ids):
+        """
+        :param session_ids: value of the session_ids parameter, ValueError is raised if it is not valid
+        """
+
+        ranges = []
+        for token in session_ids.split(","):
+            first, dash, last = token.partition("-")
+            first = first.strip()
+            last = last.strip() if dash else first
+            if not (first.isdigit() and last.isdigit() and first.isascii() and last.isascii()):
+                raise ValueError(consts.NETWITNESS_ERR_SESSION_IDS.format(token=token.strip()))
+            first, last = int(first), int(last)
+            if first > last:
+                raise ValueError(consts.NETWITNESS_ERR_BAD_RANGE)
+            ranges.append((first, last))
+
+        # an already sorted list, the usual case, is sorted in linear time
+        ranges.sort()
+        self.ranges = []
+        for first, last in ranges:
+            if self.ranges and first <= self.ranges[-1][1] + 1:
+                if last > self.ranges[-1][1]:
+                    self.ranges[-1] = (self.ranges[-1][0], last)
+            else:
+                self.ranges.append((first, last))
+
+    def __len__(self):
+        return sum(last - first + 1 for first, last in self.ranges)
+
+    def __str__(self):
+        return self._format(self.ranges)
+
+    @staticmethod
+    def _format(ranges):
+        return ",".join(f"{first}-{last}" if last > first else str(first) for first, last in ranges)
+
+    def split(self, count=1, max_length=None):
+        """Split the set into at most count contiguous, ascending groups of about the same number of IDs, and split
+        further any group whose formatted form is longer than max_length characters.
+
+        :param count: maximum number of groups of IDs
+        :param max_length: maximum length of a formatted group, unlimited if None
+        :return: list of formatted groups, in ascending order
+        """
+
+        group_size = -(-len(self) // max(1, count))
+        groups = [[]]
+        remaining = group_size
+        for first, last in self.ranges:
+            while first <= last:
+                if not remaining:
+                    groups.append([])
+                    remaining = group_size
+                end = min(last, first + remaining - 1)
+                groups[-1].append((first, end))
+                remaining -= end - first + 1
+                first = end + 1
+
+        formatted = []
+        for group in groups:
+            if max_length is None:
+                formatted.append(self._format(group))
+                continue
+            # a single range is never longer than two IDs, so every chunk holds at least one range
+            chunk = []
+            length = -1
+            for item in group:
+                item_length = len(self._format([item])) + 1
+                if chunk and length + item_length > max_length:
+                    formatted.append(self._format(chunk))
+                    chunk = []
+                    length = -1
+                chunk.append(item)
+                length += item_length
+            formatted.append(self._format(chunk))
+
+        return formatted
+
+
+def split_time_window(time1, time2, slice_minutes):
+    """Split an inclusive time window into consecutive slices of at most slice_minutes minutes. Slices do not overlap:
+    each one ends a second before the next one starts.
+
+    :param time1: start of the window (YYYY-MM-DD HH:MM:SS)
+    :param time2: end of the window (YYYY-MM-DD HH:MM:SS)
+    :param slice_minutes: length of a slice in minutes
+    :return: list of (start, end) tuples in chronological order
+    """
+
+    start = datetime.strptime(time1, consts.NETWITNESS_TIME_FORMAT)
+    end = datetime.strptime(time2, consts.NETWITNESS_TIME_FORMAT)
+    step = timedelta(minutes=slice_minutes)
+
+    slices = []
+    while start <= end:
+        slice_end = min(start + step - timedelta(seconds=1), end)
+        slices.append((start.strftime(consts.NETWITNESS_TIME_FORMAT), slice_end.strftime(consts.NETWITNESS_TIME_FORMAT)))
+        start = slice_end + timedelta(seconds=1)
+
+    return slices
+
+
+def build_estimate_query(data):
+    """Build the SDK query that counts, and sums the size of, the sessions selected by a /sdk/packets request body.
+
+    :param data: request body with sessions, where and/or time1 and time2
+    :return: query string
+    """
+
+    conditions = []
+    if data.get("sessions"):
+        conditions.append(f"sessionid={data['sessions']}")
+    if data.get("where"):
+        conditions.append(f"({data['where']})")
+    if data.get("time1") and data.get("time2"):
+        conditions.append(f'time="{data["time1"]}"-"{data["time2"]}"')
+
+    return "select count(sessionid), sum(size) where {}".format(" && ".join(conditions))
+
+
+def parse_query_estimate(body):
+    """Read the result of the query built by build_estimate_query from the JSON response of the SDK. Each aggregate is
+    identified by its type, or by its position if the device reports the type of the meta key only.
+
+    :param body: decoded JSON response
+    :return: tuple of the number of sessions and their size in bytes, None if the response has no query results
+    """
+
+    try:
+        fields = body["results"].get("fields") or []
+        values = {}
+        for index, field in enumerate(fields[:2]):
+            kind = str(field.get("type", "")).lower()
+            key = "count" if kind.startswith("count") else "sum" if kind.startswith("sum") else ("count", "sum")[index]
+            values[key] = int(float(field.get("value") or 0))
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+    return values.get("count", 0), values.get("sum", 0)
+
+
+def group_query_results(body):
+    """Group the meta values of the JSON response of an SDK query by session. ValueError is raised if the response has
+    no query results.
+
+    :param body: decoded JSON response
+    :return: dictionary, keyed by session ID in ascending order, of the meta of every session: meta key to value, or
+    to the list of its values if it has several
+    """
+
+    try:
+        fields = body["results"].get("fields") or []
+        sessions = {}
+        for field in fields:
+            meta = sessions.setdefault(int(field["group"]), {})
+            key, value = field["type"], field.get("value")
+            if key not in meta:
+                meta[key] = value
+            elif isinstance(meta[key], list):
+                meta[key].append(value)
+            elif meta[key] != value:
+                meta[key] = [meta[key], value]
+    except (AttributeError, KeyError, TypeError) as e:
+        raise ValueError(consts.NETWITNESS_ERR_QUERY_RESPONSE) from e
+
+    return dict(sorted(sessions.items()))
+
+
+def parse_status_nodes(body):
+    """Read the nodes of a msg=ls response of the device, e.g. the status nodes of /sys/stats. ValueError is raised if
+    the response does not list nodes.
+
+    :param body: decoded JSON response
+    :return: dictionary of the node names to their value, for the nodes that have one
+    """
+
+    try:
+        return {str(node["name"]): str(node["value"]) for node in body["nodes"] if node.get("value") is not None}
+    except (AttributeError, KeyError, TypeError) as e:
+        raise ValueError(consts.NETWITNESS_ERR_STATUS_RESPONSE) from e
+
+
+def format_epoch_time(value):
+    """Format a time in seconds since the epoch as an ISO 8601 UTC string, None if it is not a number"""
+
+    try:
+        return _format_event_time(int(float(value)))
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+def _read_pcap_header(shard_file, shard_path, global_header=None):
+    """Read and check the global header of a pcap file to merge: it must be compatible with global_header, the header
+    of the first file, if given
+
+    :return: the global header of the file
+    """
+
+    header = shard_file.read(consts.NETWITNESS_PCAP_GLOBAL_HEADER_LEN)
+    if len(header) < consts.NETWITNESS_PCAP_GLOBAL_HEADER_LEN or header[:4] not in consts.NETWITNESS_PCAP_MAGICS:
+        raise ValueError(consts.NETWITNESS_ERR_PCAP_HEADER.format(file=shard_path))
+
+    # the magic number defines byte order and timestamp precision, link type the record format
+    if global_header is not None and (header[:4] != global_header[:4] or header[20:24] != global_header[20:24]):
+        raise ValueError(consts.NETWITNESS_ERR_PCAP_MISMATCH.format(file=shard_path))
+
+    return header
+
+
+def _merge_in_passes(merge_files, shard_paths, output_path, codec):
+    """Merge more files than can be kept open at once by time: groups of NETWITNESS_MERGE_FAN_IN files are merged into
+    intermediate files, which are then merged into output_path.
+    """
+
+    import uuid
+
+    fan_in = consts.NETWITNESS_MERGE_FAN_IN
+    partial_paths = []
+
+    try:
+        for start in range(0, len(shard_paths), fan_in):
+            # named uniquely, as the intermediate files of a pass are themselves merged in several passes if they are many
+            partial_path = f"{output_path}.{uuid.uuid4().hex}.part"
+            partial_paths.append(partial_path)
+            merge_files(shard_paths[start : start + fan_in], partial_path, by_time=True)
+
+        return merge_files(partial_paths, output_path, codec, by_time=True)
+    finally:
+        for partial_path in partial_paths:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+
+
+def merge_pcap_files(shard_paths, output_path, codec=None, by_time=False):
+    """Merge pcap files into a single pcap file with one global header. Records are written in the order of
+    shard_paths, so shards covering ascending sessions produce a file in session order. With by_time, the records of
+    all the files are interleaved by timestamp instead (files that are each in time order produce a file in time
+    order), so that the packets of sessions that cross the boundary of two time slices come out in order.
+
+    :param shard_paths: list of pcap files to merge
+    :param output_path: path of the merged file
+    :param codec: gzip or zstd to compress the merged file as it is written
+    :param by_time: merge the records in timestamp order rather than concatenate the files
+    :return: size and SHA-256 hex digest of the merged capture, before compression
+    """
+
+    if by_time and len(shard_paths) > consts.NETWITNESS_MERGE_FAN_IN:
+        return _merge_in_passes(merge_pcap_files, shard_paths, output_path, codec)
+
+    with open(output_path, "wb") as out_file, CompressingWriter(out_file, codec) as compressor, ExitStack() as stack:
+        writer = HashingWriter(compressor)
+
+        if not by_time:
+            global_header = None
+            for shard_path in shard_paths:
+                with open(shard_path, "rb") as shard_file:
+                    header = _read_pcap_header(shard_file, shard_path, global_header)
+                    if global_header is None:
+                        global_header = header
+                        writer.write(header)
+                    shutil.copyfileobj(shard_file, writer, consts.NETWITNESS_DOWNLOAD_CHUNK_SIZE)
+
+            return writer.size, writer.hexdigest()
+
+        # imported here so that the actions which do not merge time slices do not load it
+        import heapq
+
+        shard_files = [stack.enter_context(open(shard_path, "rb")) for shard_path in shard_paths]
+        global_header = None
+        for shard_file, shard_path in zip(shard_files, shard_paths):
+            header = _read_pcap_header(shard_file, shard_path, global_header)
+            global_header = global_header or header
+        writer.write(global_header)
+
+        byte_order = _pcap_byte_order(global_header)
+        record_header = struct.Struct(f"{byte_order}IIII")
+        # a single record of every file is held in memory, records with the same timestamp keep the order of the files
+        records = heapq.merge(*(iter_pcap_records(shard_file, byte_order) for shard_file in shard_files), key=lambda record: record[:2])
+        for ts_sec, ts_frac, orig_len, data in records:
+            writer.write(record_header.pack(ts_sec, ts_frac, len(data), orig_len))
+            writer.write(data)
+
+    return writer.size, writer.hexdigest()
+
+
+def compress_file(src_path, dst_path, codec):
+    """Compress a capture that was not compressed as it was written, such as a cached capture or a split part, in a
+    single streaming pass.
+
+    :param src_path: path of the capture
+    :param dst_path: path of the compressed file
+    :param codec: gzip or zstd
+    :return: size and SHA-256 hex digest of the compressed file
+    """
+
+    with open(src_path, "rb") as src_file, open(dst_path, "wb") as dst_file:
+        writer = HashingWriter(dst_file)
+        with CompressingWriter(writer, codec) as compressor:
+            shutil.copyfileobj(src_file, compressor, consts.NETWITNESS_DOWNLOAD_CHUNK_SIZE)
+
+    return writer.size, writer.hexdigest()
+
+
+def _pcap_byte_order(global_header):
+    """Return the struct byte order of a pcap file from its global header"""
+
+    if len(global_header) < consts.NETWITNESS_PCAP_GLOBAL_HEADER_LEN or global_header[:4] not in consts.NETWITNESS_PCAP_MAGICS:
+        raise ValueError(consts.NETWITNESS_ERR_PCAP_HEADER.format(file="capture"))
+
+    return "<" if global_header[:4] in consts.NETWITNESS_PCAP_MAGICS[::2] else ">"
+
+
+def iter_pcap_records(file_obj, byte_order):
+    """Yield the records of a pcap file, one at a time, without decoding them
+
+    :param file_obj: binary file object positioned after the global header
+    :param byte_order: struct byte order of the file
+    :return: generator of (ts_sec, ts_frac, orig_len, data) tuples
+    """
+
+    record_header = struct.Struct(f"{byte_order}IIII")
+
+    while True:
+        header = file_obj.read(record_header.size)
+        if not header:
+            return
+        if len(header) < record_header.size:
+            raise ValueError(consts.NETWITNESS_ERR_PCAP_RECORD)
+
+        ts_sec, ts_frac, incl_len, orig_len = record_header.unpack(header)
+        data = file_obj.read(incl_len)
+        if len(data) < incl_len:
+            raise ValueError(consts.NETWITNESS_ERR_PCAP_RECORD)
+
+        yield ts_sec, ts_frac, orig_len, data
+
+
+def _parse_packet(link_type, data):
+    """Extract the addresses, IP protocol and ports of a packet. Fields that cannot be read (unsupported link or network
+    layer, truncated packet, non-first fragment) are left out.
+
+    :param link_type: link type of the capture
+    :param data: captured bytes of the packet
+    :return: dictionary with the ip version, src and dst addresses, proto, sport and dport
+    """
+
+    import ipaddress
+
+    packet = {}
+
+    if link_type == consts.NETWITNESS_LINKTYPE_ETHERNET:
+        offset, ether_type = 14, int.from_bytes(data[12:14], "big")
+        # skip 802.1Q and 802.1ad tags
+        while ether_type in (0x8100, 0x88A8) and len(data) >= offset + 4:
+            ether_type, offset = int.from_bytes(data[offset + 2 : offset + 4], "big"), offset + 4
+    elif link_type == consts.NETWITNESS_LINKTYPE_LINUX_SLL:
+        offset, ether_type = 16, int.from_bytes(data[14:16], "big")
+    elif link_type in consts.NETWITNESS_LINKTYPES_RAW_IP:
+        offset, ether_type = 0, {4: 0x0800, 6: 0x86DD}.get(data[0] >> 4 if data else None)
+    else:
+        return packet
+
+    if ether_type == 0x0800 and len(data) >= offset + 20:
+        header_len = (data[offset] & 0x0F) * 4
+        proto = data[offset + 9]
+        packet.update(
+            version=4,
+            proto=proto,
+            src=ipaddress.IPv4Address(data[offset + 12 : offset + 16]),
+            dst=ipaddress.IPv4Address(data[offset + 16 : offset + 20]),
+        )
+        first_fragment = not int.from_bytes(data[offset + 6 : offset + 8], "big") & 0x1FFF
+        offset += header_len
+    elif ether_type == 0x86DD and len(data) >= offset + 40:
+        proto = data[offset + 6]
+        packet.update(
+            version=6, src=ipaddress.IPv6Address(data[offset + 8 : offset + 24]), dst=ipaddress.IPv6Address(data[offset + 24 : offset + 40])
+        )
+        offset += 40
+        first_fragment = True
+        # hop-by-hop, routing, fragment and destination options headers
+        while proto in (0, 43, 44, 60) and len(data) >= offset + 8:
+            if proto == 44:
+                first_fragment = not int.from_bytes(data[offset + 2 : offset + 4], "big") >> 3
+                proto, offset = data[offset], offset + 8
+            else:
+                proto, offset = data[offset], offset + (data[offset + 1] + 1) * 8
+        packet["proto"] = proto
+    else:
+        return packet
+
+    if proto in (6, 17, 132) and first_fragment and len(data) >= offset + 4:
+        packet.update(sport=int.from_bytes(data[offset : offset + 2], "big"), dport=int.from_bytes(data[offset + 2 : offset + 4], "big"))
+
+    return packet
+
+
+class PcapFilter:
+    """Packet filter using a subset of the BPF syntax: host, net, port and portrange primitives, optionally qualified by
+    src or dst, the ip, ip6, tcp, udp, sctp, icmp and icmp6 protocols, combined with and, or, not (or &&, ||, !) and
+    parentheses. Juxtaposed primitives are and-ed, so "tcp port 80" is "tcp and port 80".
+    """
+
+    _PROTOCOLS = {"tcp": 6, "udp": 17, "sctp": 132, "icmp": 1, "icmp6": 58}
+
+    def __init__(self, expression):
+        """
+        :param expression: filter expression, ValueError is raised if it is not valid
+        """
+
+        self.expression = expression
+        self._tokens = re.findall(r"\(|\)|&&|\|\||!|[^\s()&|!]+", expression)
+        self._pos = 0
+
+        self._match = self._parse_or()
+        if self._pos != len(self._tokens):
+            self._error()
+
+    def match(self, link_type, data):
+        """Return whether a packet matches the filter
+
+        :param link_type: link type of the capture
+        :param data: captured bytes of the packet
+        """
+
+        return self._match(_parse_packet(link_type, data))
+
+    def _error(self):
+        raise ValueError(consts.NETWITNESS_ERR_PACKET_FILTER.format(filter=self.expression))
+
+    def _next(self):
+        if self._pos >= len(self._tokens):
+            self._error()
+        self._pos += 1
+        return self._tokens[self._pos - 1].lower()
+
+    def _peek(self):
+        return self._tokens[self._pos].lower() if self._pos < len(self._tokens) else None
+
+    def _parse_or(self):
+        terms = [self._parse_and()]
+        while self._peek() in ("or", "||"):
+            self._next()
+            terms.append(self._parse_and())
+        return terms[0] if len(terms) == 1 else lambda packet: any(term(packet) for term in terms)
+
+    def _parse_and(self):
+        factors = [self._parse_not()]
+        while self._peek() is not None and self._peek() not in ("or", "||", ")"):
+            if self._peek() in ("and", "&&"):
+                self._next()
+            factors.append(self._parse_not())
+        return factors[0] if len(factors) == 1 else lambda packet: all(factor(packet) for factor in factors)
+
+    def _parse_not(self):
+        token = self._peek()
+        if token in ("not", "!"):
+            self._next()
+            factor = self._parse_not()
+            return lambda packet: not factor(packet)
+        if token == "(":
+            self._next()
+            expression = self._parse_or()
+            if self._next() != ")":
+                self._error()
+            return expression
+        return self._parse_primitive()
+
+    def _parse_primitive(self):
+        import ipaddress
+
+        token = self._next()
+
+        if token in ("ip", "ip6"):
+            version = 4 if token == "ip" else 6
+            return lambda packet: packet.get("version") == version
+        if token in self._PROTOCOLS:
+            proto = self._PROTOCOLS[token]
+            return lambda packet: packet.get("proto") == proto
+
+        directions = ("src", "dst")
+        if token in directions:
+            directions = (token,)
+            token = self._next()
+
+        try:
+            if token == "host":
+                address = ipaddress.ip_address(self._next())
+                fields = directions
+
+                def test(value):
+                    return value == address
+
+            elif token == "net":
+                network = ipaddress.ip_network(self._next(), strict=False)
+                fields = directions
+
+                def test(value):
+                    return value is not None and value.version == network.version and value in network
+
+            elif token in ("port", "portrange"):
+                bounds = re.fullmatch(r"(\d+)(?:-(\d+))?", self._next(), re.ASCII)
+                if bounds is None:
+                    self._error()
+                low = int(bounds.group(1))
+                high = int(bounds.group(2) or low)
+                if high < low or high > consts.NETWITNESS_MAX_PORT:
+                    self._error()
+                fields = tuple({"src": "sport", "dst": "dport"}[direction] for direction in directions)
+
+                def test(value):
+                    return value is not None and low <= value <= high
+
+            else:
+                self._error()
+        except ValueError:
+            self._error()
+
+        return lambda packet: any(test(packet.get(field)) for field in fields)
+
+
+def process_pcap(src_path, work_dir, file_name, snaplen=None, packet_filter=None, split_size=None, split_count=None, codec=None):
+    """Filter, truncate and split a pcap file record by record, holding a single record in memory at a time.
+
+    :param src_path: path of the pcap file
+    :param work_dir: directory in which the output files are written
+    :param file_name: name of the output file, a -NNN suffix is added to it when the capture is split in several files
+    :param snaplen: maximum number of bytes kept from every packet
+    :param packet_filter: PcapFilter the packets must match
+    :param split_size: maximum size of an output file in bytes (a file always gets at least one packet)
+    :param split_count: maximum number of packets of an output file
+    :param codec: gzip or zstd to compress the output files as they are written
+    :return: list of dictionaries with the name, path, size, SHA-256 (both before compression) and number of packets of
+    the output files, empty if no packet matched the filter
+    """
+
+    outputs = []
+    out_file = compressor = writer = None
+    base_name, extension = os.path.splitext(file_name)
+
+    def close_output():
+        compressor.close()
+        out_file.close()
+        outputs[-1].update(size=writer.size, sha256=writer.hexdigest())
+
+    try:
+        with open(src_path, "rb") as src_file:
+            global_header = src_file.read(consts.NETWITNESS_PCAP_GLOBAL_HEADER_LEN)
+            byte_order = _pcap_byte_order(global_header)
+            link_type = struct.unpack(f"{byte_order}I", global_header[20:24])[0]
+            record_header = struct.Struct(f"{byte_order}IIII")
+
+            if snaplen:
+                original_snaplen = struct.unpack(f"{byte_order}I", global_header[16:20])[0]
+                global_header = (
+                    global_header[:16] + struct.pack(f"{byte_order}I", min(snaplen, original_snaplen or snaplen)) + global_header[20:]
+                )
+
+            for ts_sec, ts_frac, orig_len, data in iter_pcap_records(src_file, byte_order):
+                if packet_filter and not packet_filter.match(link_type, data):
+                    continue
+                if snaplen:
+                    data = data[:snaplen]
+
+                record_size = record_header.size + len(data)
+                if writer is None or (
+                    outputs[-1]["packet_count"]
+                    and ((split_count and outputs[-1]["packet_count"] >= split_count) or (split_size and writer.size + record_size > split_size))
+                ):
+                    if writer is not None:
+                        close_output()
+                    path = os.path.join(work_dir, f"{base_name}-{len(outputs) + 1:03d}{extension}")
+                    out_file = open(path, "wb")
+                    compressor = CompressingWriter(out_file, codec)
+                    writer = HashingWriter(compressor)
+                    writer.write(global_header)
+                    outputs.append({"path": path, "packet_count": 0})
+
+                writer.write(record_header.pack(ts_sec, ts_frac, len(data), orig_len))
+                writer.write(data)
+                outputs[-1]["packet_count"] += 1
+
+        if writer is not None:
+            close_output()
+    finally:
+        if out_file is not None and not out_file.closed:
+            out_file.close()
+
+    if len(outputs) == 1:
+        # not split, the output keeps the name of the capture
+        path = os.path.join(work_dir, file_name)
+        os.replace(outputs[0]["path"], path)
+        outputs[0]["path"] = path
+
+    for output in outputs:
+        output["name"] = os.path.basename(output["path"])
+
+    return outputs
+
+
+class JsonEventReader:
+    """Incremental parser of a JSON capture: either a list of events, or an object in which the first member holding a
+    list is the list of events. Events are decoded one at a time from a buffer that holds a single chunk of the file (or
+    a single event, if it is larger), so memory usage does not depend on the size of the capture.
+
+    The members of the object found before the events are available in head once the reader is created, the members
+    found after them in tail once every event has been read.
+    """
+
+    def __init__(self, file_obj):
+        """
+        :param file_obj: binary file object of the capture
+        """
+
+        import codecs
+
+        self._file_obj = file_obj
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self.events_key = None
+        self.head = []
+        self.tail = []
+
+        self._find_events()
+
+    def _fill(self):
+        """Drop the parsed part of the buffer and append the next chunk of the file to it"""
+
+        chunk = self._file_obj.read(consts.NETWITNESS_DOWNLOAD_CHUNK_SIZE)
+        self._eof = not chunk
+        self._buffer = self._buffer[self._pos :] + self._text_decoder.decode(chunk, final=self._eof)
+        self._pos = 0
+
+    def _peek(self):
+        """Skip whitespace and return the next character, or an empty string at the end of the file"""
+
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buffer) or self._eof:
+                return self._buffer[self._pos : self._pos + 1]
+            self._fill()
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(consts.NETWITNESS_ERR_JSON_CAPTURE)
+        self._pos += 1
+
+    def _value(self):
+        """Decode the next JSON value"""
+
+        self._peek()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._buffer, self._pos)
+                # a number cut by the end of the buffer (1, 1., 1e...) may continue in the next chunk, a complete value
+                # is always followed by a delimiter
+                if self._eof or self._buffer[end : end + 1] in {",", "]", "}", ":", " ", "\t", "\r", "\n"}:
+                    self._pos = end
+                    return value
+            except ValueError:
+                if self._eof:
+                    raise ValueError(consts.NETWITNESS_ERR_JSON_CAPTURE) from None
+            self._fill()
+
+    def _members(self, members, find_events=False):
+        """Read object members into members until the end of the object or, if find_events is set, until a member
+        holding a list is found.
+
+        :return: name of the member holding a list, or None if the object ended
+        """
+
+        while True:
+            char = self._peek()
+            if char == "}":
+                self._pos += 1
+                return None
+            if char == ",":
+                self._pos += 1
+                continue
+            key = self._value()
+            self._expect(":")
+            if find_events and self._peek() == "[":
+                self._pos += 1
+                return key
+            members.append((key, self._value()))
+
+    def _find_events(self):
+        if self._peek() == "[":
+            self._pos += 1
+            return
+
+        self._expect("{")
+        self.events_key = self._members(self.head, find_events=True)
+        if self.events_key is None:
+            raise ValueError(consts.NETWITNESS_ERR_JSON_CAPTURE)
+
+    def events(self):
+        """Yield the events of the capture in order"""
+
+        first = True
+        while True:
+            if self._peek() == "]":
+                self._pos += 1
+                break
+            if not first:
+                self._expect(",")
+            yield self._value()
+            first = False
+
+        if self.events_key is not None:
+            self._members(self.tail)
+
+
+def _json_members(members):
+    """Serialize (name, value) pairs as the members of a JSON object"""
+
+    return ", ".join(f"{json.dumps(key)}: {json.dumps(value)}" for key, value in members)
+
+
+def _timed_events(reader):
+    """Yield the events of a JSON capture with their time, to merge captures by time. An event without a time gets the
+    time of the event before it, so that it keeps its place.
+    """
+
+    last_time = float("-inf")
+    for event in reader.events():
+        event_time = event.get(consts.NETWITNESS_EVENT_TIME_FIELD) if isinstance(event, dict) else None
+        if isinstance(event_time, (int, float)) and not isinstance(event_time, bool):
+            last_time = event_time
+        yield last_time, event
+
+
+def _concatenated_events(first_reader, shard_paths):
+    """Yield the events of the first capture, then those of the other captures, opened one at a time"""
+
+    yield from first_reader.events()
+    for shard_path in shard_paths:
+        with open(shard_path, "rb") as shard_file:
+            yield from JsonEventReader(shard_file).events()
+
+
+def merge_json_files(shard_paths, output_path, codec=None, by_time=False):
+    """Merge JSON log captures into a single document of the same shape as the first shard. Captures are parsed and
+    written one event at a time, in the order of shard_paths, or, with by_time, interleaved by event time (captures
+    that are each in time order produce a document in time order).
+
+    :param shard_paths: list of JSON files to merge
+    :param output_path: path of the merged file
+    :param codec: gzip or zstd to compress the merged file as it is written
+    :param by_time: merge the events in time order rather than concatenate the captures
+    :return: size and SHA-256 hex digest of the merged capture, before compression
+    """
+
+    if by_time and len(shard_paths) > consts.NETWITNESS_MERGE_FAN_IN:
+        return _merge_in_passes(merge_json_files, shard_paths, output_path, codec)
+
+    with open(output_path, "wb") as out_file, CompressingWriter(out_file, codec) as compressor, ExitStack() as stack:
+        writer = HashingWriter(compressor)
+        first_reader = JsonEventReader(stack.enter_context(open(shard_paths[0], "rb")))
+
+        if by_time:
+            # imported here so that the actions which do not merge time slices do not load it
+            import heapq
+
+            readers = [first_reader] + [JsonEventReader(stack.enter_context(open(shard_path, "rb"))) for shard_path in shard_paths[1:]]
+            events = (event for _, event in heapq.merge(*(_timed_events(reader) for reader in readers), key=lambda item: item[0]))
+        else:
+            events = _concatenated_events(first_reader, shard_paths[1:])
+
+        # keep every other member of the first document, in their original order
+        events_key = first_reader.events_key
+        if events_key is not None:
+            head = _json_members(first_reader.head)
+            writer.write(f"{{{head}{', ' if head else ''}{json.dumps(events_key)}: [".encode())
+        else:
+            writer.write(b"[")
+
+        first_event = True
+        for event in events:
+            writer.write((("" if first_event else ", ") + json.dumps(event)).encode())
+            first_event = False
+
+        # the members after the events are known once the first document has been read to the end
+        tail = first_reader.tail
+        if events_key is not None:
+            writer.write(f"]{', ' if tail else ''}{_json_members(tail)}}}".encode())
+        else:
+            writer.write(b"]")
+
+    return writer.size, writer.hexdigest()
+
+
+def _format_event_time(value):
+    """Format an event time in seconds since the epoch as an ISO 8601 UTC string"""
+
+    return datetime.fromtimestamp(value, timezone.utc).strftime(consts.NETWITNESS_EVENT_TIME_FORMAT)
+
+
+def write_ndjson(src_path, dst_path, codec=None):
+    """Convert a JSON log capture to newline-delimited JSON, one event per line, parsing it as a stream.
+
+    :param src_path: path of the JSON capture
+    :param dst_path: path of the NDJSON file
+    :param codec: gzip or zstd to compress the NDJSON file as it is written
+    :return: size and SHA-256 hex digest of the NDJSON data, before compression, and a dictionary with the number of
+    events and, when the events carry a time, the first and last event times and the time span in seconds
+    """
+
+    event_count = 0
+    first_time = last_time = None
+
+    with open(src_path, "rb") as src_file, open(dst_path, "wb") as dst_file, CompressingWriter(dst_file, codec) as compressor:
+        writer = HashingWriter(compressor)
+        for event in JsonEventReader(src_file).events():
+            writer.write(json.dumps(event).encode() + b"\n")
+            event_count += 1
+
+            event_time = event.get(consts.NETWITNESS_EVENT_TIME_FIELD) if isinstance(event, dict) else None
+            if isinstance(event_time, (int, float)) and not isinstance(event_time, bool):
+                first_time = event_time if first_time is None else min(first_time, event_time)
+                last_time = event_time if last_time is None else max(last_time, event_time)
+
+    stats = {"event_count": event_count}
+    if first_time is not None:
+        stats.update(
+            {
+                "first_event": _format_event_time(first_time),
+                "last_event": _format_event_time(last_time),
+                "time_span": last_time - first_time,
+            }
+        )
+
+    return writer.size, writer.hexdigest(), stats
+
+
+def capture_cache_key(base_url, data, compression=None):
+    """Build the cache key of a capture request from the device URL, the normalized request body and the compression
+    the capture is stored with
+
+    :param base_url: URL of the device
+    :param data: /sdk/packets request body
+    :param compression: gzip or zstd if the capture is compressed as it is downloaded
+    :return: SHA-256 hex digest identifying the request
+    """
+
+    normalized = {"url": base_url.rstrip("/").lower()}
+    if compression:
+        normalized["compression"] = compression
+    for key in consts.NETWITNESS_CACHE_KEY_FIELDS:
+        value = data.get(key)
+        if value is not None:
+            normalized[key] = " ".join(str(value).split())
+
+    if "sessions" in normalized:
+        normalized["sessions"] = normalized["sessions"].replace(" ", "")
+
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode()).hexdigest()
+
+
+class CaptureCache:
+    """On-disk cache of captures. Captures are stored once per content hash under blobs/, and an index maps request keys
+    to them. Entries expire after a TTL and the least recently used ones are evicted once the blobs exceed the maximum
+    size. The index is guarded by a file lock so that concurrent action runs can share the cache.
+    """
+
+    def __init__(self, root, max_size, ttl):
+        """
+        :param root: directory of the cache
+        :param max_size: maximum total size of the cached blobs in bytes
+        :param ttl: number of seconds an entry stays valid
+        """
+
+        self._root = root
+        self._blob_dir = os.path.join(root, "blobs")
+        self._index_path = os.path.join(root, "index.json")
+        self._max_size = max_size
+        self._ttl = ttl
+        os.makedirs(self._blob_dir, exist_ok=True)
+
+    @contextmanager
+    def _locked_index(self):
+        """Lock the cache and yield its index, which is written back when the block completes"""
+
+        with locked_file(os.path.join(self._root, ".lock")):
+            try:
+                with open(self._index_path) as index_file:
+                    index = json.load(index_file)
+            except (OSError, ValueError):
+                index = {}
+
+            yield index
+
+            temp_path = f"{self._index_path}.tmp"
+            with open(temp_path, "w") as index_file:
+                json.dump(index, index_file)
+            os.replace(temp_path, self._index_path)
+
+    @staticmethod
+    def _blob_name(entry):
+        """Name of the blob of an entry: the SHA-256 of the capture, with the extension of its compression if any"""
+
+        compression = entry.get("compression")
+        return f"{entry['sha256']}.{consts.NETWITNESS_COMPRESSION_EXTENSIONS[compression]}" if compression else entry["sha256"]
+
+    def _blob_path(self, entry):
+        return os.path.join(self._blob_dir, self._blob_name(entry))
+
+    def _remove_entry(self, index, key):
+        """Drop an entry, and its blob if no other entry refers to it"""
+
+        entry = index.pop(key)
+        if not any(self._blob_name(other) == self._blob_name(entry) for other in index.values()):
+            blob_path = self._blob_path(entry)
+            if os.path.exists(blob_path):
+                os.remove(blob_path)
+
+    def get(self, key, dest_path):
+        """Look up a capture and hard-link (or copy) it to dest_path. The link is made while the cache is locked, so that
+        a concurrent put cannot evict the blob before the caller has it.
+
+        :param key: cache key of the request
+        :param dest_path: path at which the cached capture is made available, the caller owns the file
+        :return: size and SHA-256 of the cached capture, or None if it is not cached
+        """
+
+        now = time.time()
+
+        with self._locked_index() as index:
+            entry = index.get(key)
+            if not entry:
+                return None
+
+            if now - entry["created"] > self._ttl or not os.path.exists(self._blob_path(entry)):
+                self._remove_entry(index, key)
+                return None
+
+            link_or_copy(self._blob_path(entry), dest_path)
+            entry["accessed"] = now
+
+        return entry["size"], entry["sha256"]
+
+    def peek(self, key):
+        """Return the size and SHA-256 of a cached capture without making it available, or None if it is not cached
+
+        :param key: cache key of the request
+        """
+
+        with self._locked_index() as index:
+            entry = index.get(key)
+            if not entry or time.time() - entry["created"] > self._ttl or not os.path.exists(self._blob_path(entry)):
+                return None
+
+        return entry["size"], entry["sha256"]
+
+    def put(self, key, file_path, size, sha256, compression=None):
+        """Add a capture to the cache, then evict expired and least recently used entries
+
+        :param key: cache key of the request
+        :param file_path: path of the capture, which is hard-linked (or copied) into the cache
+        :param size: size of the capture in bytes, before compression
+        :param sha256: SHA-256 hex digest of the capture, before compression
+        :param compression: gzip or zstd if the file is compressed
+        """
+
+        entry = {"sha256": sha256, "size": size, "compression": compression, "blob_size": os.path.getsize(file_path)}
+        if entry["blob_size"] > self._max_size:
+            return
+
+        blob_path = self._blob_path(entry)
+        if not os.path.exists(blob_path):
+            temp_path = f"{blob_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            link_or_copy(file_path, temp_path)
+            os.replace(temp_path, blob_path)
+
+        now = time.time()
+
+        with self._locked_index() as index:
+            # a request cached again, after its entry expired or by a concurrent run, may map to another blob
+            if key in index and self._blob_name(index[key]) != self._blob_name(entry):
+                self._remove_entry(index, key)
+            index[key] = dict(entry, created=now, accessed=now)
+
+            for expired_key in [name for name, entry in index.items() if now - entry["created"] > self._ttl]:
+                self._remove_entry(index, expired_key)
+
+            # every blob is counted once, however many requests map to it
+            blob_sizes = {self._blob_name(entry): entry.get("blob_size", entry["size"]) for entry in index.values()}
+            total_size = sum(blob_sizes.values())
+            for lru_key in sorted(index, key=lambda name: index[name]["accessed"]):
+                if total_size <= self._max_size:
+                    break
+                blob_name = self._blob_name(index[lru_key])
+                self._remove_entry(index, lru_key)
+                if blob_name not in {self._blob_name(entry) for entry in index.values()}:
+                    total_size -= blob_sizes[blob_name]
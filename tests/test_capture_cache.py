@@ -0,0 +1,127 @@
+import hashlib
+import os
+
+import pytest
+
+import netwitness_utils
+from netwitness_utils import CaptureCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Time seen by the cache, which only moves when a test advances it"""
+
+    now = [1_000_000.0]
+    monkeypatch.setattr(netwitness_utils.time, "time", lambda: now[0])
+    return now
+
+
+def capture(tmp_path, name, size):
+    data = name.encode() * size
+    path = tmp_path / name
+    path.write_bytes(data[:size])
+    return str(path), size, hashlib.sha256(data[:size]).hexdigest()
+
+
+def blobs(root):
+    return sorted(os.listdir(os.path.join(root, "blobs")))
+
+
+def test_get_returns_a_copy_of_the_capture(tmp_path, clock):
+    cache = CaptureCache(str(tmp_path / "cache"), 1000, 60)
+    path, size, sha256 = capture(tmp_path, "a", 100)
+    cache.put("key-a", path, size, sha256)
+    os.remove(path)
+
+    dest = str(tmp_path / "dest")
+    assert cache.get("key-a", dest) == (size, sha256)
+    assert cache.peek("key-a") == (size, sha256)
+    with open(dest, "rb") as dest_file:
+        assert hashlib.sha256(dest_file.read()).hexdigest() == sha256
+    assert cache.get("key-b", dest) is None
+
+
+def test_ttl(tmp_path, clock):
+    root = str(tmp_path / "cache")
+    cache = CaptureCache(root, 1000, 60)
+    cache.put("key-a", *capture(tmp_path, "a", 100))
+
+    clock[0] += 59
+    assert cache.peek("key-a") is not None
+    # reading an entry does not extend its life
+    assert cache.get("key-a", str(tmp_path / "dest-1")) is not None
+
+    clock[0] += 2
+    assert cache.peek("key-a") is None
+    assert cache.get("key-a", str(tmp_path / "dest-2")) is None
+    assert blobs(root) == []
+
+
+def test_put_drops_expired_entries(tmp_path, clock):
+    root = str(tmp_path / "cache")
+    cache = CaptureCache(root, 1000, 60)
+    a, b = capture(tmp_path, "a", 100), capture(tmp_path, "b", 100)
+    cache.put("key-a", *a)
+    clock[0] += 61
+    cache.put("key-b", *b)
+
+    assert blobs(root) == [b[2]]
+
+
+def test_lru_eviction(tmp_path, clock):
+    root = str(tmp_path / "cache")
+    cache = CaptureCache(root, 250, 3600)
+    a, b, c = (capture(tmp_path, name, 100) for name in "abc")
+    cache.put("key-a", *a)
+    clock[0] += 1
+    cache.put("key-b", *b)
+    clock[0] += 1
+    # a is used again, so b is now the least recently used entry
+    cache.get("key-a", str(tmp_path / "dest"))
+    clock[0] += 1
+    cache.put("key-c", *c)
+
+    assert cache.peek("key-a") is not None
+    assert cache.peek("key-b") is None
+    assert cache.peek("key-c") is not None
+    assert blobs(root) == sorted([a[2], c[2]])
+
+
+def test_shared_blob_is_counted_and_kept_once(tmp_path, clock):
+    root = str(tmp_path / "cache")
+    cache = CaptureCache(root, 250, 3600)
+    a, b = capture(tmp_path, "a", 100), capture(tmp_path, "b", 100)
+    cache.put("key-a1", *a)
+    clock[0] += 1
+    cache.put("key-a2", *a)
+    clock[0] += 1
+    cache.put("key-b", *b)
+
+    assert blobs(root) == sorted([a[2], b[2]])
+    assert cache.peek("key-a1") == cache.peek("key-a2") == (100, a[2])
+
+    clock[0] += 1
+    cache.put("key-c", *capture(tmp_path, "c", 100))
+    # key-a1 is evicted, but its blob is still used by key-a2, so key-a2 is evicted too to make room
+    assert cache.peek("key-a1") is None
+    assert cache.peek("key-a2") is None
+    assert cache.peek("key-b") is not None
+
+
+def test_capture_larger_than_the_cache_is_not_cached(tmp_path, clock):
+    root = str(tmp_path / "cache")
+    cache = CaptureCache(root, 50, 3600)
+    cache.put("key-a", *capture(tmp_path, "a", 100))
+
+    assert cache.peek("key-a") is None
+    assert blobs(root) == []
+
+
+def test_compressed_blob(tmp_path, clock):
+    root = str(tmp_path / "cache")
+    cache = CaptureCache(root, 1000, 3600)
+    path, _, sha256 = capture(tmp_path, "a", 40)
+    cache.put("key-a", path, 400, sha256, compression="gzip")
+
+    assert blobs(root) == [f"{sha256}.gz"]
+    assert cache.peek("key-a") == (400, sha256)
@@ -0,0 +1,84 @@
+import gzip
+import os
+import zlib
+
+import pytest
+
+from netwitness_utils import ContentDecoder, DecodingError
+
+
+def decode(decoder, body, piece_size=7, max_length=1024):
+    """Feed a body to a decoder in pieces, and return the decoded bytes and the size of the largest decoded piece"""
+
+    pieces = []
+    for offset in range(0, len(body), piece_size):
+        pieces.extend(decoder.decode(body[offset : offset + piece_size], max_length))
+    pieces.append(decoder.flush())
+    return b"".join(pieces), max(len(piece) for piece in pieces)
+
+
+def raw_deflate(data):
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+DATA = os.urandom(2000) + bytes(50000)
+
+
+def test_identity():
+    decoder = ContentDecoder()
+
+    assert decode(decoder, DATA)[0] == DATA
+    assert decoder.wire_size == len(DATA)
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "x-gzip", " GZIP "])
+def test_gzip(encoding):
+    body = gzip.compress(DATA)
+    decoder = ContentDecoder(encoding)
+    decoded, largest = decode(decoder, body)
+
+    assert decoded == DATA
+    assert largest <= 1024
+    assert decoder.wire_size == len(body)
+
+
+def test_gzip_multi_member():
+    body = gzip.compress(DATA) + gzip.compress(b"second member") + gzip.compress(DATA[:100])
+
+    for piece_size in (1, 7, len(body)):
+        assert decode(ContentDecoder("gzip"), body, piece_size)[0] == DATA + b"second member" + DATA[:100]
+
+
+def test_zlib_deflate():
+    assert decode(ContentDecoder("deflate"), zlib.compress(DATA))[0] == DATA
+
+
+def test_raw_deflate():
+    body = raw_deflate(DATA)
+
+    for piece_size in (1, 2, 7, len(body)):
+        decoder = ContentDecoder("deflate")
+        assert decode(decoder, body, piece_size)[0] == DATA
+        assert decoder.wire_size == len(body)
+
+
+def test_bounded_pieces_of_a_highly_compressed_body():
+    body = gzip.compress(bytes(10_000_000))
+
+    decoded_size = 0
+    for piece in ContentDecoder("gzip").decode(body, max_length=65536):
+        assert len(piece) <= 65536
+        decoded_size += len(piece)
+    assert decoded_size == 10_000_000
+
+
+def test_unsupported_encoding():
+    with pytest.raises(DecodingError):
+        ContentDecoder("br")
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate"])
+def test_corrupt_body(encoding):
+    with pytest.raises(DecodingError):
+        decode(ContentDecoder(encoding), b"definitely not compressed data")
@@ -0,0 +1,69 @@
+import io
+import json
+
+import pytest
+
+import netwitness_consts as consts
+from netwitness_utils import JsonEventReader
+
+
+EVENTS = [
+    {"time": 1, "text": "café ☃ \U0001f600", "nested": {"list": [1, 2, {"a": None}]}},
+    {"time": 2.5e3, "escaped": 'quote " and ] } , :'},
+    12345678901234567890,
+    -1.25e-7,
+    "string",
+    [],
+    {},
+    True,
+    None,
+]
+
+
+@pytest.fixture(params=[1, 3, 64, 1 << 20], ids=lambda size: f"chunk{size}")
+def chunk_size(request, monkeypatch):
+    """Read captures in chunks of several sizes, so that values are cut at every position"""
+
+    monkeypatch.setattr(consts, "NETWITNESS_DOWNLOAD_CHUNK_SIZE", request.param)
+    return request.param
+
+
+def reader_for(text):
+    return JsonEventReader(io.BytesIO(text.encode()))
+
+
+def test_list(chunk_size):
+    reader = reader_for(json.dumps(EVENTS, ensure_ascii=False))
+
+    assert list(reader.events()) == EVENTS
+    assert (reader.events_key, reader.head, reader.tail) == (None, [], [])
+
+
+def test_object(chunk_size):
+    text = json.dumps({"flags": 1, "meta": {"a": [1]}, "logs": EVENTS, "id2": 7, "done": True}, indent=2, ensure_ascii=False)
+    reader = reader_for(text)
+
+    assert reader.events_key == "logs"
+    assert reader.head == [("flags", 1), ("meta", {"a": [1]})]
+    assert list(reader.events()) == EVENTS
+    assert reader.tail == [("id2", 7), ("done", True)]
+
+
+def test_empty_list(chunk_size):
+    reader = reader_for(' { "logs" : [ ] } ')
+
+    assert list(reader.events()) == []
+    assert reader.events_key == "logs"
+
+
+def test_number_cut_by_a_chunk(monkeypatch):
+    monkeypatch.setattr(consts, "NETWITNESS_DOWNLOAD_CHUNK_SIZE", 4)
+
+    assert list(reader_for("[123456789,1.5e10]").events()) == [123456789, 1.5e10]
+
+
+@pytest.mark.parametrize("text", ["", "5", '"events"', "{}", '{"count": 3}', "[1, 2", "[1 2]", '{"logs": [1], "id2"}', "[{]"])
+def test_invalid_capture(text, chunk_size):
+    with pytest.raises(ValueError):
+        reader = reader_for(text)
+        list(reader.events())
@@ -0,0 +1,117 @@
+import gzip
+import hashlib
+import json
+import struct
+
+import pytest
+
+import netwitness_consts as consts
+from netwitness_utils import iter_pcap_records, merge_json_files, merge_pcap_files
+
+
+def write_pcap(path, timestamps, link_type=1):
+    """Write a little-endian pcap file with one 4-byte packet per timestamp, the packet holding its own timestamp"""
+
+    with open(path, "wb") as pcap_file:
+        pcap_file.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, link_type))
+        for ts_sec in timestamps:
+            pcap_file.write(struct.pack("<IIII", ts_sec, 0, 4, 4) + struct.pack("<I", ts_sec))
+
+
+def read_timestamps(path):
+    with open(path, "rb") as pcap_file:
+        pcap_file.read(consts.NETWITNESS_PCAP_GLOBAL_HEADER_LEN)
+        return [ts_sec for ts_sec, _, _, _ in iter_pcap_records(pcap_file, "<")]
+
+
+def shards(tmp_path, timestamp_lists, **kwargs):
+    paths = []
+    for index, timestamps in enumerate(timestamp_lists):
+        path = str(tmp_path / f"shard-{index}")
+        write_pcap(path, timestamps, **kwargs)
+        paths.append(path)
+    return paths
+
+
+def test_pcap_concatenation_keeps_file_order(tmp_path):
+    output = str(tmp_path / "out.pcap")
+    merge_pcap_files(shards(tmp_path, [[10, 20, 30], [15, 25]]), output)
+
+    assert read_timestamps(output) == [10, 20, 30, 15, 25]
+
+
+def test_pcap_merge_by_time_interleaves_records(tmp_path):
+    output = str(tmp_path / "out.pcap")
+    size, sha256 = merge_pcap_files(shards(tmp_path, [[10, 20, 30], [15, 25], []]), output, by_time=True)
+
+    assert read_timestamps(output) == [10, 15, 20, 25, 30]
+    with open(output, "rb") as merged:
+        data = merged.read()
+    assert (size, sha256) == (len(data), hashlib.sha256(data).hexdigest())
+
+
+def test_pcap_merge_by_time_in_several_passes(tmp_path, monkeypatch):
+    monkeypatch.setattr(consts, "NETWITNESS_MERGE_FAN_IN", 2)
+    output = str(tmp_path / "out.pcap")
+    merge_pcap_files(shards(tmp_path, [[5, 50], [1, 40], [30], [2, 3], [60]]), output, by_time=True)
+
+    assert read_timestamps(output) == [1, 2, 3, 5, 30, 40, 50, 60]
+    assert not [path for path in tmp_path.iterdir() if path.name.endswith(".part")]
+
+
+def test_pcap_merge_compresses_output(tmp_path):
+    paths = shards(tmp_path, [[1, 3], [2]])
+    plain, compressed = str(tmp_path / "plain.pcap"), str(tmp_path / "out.pcap.gz")
+    plain_result = merge_pcap_files(paths, plain, by_time=True)
+    compressed_result = merge_pcap_files(paths, compressed, consts.NETWITNESS_COMPRESSION_GZIP, by_time=True)
+
+    assert plain_result == compressed_result
+    with open(plain, "rb") as plain_file, gzip.open(compressed) as compressed_file:
+        assert plain_file.read() == compressed_file.read()
+
+
+def test_pcap_merge_rejects_other_link_type(tmp_path):
+    paths = [*shards(tmp_path, [[1]]), str(tmp_path / "other")]
+    write_pcap(paths[1], [2], link_type=113)
+
+    for by_time in (False, True):
+        with pytest.raises(ValueError):
+            merge_pcap_files(paths, str(tmp_path / "out.pcap"), by_time=by_time)
+
+
+def write_json(path, document):
+    with open(path, "w") as json_file:
+        json.dump(document, json_file)
+    return str(path)
+
+
+def test_json_merge_by_time_keeps_document_shape(tmp_path):
+    first = write_json(tmp_path / "a.json", {"flags": 1, "logs": [{"time": 10}, {"time": 30}, {"id": "no time"}], "id2": 7})
+    second = write_json(tmp_path / "b.json", {"logs": [{"time": 20}, {"time": 40}]})
+    output = str(tmp_path / "out.json")
+    merge_json_files([first, second], output, by_time=True)
+
+    with open(output) as merged:
+        document = json.load(merged)
+    # the event without a time stays after the event it followed
+    assert document == {"flags": 1, "logs": [{"time": 10}, {"time": 20}, {"time": 30}, {"id": "no time"}, {"time": 40}], "id2": 7}
+
+
+def test_json_concatenation_keeps_file_order(tmp_path):
+    first = write_json(tmp_path / "a.json", [{"time": 10}, {"time": 30}])
+    second = write_json(tmp_path / "b.json", [{"time": 20}])
+    output = str(tmp_path / "out.json")
+    merge_json_files([first, second], output)
+
+    with open(output) as merged:
+        assert json.load(merged) == [{"time": 10}, {"time": 30}, {"time": 20}]
+
+
+def test_json_merge_by_time_in_several_passes(tmp_path, monkeypatch):
+    monkeypatch.setattr(consts, "NETWITNESS_MERGE_FAN_IN", 2)
+    paths = [write_json(tmp_path / f"{index}.json", [{"time": t} for t in times]) for index, times in enumerate([[4, 9], [1], [7], [2, 8]])]
+    output = str(tmp_path / "out.json")
+    merge_json_files(paths, output, by_time=True)
+
+    with open(output) as merged:
+        assert [event["time"] for event in json.load(merged)] == [1, 2, 4, 7, 8, 9]
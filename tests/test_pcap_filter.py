@@ -0,0 +1,138 @@
+import ipaddress
+import struct
+
+import pytest
+
+import netwitness_consts as consts
+from netwitness_utils import PcapFilter
+
+
+ETHERNET = consts.NETWITNESS_LINKTYPE_ETHERNET
+LINUX_SLL = consts.NETWITNESS_LINKTYPE_LINUX_SLL
+RAW_IP = consts.NETWITNESS_LINKTYPES_RAW_IP[0]
+
+
+def ip_packet(src, dst, proto=6, sport=1024, dport=80):
+    """Return an IPv4 or IPv6 packet, depending on the version of src, with the ports of a TCP, UDP or SCTP header"""
+
+    src, dst = ipaddress.ip_address(src), ipaddress.ip_address(dst)
+    ports = struct.pack(">HH", sport, dport) + bytes(16)
+    if src.version == 4:
+        return struct.pack(">BBHHHBBH", 0x45, 0, 20 + len(ports), 0, 0, 64, proto, 0) + src.packed + dst.packed + ports
+    return struct.pack(">IHBB", 6 << 28, len(ports), proto, 64) + src.packed + dst.packed + ports
+
+
+def ethernet_frame(packet, vlan_tags=()):
+    ether_type = 0x0800 if packet[0] >> 4 == 4 else 0x86DD
+    tags = b"".join(struct.pack(">HH", tpid, vlan_id) for tpid, vlan_id in vlan_tags)
+    return bytes(12) + tags + struct.pack(">H", ether_type) + packet
+
+
+def sll_frame(packet):
+    ether_type = 0x0800 if packet[0] >> 4 == 4 else 0x86DD
+    return bytes(14) + struct.pack(">H", ether_type) + packet
+
+
+def matches(expression, packet, link_type=RAW_IP):
+    return PcapFilter(expression).match(link_type, packet)
+
+
+WEB = ip_packet("10.0.0.1", "192.168.1.10", sport=40000, dport=80)
+DNS = ip_packet("192.168.1.10", "10.0.0.53", proto=17, sport=53, dport=5353)
+WEB6 = ip_packet("2001:db8::1", "2001:db8:1::2", sport=40000, dport=443)
+
+
+@pytest.mark.parametrize(
+    ("expression", "packet", "expected"),
+    [
+        ("tcp", WEB, True),
+        ("udp", WEB, False),
+        ("tcp port 80", WEB, True),
+        ("tcp and port 443", WEB, False),
+        ("host 10.0.0.1", WEB, True),
+        ("src host 10.0.0.1", WEB, True),
+        ("dst host 10.0.0.1", WEB, False),
+        ("src port 80", WEB, False),
+        ("dst port 80", WEB, True),
+        ("portrange 50-60", DNS, True),
+        ("dst portrange 50-60", DNS, False),
+        ("port 5353", DNS, True),
+        ("net 192.168.0.0/16", WEB, True),
+        ("src net 192.168.0.0/16", WEB, False),
+        ("ip6", WEB6, True),
+        ("ip", WEB6, False),
+        ("net 2001:db8:1::/48", WEB6, True),
+        ("src net 2001:db8:1::/48", WEB6, False),
+        ("net 2001:db8:1::/48", WEB, False),
+        ("host 2001:db8::1 and port 443", WEB6, True),
+    ],
+)
+def test_primitives(expression, packet, expected):
+    assert matches(expression, packet) is expected
+
+
+@pytest.mark.parametrize(
+    ("expression", "web", "dns"),
+    [
+        ("not tcp", False, True),
+        ("! port 80", False, True),
+        ("not not tcp", True, False),
+        ("tcp or udp", True, True),
+        ("tcp || port 53", True, True),
+        ("tcp && port 53", False, False),
+        ("udp and (port 53 or port 80)", False, True),
+        ("not (udp or port 80)", False, False),
+        ("(tcp and dst port 80) or (udp and src port 53)", True, True),
+        ("NOT TCP", False, True),
+    ],
+)
+def test_operators(expression, web, dns):
+    assert (matches(expression, WEB), matches(expression, DNS)) == (web, dns)
+
+
+def test_link_layers():
+    packet_filter = PcapFilter("host 10.0.0.1 and port 80")
+
+    assert packet_filter.match(ETHERNET, ethernet_frame(WEB))
+    assert packet_filter.match(ETHERNET, ethernet_frame(WEB, [(0x8100, 10)]))
+    assert packet_filter.match(ETHERNET, ethernet_frame(WEB, [(0x88A8, 100), (0x8100, 10)]))
+    assert packet_filter.match(LINUX_SLL, sll_frame(WEB))
+    assert not packet_filter.match(ETHERNET, ethernet_frame(DNS, [(0x8100, 10)]))
+    assert PcapFilter("ip6 and port 443").match(LINUX_SLL, sll_frame(WEB6))
+
+
+def test_unsupported_or_truncated_packets_do_not_match():
+    assert not matches("tcp", WEB, link_type=147)
+    assert not matches("port 80", WEB[:22])
+    assert matches("not port 80", WEB[:22])
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "",
+        "port",
+        "port 1-",
+        "port -1",
+        "port 80-1",
+        "port 65536",
+        "portrange 0-65536",
+        "port http",
+        "host 10.0.0.300",
+        "net 10.0.0.0/33",
+        "src tcp",
+        "(tcp",
+        "tcp)",
+        "tcp or",
+        "not",
+        "vlan 10",
+    ],
+)
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        PcapFilter(expression)
+
+
+def test_port_bounds():
+    assert matches("portrange 0-65535", WEB)
+    assert matches("port 80-80", WEB)
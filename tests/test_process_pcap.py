@@ -0,0 +1,119 @@
+import gzip
+import hashlib
+import os
+import struct
+
+import netwitness_consts as consts
+from netwitness_utils import PcapFilter, iter_pcap_records, process_pcap
+
+
+RAW_IP = consts.NETWITNESS_LINKTYPES_RAW_IP[0]
+
+
+def udp_packet(index, dport):
+    """Return an IPv4 UDP packet from 10.0.0.<index> to the dport, padded to 100 bytes"""
+
+    header = struct.pack(">BBHHHBBH4s4s", 0x45, 0, 100, 0, 0, 64, 17, 0, bytes([10, 0, 0, index]), bytes([10, 0, 0, 254]))
+    return header + struct.pack(">HH", 1024, dport) + bytes(76)
+
+
+def write_capture(path, packets, snaplen=65535):
+    with open(path, "wb") as pcap_file:
+        pcap_file.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, snaplen, RAW_IP))
+        for index, packet in enumerate(packets):
+            pcap_file.write(struct.pack("<IIII", index, 0, len(packet), len(packet)) + packet)
+    return str(path)
+
+
+def read_capture(path, opener=open):
+    with opener(path, "rb") as pcap_file:
+        global_header = pcap_file.read(consts.NETWITNESS_PCAP_GLOBAL_HEADER_LEN)
+        return global_header, list(iter_pcap_records(pcap_file, "<"))
+
+
+PACKETS = [udp_packet(index, 53 if index % 3 == 0 else 80) for index in range(1, 11)]
+
+
+def test_copy_keeps_the_capture(tmp_path):
+    src = write_capture(tmp_path / "src.pcap", PACKETS)
+    work_dir = tmp_path / "out"
+    work_dir.mkdir()
+    outputs = process_pcap(src, str(work_dir), "capture.pcap")
+
+    with open(src, "rb") as src_file:
+        data = src_file.read()
+    assert outputs == [
+        {
+            "path": str(work_dir / "capture.pcap"),
+            "name": "capture.pcap",
+            "packet_count": 10,
+            "size": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+        }
+    ]
+    with open(outputs[0]["path"], "rb") as output_file:
+        assert output_file.read() == data
+
+
+def test_filter(tmp_path):
+    src = write_capture(tmp_path / "src.pcap", PACKETS)
+    outputs = process_pcap(src, str(tmp_path), "dns.pcap", packet_filter=PcapFilter("udp and dst port 53"))
+
+    _, records = read_capture(outputs[0]["path"])
+    assert [ts_sec for ts_sec, _, _, _ in records] == [2, 5, 8]
+    assert [data for _, _, _, data in records] == [PACKETS[2], PACKETS[5], PACKETS[8]]
+    assert outputs[0]["packet_count"] == 3
+
+
+def test_filter_without_match(tmp_path):
+    src = write_capture(tmp_path / "src.pcap", PACKETS)
+
+    assert process_pcap(src, str(tmp_path), "none.pcap", packet_filter=PcapFilter("tcp")) == []
+    assert not os.path.exists(tmp_path / "none.pcap")
+
+
+def test_snaplen(tmp_path):
+    src = write_capture(tmp_path / "src.pcap", PACKETS)
+    outputs = process_pcap(src, str(tmp_path), "short.pcap", snaplen=28)
+
+    global_header, records = read_capture(outputs[0]["path"])
+    assert struct.unpack("<I", global_header[16:20])[0] == 28
+    assert all(len(data) == 28 and orig_len == 100 for _, _, orig_len, data in records)
+
+
+def test_split_by_count(tmp_path):
+    src = write_capture(tmp_path / "src.pcap", PACKETS)
+    outputs = process_pcap(src, str(tmp_path), "capture.pcap", split_count=4)
+
+    assert [output["name"] for output in outputs] == ["capture-001.pcap", "capture-002.pcap", "capture-003.pcap"]
+    assert [output["packet_count"] for output in outputs] == [4, 4, 2]
+    assert [data for output in outputs for _, _, _, data in read_capture(output["path"])[1]] == PACKETS
+
+
+def test_split_by_size(tmp_path):
+    src = write_capture(tmp_path / "src.pcap", PACKETS)
+    # the global header and three records of 16 + 100 bytes
+    split_size = consts.NETWITNESS_PCAP_GLOBAL_HEADER_LEN + 3 * 116
+    outputs = process_pcap(src, str(tmp_path), "capture.pcap", split_size=split_size)
+
+    assert [output["packet_count"] for output in outputs] == [3, 3, 3, 1]
+    assert all(output["size"] == os.path.getsize(output["path"]) <= split_size for output in outputs)
+    # a file always gets a packet, even a larger one
+    assert [output["packet_count"] for output in process_pcap(src, str(tmp_path), "tiny.pcap", split_size=10)] == [1] * 10
+
+
+def test_filter_split_and_compress(tmp_path):
+    src = write_capture(tmp_path / "src.pcap", PACKETS)
+    outputs = process_pcap(
+        src, str(tmp_path), "capture.pcap", packet_filter=PcapFilter("not port 53"), split_count=3, codec=consts.NETWITNESS_COMPRESSION_GZIP
+    )
+
+    assert [output["packet_count"] for output in outputs] == [3, 3, 1]
+    decoded = []
+    for output in outputs:
+        with gzip.open(output["path"], "rb") as output_file:
+            data = output_file.read()
+        # the size and hash are those of the capture before compression
+        assert (output["size"], output["sha256"]) == (len(data), hashlib.sha256(data).hexdigest())
+        decoded.extend(record[3] for record in read_capture(output["path"], gzip.open)[1])
+    assert decoded == [packet for index, packet in enumerate(PACKETS, 1) if index % 3]
@@ -0,0 +1,65 @@
+import pytest
+
+from netwitness_utils import SessionIdSet
+
+
+@pytest.mark.parametrize(
+    ("session_ids", "expected", "count"),
+    [
+        ("5", "5", 1),
+        ("1-100,205,300-400", "1-100,205,300-400", 202),
+        ("300-400, 1-100 ,205", "1-100,205,300-400", 202),
+        ("1-10,5-20,20", "1-20", 20),
+        ("1,2,3,5,6,8", "1-3,5-6,8", 6),
+        ("1-3,4-6", "1-6", 6),
+        ("7,7,7", "7", 1),
+        ("10-20,12-15", "10-20", 11),
+    ],
+)
+def test_coalescing(session_ids, expected, count):
+    ids = SessionIdSet(session_ids)
+
+    assert str(ids) == expected
+    assert len(ids) == count
+
+
+@pytest.mark.parametrize("session_ids", ["", "1,,2", "a", "1-b", "-5", "1-2-3", "١٢"])
+def test_invalid_ids(session_ids):
+    with pytest.raises(ValueError):
+        SessionIdSet(session_ids)
+
+
+def test_bad_range():
+    with pytest.raises(ValueError, match="smaller number should come first"):
+        SessionIdSet("10-1")
+
+
+def test_split_into_groups_of_the_same_size():
+    ids = SessionIdSet("1-10,21-30")
+
+    assert ids.split() == ["1-10,21-30"]
+    assert ids.split(2) == ["1-10", "21-30"]
+    assert ids.split(4) == ["1-5", "6-10", "21-25", "26-30"]
+    assert ids.split(3) == ["1-7", "8-10,21-24", "25-30"]
+
+
+def test_split_into_more_groups_than_ids():
+    assert SessionIdSet("1,3").split(5) == ["1", "3"]
+
+
+def test_split_by_length():
+    ids = SessionIdSet("1,3,5,7,9,11")
+    groups = ids.split(max_length=5)
+
+    assert groups == ["1,3,5", "7,9", "11"]
+    assert all(len(group) <= 5 for group in groups)
+    # a range longer than max_length still makes a group of its own
+    assert SessionIdSet("100000-200000,300000").split(max_length=5) == ["100000-200000", "300000"]
+
+
+def test_split_keeps_every_id_once():
+    ids = SessionIdSet("1-1000,1500,2000-2999")
+    groups = ids.split(7, max_length=12)
+
+    assert str(SessionIdSet(",".join(groups))) == str(ids)
+    assert sum(len(SessionIdSet(group)) for group in groups) == len(ids)